@@ -5,7 +5,9 @@ from rest_framework import generics, permissions as drf_permissions
 from rest_framework.exceptions import PermissionDenied, ValidationError
 
 from framework.auth.core import Auth
+from framework.mongo.utils import prefetch
 from website.models import Node, Pointer
+from website.project.model import filter_viewable
 from api.users.serializers import ContributorSerializer
 from api.base.filters import ODMFilterMixin, ListFilterMixin
 from api.base.utils import get_object_or_error, waterbutler_url_for
@@ -128,6 +130,7 @@ class NodeContributorsList(generics.ListAPIView, ListFilterMixin, NodeMixin):
 
     def get_default_queryset(self):
         node = self.get_node()
+        prefetch([node], 'contributors')
         visible_contributors = node.visible_contributor_ids
         contributors = []
         for contributor in node.contributors:
@@ -160,7 +163,7 @@ class NodeRegistrationsList(generics.ListAPIView, NodeMixin):
             auth = Auth(None)
         else:
             auth = Auth(user)
-        registrations = [node for node in nodes if node.can_view(auth)]
+        registrations = filter_viewable(nodes, auth)
         return registrations
 
 
@@ -181,13 +184,18 @@ class NodeChildrenList(generics.ListCreateAPIView, NodeMixin):
 
     # overrides ListAPIView
     def get_queryset(self):
-        nodes = self.get_node().nodes
+        node = self.get_node()
+        prefetch([node], 'nodes')
+        nodes = node.nodes
         user = self.request.user
         if user.is_anonymous():
             auth = Auth(None)
         else:
             auth = Auth(user)
-        children = [node for node in nodes if node.can_view(auth) and node.primary and not node.is_deleted]
+        children = filter_viewable(
+            [child for child in nodes if child.primary and not child.is_deleted],
+            auth,
+        )
         return children
 
     # overrides ListCreateAPIView
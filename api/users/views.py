@@ -7,6 +7,7 @@ from modularodm import Q
 
 from framework.auth.core import Auth
 from website.models import User, Node
+from website.project.model import filter_viewable
 from api.base.filters import ODMFilterMixin
 from api.base.utils import get_object_or_error
 from api.nodes.serializers import NodeSerializer
@@ -116,5 +117,5 @@ class UserNodes(generics.ListAPIView, UserMixin, ODMFilterMixin):
             auth = Auth(current_user)
         query = self.get_query_from_request()
         raw_nodes = Node.find(self.get_default_odm_query() & query)
-        nodes = [each for each in raw_nodes if each.is_public or each.can_view(auth)]
+        nodes = filter_viewable(raw_nodes, auth)
         return nodes
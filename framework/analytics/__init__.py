@@ -1,16 +1,21 @@
 #!/usr/bin/env python
 # encoding: utf-8
 
+import logging
 import functools
 from datetime import datetime
 
 from framework.mongo import database
 from framework.sessions import session
+from framework.analytics.bloom import BloomFilter
+from framework.analytics.buffer import page_counters
+
+from website import settings
 
 from flask import request
 
 
-collection = database['pagecounters']
+logger = logging.getLogger(__name__)
 
 
 def increment_user_activity_counters(user_id, action, date, db=None):
@@ -72,49 +77,70 @@ def build_page(rex, kwargs):
         return None
 
 
+def _load_bloom(data):
+    return BloomFilter(
+        size=settings.ANALYTICS_BLOOM_SIZE,
+        hashes=settings.ANALYTICS_BLOOM_HASHES,
+        data=data,
+    )
+
+
+def _visited_filters(date):
+    """Load the session's Bloom filters of pages visited ever and on `date`,
+    folding in the page lists stored by older sessions.
+    """
+    visited = _load_bloom(session.data.get('visited_bloom'))
+    for legacy in session.data.pop('visited', None) or []:
+        visited.add(legacy)
+
+    visited_by_date = session.data.get('visited_by_date') or {}
+    if visited_by_date.get('date') == date:
+        today = _load_bloom(visited_by_date.get('bloom'))
+        for legacy in visited_by_date.get('pages') or []:
+            today.add(legacy)
+    else:
+        today = _load_bloom(None)
+    return visited, today
+
+
 def update_counter(page, db=None):
-    """Update counters for page.
+    """Update counters for page. Increments are buffered in-process and
+    written by `flush_counters`; pages already visited by the current session
+    are tracked in fixed-size Bloom filters so that session documents do not
+    grow with browsing history.
+
+    Buffered increments are not flushed here: the buffer holds the increments
+    of other requests as well, which would be lost if this request's
+    transaction were rolled back. They are flushed by `teardown_request`.
 
     :param str page: Colon-delimited page key in analytics collection
-    :param db: MongoDB database or `None`
+    :param db: Unused; kept for callers that pass it
     """
-    db = db or database
-    collection = db['pagecounters']
-
     date = datetime.utcnow()
     date = date.strftime('%Y/%m/%d')
 
     page = clean_page(page)
 
-    d = {'$inc': {}}
+    visited, today = _visited_filters(date)
 
-    visited_by_date = session.data.get('visited_by_date')
-    if not visited_by_date:
-        visited_by_date = {'date': date, 'pages': []}
+    increments = {
+        'date.%s.total' % date: 1,
+        'total': 1,
+    }
+    if today.add(page):
+        increments['date.%s.unique' % date] = 1
+    if visited.add(page):
+        increments['unique'] = 1
 
-    if date == visited_by_date['date']:
-        if page not in visited_by_date['pages']:
-            d['$inc']['date.%s.unique' % date] = 1
-            visited_by_date['pages'].append(page)
-            session.data['visited_by_date'] = visited_by_date
-    else:
-        visited_by_date['date'] = date
-        visited_by_date['pages'] = []
-        d['$inc']['date.%s.unique' % date] = 1
-        visited_by_date['pages'].append(page)
-        session.data['visited_by_date'] = visited_by_date
+    session.data['visited_bloom'] = visited.serialize()
+    session.data['visited_by_date'] = {'date': date, 'bloom': today.serialize()}
 
-    d['$inc']['date.%s.total' % date] = 1
+    page_counters.add(page, increments)
 
-    visited = session.data.get('visited')  # '/project/x/, project/y/'
-    if not visited:
-        visited = []
-    if page not in visited:
-        d['$inc']['unique'] = 1
-        visited.append(page)
-        session.data['visited'] = visited
-    d['$inc']['total'] = 1
-    collection.update({'_id': page}, d, True, False)
+
+def flush_counters(db=None):
+    """Write all buffered page counter increments."""
+    return page_counters.flush(db)
 
 
 def update_counters(rex, db=None):
@@ -136,21 +162,64 @@ def update_counters(rex, db=None):
     return wrapper
 
 
+def _combine_counters(result, pending):
+    if not result and not pending:
+        return None, None
+    result = result or {}
+    unique = result.get('unique', 0) + pending.get('unique', 0)
+    total = result.get('total', 0) + pending.get('total', 0)
+    return unique, total
+
+
 def get_basic_counters(page, db=None):
+    """Return unique and total counts for `page`, including increments
+    buffered by this process but not yet written.
+    """
     db = db or database
     collection = db['pagecounters']
-    unique = 0
-    total = 0
-    collection = database['pagecounters']
+    page = clean_page(page)
     result = collection.find_one(
-        {'_id': clean_page(page)},
+        {'_id': page},
         {'total': 1, 'unique': 1}
     )
-    if result:
-        if 'unique' in result:
-            unique = result['unique']
-        if 'total' in result:
-            total = result['total']
-        return unique, total
-    else:
-        return None, None
+    return _combine_counters(result, page_counters.pending(page))
+
+
+def get_basic_counters_bulk(pages, db=None):
+    """Return unique and total counts for each of `pages` with one query;
+    see `get_basic_counters`.
+
+    :return: Dict mapping each page to a tuple of unique and total counts
+    """
+    if not pages:
+        return {}
+    db = db or database
+    collection = db['pagecounters']
+    cleaned = dict((page, clean_page(page)) for page in pages)
+    results = dict(
+        (result['_id'], result)
+        for result in collection.find(
+            {'_id': {'$in': list(set(cleaned.values()))}},
+            {'total': 1, 'unique': 1}
+        )
+    )
+    return dict(
+        (page, _combine_counters(results.get(clean), page_counters.pending(clean)))
+        for page, clean in cleaned.iteritems()
+    )
+
+
+def teardown_request(exception=None):
+    """Flush buffered page counters if due. Must run after the transaction
+    teardown handler, so that counters are not written inside a request
+    transaction that is then rolled back.
+    """
+    try:
+        page_counters.flush_if_due()
+    except Exception:
+        logger.exception('Failed to flush page counters')
+
+
+handlers = {
+    'teardown_request': teardown_request,
+}
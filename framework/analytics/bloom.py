@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""Fixed-size Bloom filter, small enough to keep in a session document."""
+
+import base64
+import struct
+import hashlib
+
+
+class BloomFilter(object):
+    """Probabilistic set of strings. Membership tests may return false
+    positives (at a rate that grows with the number of items added) but never
+    false negatives; storage stays at ``size`` bits however many items are
+    added.
+
+    :param int size: Number of bits; must be a multiple of 8
+    :param int hashes: Number of bit positions per item; at most 5
+    :param str data: Serialized filter, as returned by `serialize`
+    """
+    def __init__(self, size=2048, hashes=4, data=None):
+        self.size = size
+        self.hashes = hashes
+        bits = bytearray(base64.b64decode(data)) if data else None
+        if bits is None or len(bits) * 8 != size:
+            # Missing, or serialized with different settings
+            bits = bytearray(size // 8)
+        self.bits = bits
+
+    def _positions(self, item):
+        if isinstance(item, unicode):
+            item = item.encode('utf-8')
+        digest = hashlib.sha1(item).digest()
+        for index in range(self.hashes):
+            yield struct.unpack_from('>I', digest, index * 4)[0] % self.size
+
+    def __contains__(self, item):
+        return all(
+            self.bits[position // 8] & (1 << (position % 8))
+            for position in self._positions(item)
+        )
+
+    def add(self, item):
+        """Add ``item``.
+
+        :return: Whether the item was (probably) not already present
+        """
+        added = False
+        for position in self._positions(item):
+            mask = 1 << (position % 8)
+            if not self.bits[position // 8] & mask:
+                self.bits[position // 8] |= mask
+                added = True
+        return added
+
+    def serialize(self):
+        return base64.b64encode(bytes(self.bits))
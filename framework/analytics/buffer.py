@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""In-process write-behind buffer for page counters."""
+
+import os
+import time
+import atexit
+import logging
+import threading
+from collections import defaultdict
+
+from framework.mongo import database
+
+from website import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+class CounterBuffer(object):
+    """Coalesce `$inc` updates to a collection in memory and write them out
+    when ``max_events`` increments have been buffered or ``max_age`` seconds
+    have passed since the last flush, so that a burst of page views costs
+    one upsert per page rather than one per view.
+
+    Buffers are per process: after a fork, the child discards anything it
+    inherited, which the parent still owns and will flush.
+    """
+    def __init__(self, collection_name, max_events=None, max_age=None):
+        self.collection_name = collection_name
+        self.max_events = max_events
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._pending = defaultdict(lambda: defaultdict(int))
+        self._events = 0
+        self._last_flush = time.time()
+        self._pid = os.getpid()
+
+    def _check_fork(self):
+        if self._pid != os.getpid():
+            self._reset()
+
+    def add(self, key, increments):
+        """Buffer ``increments`` (a mapping of field to amount) for ``key``."""
+        with self._lock:
+            self._check_fork()
+            for field, amount in increments.items():
+                self._pending[key][field] += amount
+            self._events += 1
+
+    def pending(self, key):
+        """Return buffered, not yet written increments for ``key``."""
+        with self._lock:
+            self._check_fork()
+            return dict(self._pending.get(key, {}))
+
+    def is_due(self):
+        return (
+            self._events >= self.max_events or
+            time.time() - self._last_flush >= self.max_age
+        )
+
+    def flush_if_due(self, db=None):
+        if self._events and self.is_due():
+            self.flush(db)
+
+    def flush(self, db=None):
+        """Write all buffered increments, one upsert per key.
+
+        :return: Number of keys written
+        """
+        with self._lock:
+            self._check_fork()
+            pending = self._pending
+            self._reset()
+        collection = (db or database)[self.collection_name]
+        written = 0
+        for key, increments in pending.items():
+            try:
+                collection.update({'_id': key}, {'$inc': dict(increments)}, upsert=True, manipulate=False)
+                written += 1
+            except Exception:
+                logger.exception('Failed to flush counters for {0}; requeueing'.format(key))
+                self.add(key, increments)
+        return written
+
+
+page_counters = CounterBuffer(
+    'pagecounters',
+    max_events=settings.ANALYTICS_FLUSH_EVENTS,
+    max_age=settings.ANALYTICS_FLUSH_INTERVAL,
+)
+
+atexit.register(page_counters.flush)
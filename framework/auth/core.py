@@ -2,10 +2,8 @@
 import re
 import logging
 import urlparse
-import itertools
 import datetime as dt
 
-import bson
 import pytz
 import itsdangerous
 
@@ -190,6 +188,13 @@ class User(GuidStoredObject, AddonModelMixin):
         'social',
     }
 
+    # Fields shown in cached project organizer entries
+    ORGANIZER_DISPLAY_FIELDS = {
+        'fullname',
+        'given_name',
+        'family_name',
+    }
+
     # TODO: Add SEARCH_UPDATE_NODE_FIELDS, for fields that should trigger a
     #   search update for all nodes to which the user is a contributor.
 
@@ -467,7 +472,7 @@ class User(GuidStoredObject, AddonModelMixin):
         except itsdangerous.BadSignature:
             return None
 
-        user_session = Session.load(token)
+        user_session = Session.load_cached(token)
 
         if user_session is None:
             return None
@@ -1007,6 +1012,7 @@ class User(GuidStoredObject, AddonModelMixin):
         # TODO: Update mailchimp subscription on username change
         # Avoid circular import
         from framework.analytics import tasks as piwik_tasks
+        from website.util import organizer_cache
         self.username = self.username.lower().strip() if self.username else None
         ret = super(User, self).save(*args, **kwargs)
         if self.SEARCH_UPDATE_FIELDS.intersection(ret) and self.is_confirmed:
@@ -1014,6 +1020,8 @@ class User(GuidStoredObject, AddonModelMixin):
             self.update_search_nodes_contributors()
         if settings.PIWIK_HOST and not self.piwik_token:
             piwik_tasks.update_user(self._id)
+        if self.ORGANIZER_DISPLAY_FIELDS.intersection(ret):
+            organizer_cache.invalidate_users([self._id])
         return ret
 
     def update_search(self):
@@ -1058,6 +1066,7 @@ class User(GuidStoredObject, AddonModelMixin):
             raise ValueError('Node is already being watched.')
         watch_config.save()
         self.watched.append(watch_config)
+        watch_config.node.update_relation_counts('watchers')
         return None
 
     def unwatch(self, watch_config):
@@ -1071,6 +1080,7 @@ class User(GuidStoredObject, AddonModelMixin):
         for each in self.watched:
             if watch_config.node._id == each.node._id:
                 each.__class__.remove_one(each)
+                watch_config.node.update_relation_counts('watchers')
                 return None
         raise ValueError('Node not being watched.')
 
@@ -1083,27 +1093,31 @@ class User(GuidStoredObject, AddonModelMixin):
         '''Return a generator of recent logs' ids.
 
         :param since: A datetime specifying the oldest time to retrieve logs
-        from. If ``None``, defaults to 60 days before today. Must be a tz-aware
-        datetime because PyMongo's generation times are tz-aware.
+        from. If ``None``, defaults to 60 days before today. Naive datetimes
+        are taken to be UTC.
 
         :rtype: generator of log ids (strings)
         '''
-        log_ids = []
+        from website.project import timeline
         # Default since to 60 days before today if since is None
         # timezone aware utcnow
         utcnow = dt.datetime.utcnow().replace(tzinfo=pytz.utc)
         since_date = since or (utcnow - dt.timedelta(days=60))
-        for config in self.watched:
-            # Extract the timestamps for each log from the log_id (fast!)
-            # The first 4 bytes of Mongo's ObjectId encodes time
-            # This prevents having to load each Log Object and access their
-            # date fields
-            node_log_ids = [log_id for log_id in config.node.logs._to_primary_keys()
-                                   if bson.ObjectId(log_id).generation_time > since_date and
-                                   log_id not in log_ids]
-            # Log ids in reverse chronological order
-            log_ids = _merge_into_reversed(log_ids, node_log_ids)
-        return (l_id for l_id in log_ids)
+        node_ids = [config.node._id for config in self.watched]
+        # Merge the watched nodes' indexed log timelines, newest first
+        return (
+            log_id for _, log_id
+            in timeline.iter_timeline(node_ids, since=since_date)
+        )
+
+    def get_recent_log_id_page(self, size, cursor=None):
+        """Return one page of the logs of watched nodes, newest first.
+
+        :return: Tuple of log IDs and the cursor of the next page, or `None`
+        """
+        from website.project import timeline
+        node_ids = [config.node._id for config in self.watched]
+        return timeline.get_log_ids(node_ids, size, cursor=cursor)
 
     def get_daily_digest_log_ids(self):
         '''Return a generator of log ids generated in the past day
@@ -1276,9 +1290,3 @@ class User(GuidStoredObject, AddonModelMixin):
     def n_projects_in_common(self, other_user):
         """Returns number of "shared projects" (projects that both users are contributors for)"""
         return len(self.get_projects_in_common(other_user, primary_keys=True))
-
-
-def _merge_into_reversed(*iterables):
-    '''Merge multiple sorted inputs into a single output in reverse order.
-    '''
-    return sorted(itertools.chain(*iterables), reverse=True)
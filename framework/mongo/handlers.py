@@ -1,8 +1,12 @@
 # -*- coding: utf-8 -*-
 
+import os
+import time
 import logging
+import threading
 
 import pymongo
+from pymongo.errors import ConnectionFailure
 from flask import g
 from werkzeug.local import LocalProxy
 
@@ -12,10 +16,12 @@ from website import settings
 logger = logging.getLogger(__name__)
 
 
-def get_mongo_client():
+def get_mongo_client(**kwargs):
     """Create MongoDB client and authenticate database.
+
+    :param kwargs: Extra keyword arguments passed to ``MongoClient``
     """
-    client = pymongo.MongoClient(settings.DB_HOST, settings.DB_PORT)
+    client = pymongo.MongoClient(settings.DB_HOST, settings.DB_PORT, **kwargs)
 
     db = client[settings.DB_NAME]
 
@@ -25,17 +31,122 @@ def get_mongo_client():
     return client
 
 
+class ClientPool(object):
+    """Process-wide pooled MongoDB client. The client is created lazily on
+    first use and rebuilt whenever the current process id changes, so that
+    clients are never shared across a uwsgi / gunicorn fork.
+
+    TokuMX transactions are bound to a connection, so each request pins a
+    single socket from the pool to its thread via ``start_request`` and
+    releases it in ``end_request``.
+    """
+    def __init__(self, pool_size=None, health_check_interval=None):
+        self.pool_size = pool_size
+        self.health_check_interval = health_check_interval
+        self._client = None
+        self._pid = None
+        self._last_check = None
+        self._lock = threading.Lock()
+        self.stats = {
+            'acquired': 0,
+            'wait_total': 0.0,
+            'wait_max': 0.0,
+            'reconnects': 0,
+        }
+
+    @property
+    def client(self):
+        """Return the pooled client for the current process, creating it
+        if necessary.
+        """
+        pid = os.getpid()
+        if self._client is None or self._pid != pid:
+            with self._lock:
+                if self._client is None or self._pid != pid:
+                    self._client = get_mongo_client(
+                        max_pool_size=self.pool_size,
+                        auto_start_request=False,
+                    )
+                    self._pid = pid
+                    self._last_check = time.time()
+        return self._client
+
+    def reset(self):
+        """Drop the pooled client; the next access creates a fresh one."""
+        with self._lock:
+            if self._client is not None:
+                self._client.disconnect()
+            self._client = None
+            self._pid = None
+
+    def check_health(self):
+        """Ping the server if the last check is older than the configured
+        interval; rebuild the client if the connection has gone away.
+        """
+        if not self.health_check_interval:
+            return
+        now = time.time()
+        if self._last_check and now - self._last_check < self.health_check_interval:
+            return
+        self._last_check = now
+        try:
+            self.client.admin.command('ping')
+        except ConnectionFailure:
+            logger.warning('Pooled MongoDB client failed health check; reconnecting.')
+            self.stats['reconnects'] += 1
+            self.reset()
+
+    def acquire(self):
+        """Pin a socket to the current thread for the duration of a request
+        and record how long that took.
+        """
+        start = time.time()
+        self.check_health()
+        client = self.client
+        client.start_request()
+        wait = time.time() - start
+        self.stats['acquired'] += 1
+        self.stats['wait_total'] += wait
+        self.stats['wait_max'] = max(self.stats['wait_max'], wait)
+        if wait > settings.DB_POOL_WAIT_WARNING:
+            logger.warning('Waited {0:.3f}s for pooled MongoDB connection'.format(wait))
+        return client
+
+    def release(self, client):
+        client.end_request()
+
+
+client_pool = ClientPool(
+    pool_size=settings.DB_POOL_SIZE,
+    health_check_interval=settings.DB_POOL_HEALTH_CHECK_INTERVAL,
+)
+
+
+def get_pool_stats():
+    """Return connection pool wait metrics for the current process."""
+    stats = dict(client_pool.stats)
+    acquired = stats['acquired']
+    stats['wait_mean'] = stats['wait_total'] / acquired if acquired else 0.0
+    return stats
+
+
 def connection_before_request():
     """Attach MongoDB client to `g`.
     """
-    g._mongo_client = get_mongo_client()
+    if settings.DB_POOL:
+        g._mongo_client = client_pool.acquire()
+    else:
+        g._mongo_client = get_mongo_client()
 
 
 def connection_teardown_request(error=None):
-    """Close MongoDB client if attached to `g`.
+    """Release pooled connection or close MongoDB client if attached to `g`.
     """
     try:
-        g._mongo_client.close()
+        if settings.DB_POOL:
+            client_pool.release(g._mongo_client)
+        else:
+            g._mongo_client.close()
     except AttributeError:
         if not settings.DEBUG_MODE:
             logger.error('MongoDB client not attached to request.')
@@ -48,7 +159,19 @@ handlers = {
 
 
 # Set up getters for `LocalProxy` objects
-_mongo_client = get_mongo_client()
+_mongo_client = None
+
+
+def _get_default_client():
+    """Return the client used outside of request contexts. Created lazily so
+    that importing this module before forking does not open connections.
+    """
+    global _mongo_client
+    if settings.DB_POOL:
+        return client_pool.client
+    if _mongo_client is None:
+        _mongo_client = get_mongo_client()
+    return _mongo_client
 
 
 def _get_current_client():
@@ -58,7 +181,7 @@ def _get_current_client():
     try:
         return g._mongo_client
     except (AttributeError, RuntimeError):
-        return _mongo_client
+        return _get_default_client()
 
 
 def _get_current_database():
@@ -73,3 +73,103 @@ def get_or_http_error(Model, pk, allow_deleted=False):
         ))
     else:
         return instance
+
+
+def _foreign_targets(obj, name):
+    """Return ``(schema, key)`` pairs referenced by the foreign or abstract
+    foreign field ``name`` of ``obj``, read from storage data so that no
+    referenced records are loaded.
+    """
+    field = obj._fields[name]
+    field = getattr(field, '_field_instance', field)
+    value = obj.to_storage().get(name)
+    if value is None:
+        return []
+    values = value if isinstance(value, list) else [value]
+    if getattr(field, '_is_abstract', False):
+        return [
+            (obj.get_collection(each[1]), each[0])
+            for each in values
+            if each
+        ]
+    return [(field.base_class, each) for each in values if each is not None]
+
+
+def prefetch(objects, *paths):
+    """Load the records referenced by foreign fields of ``objects`` with a
+    single ``$in`` query per collection and store them in the request-scoped
+    object cache, so that subsequent dereferences (e.g. iterating
+    ``node.contributors``) do not hit the database one record at a time.
+    Dotted paths prefetch nested references, e.g. ``'logs.user'``.
+
+    Example: ::
+
+        children = prefetch(list(node.nodes), 'contributors', 'nodes')
+
+    :param list objects: `StoredObject` instances, which may be of mixed types
+    :param str paths: Field names or dotted field paths to prefetch
+    :return: The list of objects passed in
+    """
+    objects = [each for each in objects if each is not None]
+    tree = {}
+    for path in paths:
+        node = tree
+        for part in path.split('.'):
+            node = node.setdefault(part, {})
+    _prefetch_tree(objects, tree)
+    return objects
+
+
+def _prefetch_tree(objects, tree):
+    for name, subtree in tree.items():
+        keys_by_schema = {}
+        for obj in objects:
+            if name not in obj._fields:
+                # Mixed lists (e.g. nodes and pointers) may not share every
+                # field; skip objects the path does not apply to
+                continue
+            for schema, key in _foreign_targets(obj, name):
+                keys_by_schema.setdefault(schema, []).append(key)
+        loaded = []
+        for schema, keys in keys_by_schema.items():
+            loaded.extend(bulk_load(schema, keys))
+        if subtree:
+            _prefetch_tree(loaded, subtree)
+
+
+def bulk_load(schema, keys):
+    """Load records of ``schema`` by primary key with one query. Records
+    already in the object cache are reused rather than replaced.
+
+    :return: Loaded records, in no particular order
+    """
+    keys = list(set(keys))
+    if not keys:
+        return []
+    return bulk_find(schema, {schema._primary_name: {'$in': keys}})
+
+
+def bulk_find(schema, spec):
+    """Load all records of ``schema`` matching the raw MongoDB query ``spec``
+    with one query, placing them in the object cache.
+
+    :return: Loaded records, in no particular order
+    """
+    cursor = schema._storage[0].store.find(spec)
+    return [
+        schema.load(key=data[schema._primary_name], data=data)
+        for data in cursor
+    ]
+
+
+def bulk_insert(schema, objects):
+    """Insert new records of ``schema`` with one query. Unlike `save`, this
+    does not validate records or update backreferences, so it is only suitable
+    for schemas without foreign fields.
+    """
+    if not objects:
+        return
+    schema._storage[0].store.insert(
+        [obj.to_storage() for obj in objects],
+        manipulate=False,
+    )
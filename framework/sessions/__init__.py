@@ -80,9 +80,17 @@ def prepare_private_key():
 
 
 def get_session():
-    session = sessions.get(request._get_current_object())
-    if not session:
-        session = Session()
+    """Return the current request's session, loading it on first access: a
+    request that never touches the session does no session I/O.
+    """
+    req = request._get_current_object()
+    session = sessions.get(req)
+    if session is None:
+        session_id = pending_sessions.pop(req, None)
+        if session_id is not None:
+            session = Session.load_cached(session_id) or Session(_id=session_id)
+        else:
+            session = load_client_session()
         set_session(session)
     return session
 
@@ -91,6 +99,49 @@ def set_session(session):
     sessions[request._get_current_object()] = session
 
 
+def _client_serializer():
+    return itsdangerous.URLSafeSerializer(settings.SECRET_KEY, salt='client-session')
+
+
+def load_client_session():
+    """Build an unsaved session for an anonymous request, restoring its data
+    from the signed client-side session cookie if that mode is enabled.
+    """
+    session = Session()
+    cookie = request.cookies.get(settings.SESSION_CLIENT_COOKIE_NAME)
+    if settings.SESSION_CLIENT_SIDE and cookie:
+        try:
+            session.data = _client_serializer().loads(cookie)
+        except itsdangerous.BadData:
+            pass
+        else:
+            session.mark_clean()
+    return session
+
+
+def save_client_session(response, session):
+    """Store the data of an anonymous session in a signed cookie. Sessions too
+    large for a cookie are dropped, as anonymous sessions were before
+    client-side sessions existed.
+    """
+    if not session.data:
+        if request.cookies.get(settings.SESSION_CLIENT_COOKIE_NAME):
+            response.delete_cookie(settings.SESSION_CLIENT_COOKIE_NAME, domain=settings.OSF_COOKIE_DOMAIN)
+        return
+    try:
+        value = _client_serializer().dumps(session.data)
+    except TypeError:
+        return
+    if len(value) > settings.SESSION_CLIENT_MAX_SIZE:
+        return
+    response.set_cookie(
+        settings.SESSION_CLIENT_COOKIE_NAME,
+        value=value,
+        domain=settings.OSF_COOKIE_DOMAIN,
+        httponly=True,
+    )
+
+
 def create_session(response, data=None):
     current_session = get_session()
     if current_session:
@@ -105,10 +156,15 @@ def create_session(response, data=None):
         set_session(session)
     if response is not None:
         response.set_cookie(settings.COOKIE_NAME, value=cookie_value, domain=settings.OSF_COOKIE_DOMAIN)
+        if request.cookies.get(settings.SESSION_CLIENT_COOKIE_NAME):
+            # Data from the client-side session now lives in the stored session
+            response.delete_cookie(settings.SESSION_CLIENT_COOKIE_NAME, domain=settings.OSF_COOKIE_DOMAIN)
         return response
 
 
 sessions = WeakKeyDictionary()
+# Signed-cookie session IDs of requests whose sessions have not been loaded yet
+pending_sessions = WeakKeyDictionary()
 session = LocalProxy(get_session)
 
 # Request callbacks
@@ -172,15 +228,22 @@ def before_request():
     if cookie:
         try:
             session_id = itsdangerous.Signer(settings.SECRET_KEY).unsign(cookie)
-            session = Session.load(session_id) or Session(_id=session_id)
-            set_session(session)
+            pending_sessions[request._get_current_object()] = session_id
             return
         except:
             pass
 
 
 def after_request(response):
-    if session.data.get('auth_user_id'):
-        session.save()
+    current_session = sessions.get(request._get_current_object())
+    if current_session is None:
+        # Session never accessed; nothing to save
+        return response
+
+    if current_session.data.get('auth_user_id'):
+        if current_session.is_dirty or current_session.is_stale:
+            current_session.save()
+    elif settings.SESSION_CLIENT_SIDE and current_session.is_dirty:
+        save_client_session(response, current_session)
 
     return response
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""In-process cache of recently loaded sessions."""
+
+import copy
+import time
+import threading
+from collections import OrderedDict
+
+
+class SessionCache(object):
+    """Least-recently-used cache of raw session records, keyed by session ID.
+    Entries expire ``ttl`` seconds after they were stored. Callers must check
+    that an entry is still current before using it.
+
+    :param int size: Maximum number of entries
+    :param int ttl: Seconds for which an entry may be served
+    """
+    def __init__(self, size, ttl):
+        self.size = size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return a copy of the cached record for ``key``, or `None` if it is
+        missing or expired.
+        """
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return None
+            stored, data = entry
+            if time.time() - stored > self.ttl:
+                return None
+            self._entries[key] = entry
+            return copy.deepcopy(data)
+
+    def set(self, key, data):
+        if not self.size:
+            return
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (time.time(), copy.deepcopy(data))
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
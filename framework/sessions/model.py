@@ -1,10 +1,23 @@
 # -*- coding: utf-8 -*-
 
+import copy
+import datetime
+
 from bson import ObjectId
 from modularodm import fields
 
 from framework.mongo import StoredObject
 
+from website import settings
+
+from .cache import SessionCache
+
+
+session_cache = SessionCache(
+    size=settings.SESSION_CACHE_SIZE,
+    ttl=settings.SESSION_CACHE_TTL,
+)
+
 
 class Session(StoredObject):
 
@@ -16,3 +29,75 @@ class Session(StoredObject):
     @property
     def is_authenticated(self):
         return 'auth_user_id' in self.data
+
+    @classmethod
+    def load_cached(cls, session_id):
+        """Load a session, from the process-wide session cache if the cached
+        copy is current. Only the session's `date_modified` is read from the
+        database to check this, so changes and removals by other processes are
+        seen at once.
+
+        :return: Session, marked clean, or `None` if not found
+        """
+        collection = cls._storage[0].store
+        current = collection.find_one({'_id': session_id}, {'date_modified': True})
+        if current is None:
+            session_cache.invalidate(session_id)
+            return None
+        data = session_cache.get(session_id)
+        if data is None or data.get('date_modified') != current.get('date_modified'):
+            data = collection.find_one({'_id': session_id})
+            if data is None:
+                return None
+            session_cache.set(session_id, data)
+        # Build the session from `data` rather than any copy held by the model
+        # cache, which may be stale
+        cls._clear_caches(session_id)
+        session = cls.load(key=session_id, data=data)
+        session.mark_clean()
+        return session
+
+    def mark_clean(self):
+        """Record the current data as persisted; see `is_dirty`."""
+        self._clean_data = copy.deepcopy(self.data)
+
+    @property
+    def is_dirty(self):
+        """Whether `data` has changed since the session was loaded or saved.
+        Sessions that have never been marked clean are always dirty.
+        """
+        return getattr(self, '_clean_data', None) != self.data
+
+    @property
+    def is_stale(self):
+        """Whether the session has gone unsaved for long enough that it should
+        be saved to refresh `date_modified`, which stale session cleanup uses.
+        """
+        if self.date_modified is None:
+            return True
+        age = datetime.datetime.utcnow() - self.date_modified
+        return age > datetime.timedelta(seconds=settings.SESSION_TOUCH_INTERVAL)
+
+    def save(self, *args, **kwargs):
+        ret = super(Session, self).save(*args, **kwargs)
+        self.mark_clean()
+        # Not cached until loaded again: the save may yet be rolled back
+        session_cache.invalidate(self._id)
+        return ret
+
+    @classmethod
+    def remove_one(cls, which, *args, **kwargs):
+        if isinstance(which, cls):
+            session_ids = [which._id]
+        else:
+            session_ids = [each._id for each in cls.find(which)]
+        ret = super(Session, cls).remove_one(which, *args, **kwargs)
+        session_cache.invalidate(*session_ids)
+        return ret
+
+    @classmethod
+    def remove(cls, query=None, *args, **kwargs):
+        session_ids = [each._id for each in cls.find(query)]
+        ret = super(Session, cls).remove(query, *args, **kwargs)
+        session_cache.invalidate(*session_ids)
+        return ret
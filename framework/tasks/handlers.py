@@ -40,7 +40,9 @@ def enqueue_task(signature):
     try:
         if signature not in g._celery_tasks:
             g._celery_tasks.append(signature)
-    except RuntimeError:
+    except (RuntimeError, AttributeError):
+        # No request context, or a request context that skipped
+        # `celery_before_request` (e.g. `test_request_context`)
         signature()
 
 
@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Compare latency of the `/search/` endpoint's search path before and after
+it was collapsed into a single Elasticsearch request. The "before" path is
+reproduced here: separate tag and count queries, then the real query, then a
+`Node.load` of each hit's parent. Run against a populated index:
+
+    python -m scripts.benchmark_search [query] [iterations]
+"""
+from __future__ import absolute_import
+
+import sys
+import copy
+import time
+import logging
+
+from website.app import init_app
+from website.models import Node
+from website.search import elastic_search
+from website.search.util import build_query
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO)
+
+
+def legacy_search(query, index, doc_type='_all'):
+    es = elastic_search.es
+    tag_query = copy.deepcopy(query)
+    count_query = copy.deepcopy(query)
+    for key in ['from', 'size', 'sort']:
+        tag_query.pop(key, None)
+        count_query.pop(key, None)
+    tag_query['aggregations'] = {'tag_cloud': {'terms': {'field': 'tags'}}}
+    es.search(index=index, doc_type=None, body=tag_query)
+    count_query['aggregations'] = {'counts': {'terms': {'field': '_type'}}}
+    es.search(index=index, doc_type=None, search_type='count', body=count_query)
+    raw_results = es.search(index=index, doc_type=doc_type, body=query)
+    for hit in raw_results['hits']['hits']:
+        Node.load(hit['_source'].get('parent_id'))
+        # Don't let the object cache hide the per-hit reads
+        Node._clear_caches()
+
+
+def current_search(query, index, doc_type='_all'):
+    elastic_search.search(query, index=index, doc_type=doc_type)
+
+
+def timed(func, query, index, iterations):
+    timings = []
+    for _ in range(iterations):
+        start = time.time()
+        func(copy.deepcopy(query), index)
+        timings.append(time.time() - start)
+    timings.sort()
+    return {
+        'mean': sum(timings) / len(timings),
+        'p50': timings[len(timings) // 2],
+        'p95': timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+    }
+
+
+def main(term='*', iterations=50):
+    init_app(routes=False)
+    query = build_query(term, start=0, size=10)
+    index = elastic_search.INDEX
+    for name, func in [('before', legacy_search), ('after', current_search)]:
+        # Warm up connections and ES caches
+        func(copy.deepcopy(query), index)
+        stats = timed(func, query, index, iterations)
+        logger.info(
+            '{0:>6}: mean {mean:.4f}s  p50 {p50:.4f}s  p95 {p95:.4f}s'.format(name, **stats)
+        )
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    main(
+        term=args[0] if args else '*',
+        iterations=int(args[1]) if len(args) > 1 else 50,
+    )
@@ -0,0 +1,73 @@
+"""Recount the forks, registrations, templates, watchers, pointers and active
+children stored in Node.relation_counts, fixing counts that have drifted
+from the relations they summarize. Nodes without stored counts are filled in.
+
+Dry run: ::
+
+    python -m scripts.consistency.fix_relation_counts dry
+
+Real: ::
+
+    python -m scripts.consistency.fix_relation_counts
+"""
+import sys
+import logging
+
+from website import models
+from website.app import init_app
+from scripts import utils as scripts_utils
+
+
+logger = logging.getLogger(__name__)
+
+
+def find_bad_counts(node):
+    """Return a dict mapping each relation whose stored count is missing or
+    wrong to a pair of the stored and actual counts.
+    """
+    bad_counts = {}
+    for relation in models.Node.RELATION_COUNTS:
+        stored = node.relation_counts.get(relation)
+        actual = node._count_relation(relation)
+        if stored != actual:
+            bad_counts[relation] = (stored, actual)
+    return bad_counts
+
+
+def fix_relation_counts(dry_run=True):
+    """Check the counts of every node.
+
+    :return: Number of nodes with missing or wrong counts
+    """
+    count = 0
+    for node in models.Node.find():
+        bad_counts = find_bad_counts(node)
+        if not bad_counts:
+            continue
+        count += 1
+        logger.info(u'Node {0}: {1}'.format(
+            node._id,
+            ', '.join(
+                '{0} {1} -> {2}'.format(relation, stored, actual)
+                for relation, (stored, actual) in sorted(bad_counts.iteritems())
+            ),
+        ))
+        if not dry_run:
+            node.update_relation_counts(*bad_counts.keys())
+    return count
+
+
+def main(dry_run=True):
+    count = fix_relation_counts(dry_run=dry_run)
+    logger.info('{0} {1} nodes with missing or wrong relation counts'.format(
+        'Found' if dry_run else 'Fixed',
+        count,
+    ))
+
+
+if __name__ == '__main__':
+    dry_run = 'dry' in sys.argv
+    if not dry_run:
+        scripts_utils.add_file_logger(logger, __file__)
+    init_app(set_backends=True, routes=False)
+    main(dry_run=dry_run)
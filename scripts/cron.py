@@ -37,6 +37,9 @@ def main(dry_run=True):
     box.hour.on(2)
     box.minute.on(0)  # Daily 2:00 a.m.
 
+    oauth = ensure_item(cron, 'bash {}'.format(app_prefix('scripts/refresh_oauth_tokens.sh')))
+    oauth.minute.every(10)  # Every 10 minutes
+
     retractions = ensure_item(cron, 'bash {}'.format(app_prefix('scripts/retract_registrations.sh')))
     retractions.hour.on(0)
     retractions.minute.on(0)  # Daily 12 a.m.
@@ -0,0 +1,45 @@
+"""Populate Node.ancestor_ids for existing component trees. Walks down from
+every top-level node; children save in turn, so each subtree is filled in
+completely.
+
+    python -m scripts.migration.migrate_node_ancestor_ids [dry]
+"""
+
+import sys
+import logging
+
+from modularodm import Q
+
+from website import models
+from website.app import init_app
+from scripts import utils as scripts_utils
+from framework.transactions.context import TokuTransaction
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+def get_top_level_nodes():
+    return models.Node.find(
+        Q('__backrefs.parent.node.nodes', 'eq', None) &
+        Q('nodes', 'ne', [])
+    )
+
+
+def main():
+    init_app(routes=False)
+    dry_run = 'dry' in sys.argv
+    if not dry_run:
+        scripts_utils.add_file_logger(logger, __file__)
+    count = 0
+    for node in get_top_level_nodes():
+        count += 1
+        logger.info('Updating descendants of {!r}'.format(node))
+        if not dry_run:
+            with TokuTransaction():
+                node._update_child_ancestors()
+    logger.info('Done with {} top-level nodes'.format(count))
+
+
+if __name__ == '__main__':
+    main()
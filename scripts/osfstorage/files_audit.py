@@ -66,14 +66,25 @@ def delete_temp_file(version):
 def ensure_glacier(version, dry_run):
     if version.metadata.get('archive'):
         return
+    blob = version.blob
+    if blob and blob.archive:
+        # Same content already archived for another version
+        logger.info('Using Glacier archive of blob {0} for version {1}'.format(blob._id, version._id))
+        if not dry_run:
+            version.metadata['vault'] = blob.vault
+            version.metadata['archive'] = blob.archive
+            version.save()
+        return
     logger.warn('Glacier archive for version {0} not found'.format(version._id))
     if dry_run:
         return
     file_path = download_from_cloudfiles(version)
     if file_path:
         glacier_id = vault.upload_archive(file_path, description=version.location['object'])
+        version.metadata['vault'] = storage_settings.GLACIER_VAULT
         version.metadata['archive'] = glacier_id
         version.save()
+        model.OsfStorageBlob.record_archive(version)
 
 
 def check_parity_files(version):
@@ -83,7 +94,12 @@ def check_parity_files(version):
 
 
 def ensure_parity(version, dry_run):
+    blob = version.blob
+    if blob and blob.has_parity:
+        return
     if check_parity_files(version):
+        if blob and not dry_run:
+            model.OsfStorageBlob.record_parity(blob._id)
         return
     logger.warn('Parity files for version {0} not found'.format(version._id))
     if dry_run:
@@ -96,6 +112,8 @@ def ensure_parity(version, dry_run):
             os.remove(parity_path)
         if not check_parity_files(version):
             logger.error('Parity files for version {0} not found after update'.format(version._id))
+        elif blob:
+            model.OsfStorageBlob.record_parity(blob._id)
 
 
 def ensure_backups(version, dry_run):
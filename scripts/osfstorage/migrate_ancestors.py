@@ -0,0 +1,64 @@
+"""Populate OsfStorageFileNode.ancestors, which subtree lookups, moves, copies
+and deletes rely on, for existing file trees. Must be run before those
+operations are used on trees created before the field was added.
+
+    python -m scripts.osfstorage.migrate_ancestors [dry]
+"""
+import sys
+import logging
+
+from website.app import init_app
+from website.addons.osfstorage.model import OsfStorageFileNode
+from scripts import utils as scripts_utils
+
+
+logger = logging.getLogger(__name__)
+
+
+def migrate_tree(collection, root_id, dry_run=True):
+    """Set the ancestors of every node below `root_id`, one level at a time
+    and with one update per folder.
+
+    :return: Number of folders whose children were updated
+    """
+    count = 0
+    lineages = {root_id: [root_id]}
+    while lineages:
+        next_lineages = {}
+        for folder_id, lineage in lineages.iteritems():
+            count += 1
+            if not dry_run:
+                collection.update(
+                    {'parent': folder_id},
+                    {'$set': {'ancestors': lineage}},
+                    multi=True,
+                )
+        for child in collection.find(
+            {'parent': {'$in': lineages.keys()}, 'kind': 'folder'},
+            {'parent': True},
+        ):
+            next_lineages[child['_id']] = lineages[child['parent']] + [child['_id']]
+        lineages = next_lineages
+    return count
+
+
+def main(dry_run=True):
+    collection = OsfStorageFileNode._storage[0].store
+    roots = [
+        root['_id']
+        for root in collection.find({'parent': None}, {'_id': True})
+    ]
+    if not dry_run:
+        collection.update({'parent': None}, {'$set': {'ancestors': []}}, multi=True)
+    count = 0
+    for root_id in roots:
+        count += migrate_tree(collection, root_id, dry_run=dry_run)
+    logger.info('Migrated ancestors below {0} folders in {1} file trees'.format(count, len(roots)))
+
+
+if __name__ == '__main__':
+    dry_run = 'dry' in sys.argv
+    if not dry_run:
+        scripts_utils.add_file_logger(logger, __file__)
+    init_app(set_backends=True, routes=False)
+    main(dry_run=dry_run)
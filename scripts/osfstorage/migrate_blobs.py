@@ -0,0 +1,78 @@
+"""Build the OsfStorageBlob table from existing file versions, recording the
+number of versions sharing each sha256 and any Glacier backup of the content,
+then report the storage saved by deduplication. Safe to run repeatedly.
+
+    python -m scripts.osfstorage.migrate_blobs [dry]
+"""
+import sys
+import logging
+import itertools
+
+import pymongo
+
+from website.app import init_app
+from website.addons.osfstorage import model
+from scripts import utils as scripts_utils
+
+
+logger = logging.getLogger(__name__)
+
+
+def iter_version_groups():
+    """Yield lists of raw versions sharing a sha256, read in index order."""
+    versions = model.OsfStorageFileVersion._storage[0].store.find(
+        {'metadata.sha256': {'$exists': True}},
+        {'metadata': True, 'location': True, 'size': True, 'date_created': True},
+    ).sort('metadata.sha256', pymongo.ASCENDING)
+    for _, group in itertools.groupby(versions, lambda version: version['metadata']['sha256']):
+        yield list(group)
+
+
+def make_blob(versions):
+    """Build the raw blob of a group of versions with the same content."""
+    versions = sorted(versions, key=lambda version: version.get('date_created'))
+    first = versions[0]
+    blob = {
+        '_id': first['metadata']['sha256'],
+        'location': first['location'],
+        'size': first.get('size'),
+        'date_created': first.get('date_created'),
+        'ref_count': len(versions),
+    }
+    archived = [
+        version for version in versions
+        if version['metadata'].get('archive')
+    ]
+    if archived:
+        blob['vault'] = archived[0]['metadata'].get('vault')
+        blob['archive'] = archived[0]['metadata']['archive']
+    return blob
+
+
+def main(dry_run=True):
+    collection = model.OsfStorageBlob._storage[0].store
+    count = 0
+    for versions in iter_version_groups():
+        blob = make_blob(versions)
+        count += 1
+        if not dry_run:
+            # Keep parity state recorded by earlier runs of files_audit
+            collection.update(
+                {'_id': blob.pop('_id')},
+                {'$set': blob, '$setOnInsert': {'has_parity': False}},
+                upsert=True,
+            )
+    logger.info('Recorded {0} blobs'.format(count))
+    if not dry_run:
+        savings = model.OsfStorageBlob.get_savings()
+        logger.info(
+            '{blobs} blobs store {stored} bytes; deduplication saves {saved} bytes'.format(**savings)
+        )
+
+
+if __name__ == '__main__':
+    dry_run = 'dry' in sys.argv
+    if not dry_run:
+        scripts_utils.add_file_logger(logger, __file__)
+    init_app(set_backends=True, routes=False)
+    main(dry_run=dry_run)
@@ -0,0 +1,36 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""Refresh the OAuth access tokens of external accounts that expire within
+``OAUTH_REFRESH_AHEAD`` seconds, so that add-ons never wait on a refresh.
+Run every few minutes from cron.
+"""
+
+import sys
+import logging
+
+from scripts import utils as scripts_utils
+from website import settings
+from website.app import init_app
+from website.oauth import refresh
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO)
+
+
+def main(ahead, dry_run):
+    if dry_run:
+        for account_id in refresh.get_expiring_account_ids(ahead):
+            logger.info('Would refresh tokens on account {0}'.format(account_id))
+        return
+    counts = refresh.refresh_expiring_tokens(ahead=ahead)
+    logger.info(
+        'Refreshed {refreshed} tokens; skipped {skipped}; {failed} failed'.format(**counts)
+    )
+
+
+if __name__ == '__main__':
+    init_app(set_backends=True, routes=False)
+    dry_run = 'dry' in sys.argv
+    if not dry_run:
+        scripts_utils.add_file_logger(logger, __file__)
+    main(settings.OAUTH_REFRESH_AHEAD, dry_run=dry_run)
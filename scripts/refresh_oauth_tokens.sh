@@ -0,0 +1,10 @@
+#!/bin/bash
+
+TEMPDIR=`mktemp -d`
+trap "rm -rf $TEMPDIR" EXIT
+
+export HOME=$TEMPDIR
+cd /opt/apps/osf
+source /opt/data/envs/osf/bin/activate
+
+python -m scripts.refresh_oauth_tokens
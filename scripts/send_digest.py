@@ -2,13 +2,16 @@
 
 import datetime
 import logging
-from bson.code import Code
+import itertools
+
+import pymongo
 
 from modularodm import Q
 
 from framework import sentry
 from framework.auth.core import User
 from framework.mongo import database as db
+from framework.mongo.utils import bulk_load
 from framework.tasks import app as celery_app
 from scripts import utils as script_utils
 from website import mails
@@ -19,6 +22,8 @@ from website import settings
 
 
 logger = logging.getLogger(__name__)
+# Number of users whose digests are sent per batch of user lookups
+USER_BATCH_SIZE = 500
 # Silence loud internal mail logger
 SILENT_LOGGERS = [
     'website.mails',
@@ -43,35 +48,50 @@ def send_digest(grouped_digests):
     :param grouped_digests: digest notification messages from the past 24 hours grouped by user
     :return:
     """
-    for group in grouped_digests:
-        user = User.load(group['user_id'])
-        if not user:
-            sentry.log_exception()
-            sentry.log_message("A user with this username does not exist.")
-            return
-
-        info = group['info']
-        digest_notification_ids = [message['_id'] for message in info]
-        sorted_messages = group_messages_by_node(info)
-
-        if sorted_messages:
-            logger.info('Sending email digest to user {0!r}'.format(user))
-            mails.send_mail(
-                to_addr=user.username,
-                mimetype='html',
-                mail=mails.DIGEST,
-                name=user.fullname,
-                message=sorted_messages,
-                callback=remove_sent_digest_notifications.si(
-                    digest_notification_ids=digest_notification_ids
+    for groups in iter_chunks(grouped_digests, USER_BATCH_SIZE):
+        users = dict(
+            (user._id, user)
+            for user in bulk_load(User, [group['user_id'] for group in groups])
+        )
+        for group in groups:
+            user = users.get(group['user_id'])
+            if not user:
+                sentry.log_exception()
+                sentry.log_message("A user with this username does not exist.")
+                return
+
+            info = group['info']
+            digest_notification_ids = [message['_id'] for message in info]
+            sorted_messages = group_messages_by_node(info)
+
+            if sorted_messages:
+                logger.info('Sending email digest to user {0!r}'.format(user))
+                mails.send_mail(
+                    to_addr=user.username,
+                    mimetype='html',
+                    mail=mails.DIGEST,
+                    name=user.fullname,
+                    message=sorted_messages,
+                    callback=remove_sent_digest_notifications.si(
+                        digest_notification_ids=digest_notification_ids
+                    )
                 )
-            )
+
+
+def iter_chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
 
 
 @celery_app.task
 def remove_sent_digest_notifications(digest_notification_ids=None):
-    for digest_id in digest_notification_ids:
-        NotificationDigest.remove(Q('_id', 'eq', digest_id))
+    NotificationDigest.remove(Q('_id', 'in', digest_notification_ids or []))
 
 
 def group_messages_by_node(notifications):
@@ -82,8 +102,10 @@ def group_messages_by_node(notifications):
 
 
 def group_digest_notifications_by_user():
-    """ Group digest notification messages from the past 24 hours by user
-    :return: [{
+    """ Group digest notification messages from the past 24 hours by user.
+    Digests are streamed from a cursor sorted on the (user_id, timestamp)
+    index, so only one user's messages are held in memory at a time.
+    :return: iterator of {
                 'user_id': 'se8ea',
                 'info': [{
                     'message': {
@@ -94,31 +116,27 @@ def group_digest_notifications_by_user():
                     '_id': NotificationDigest._id
                 }, ...
                 }]
-              },
-              {
-                'user_id': ...
-              }]
+              }, ordered by user_id
     """
-    return db['notificationdigest'].group(
-        key={'user_id': 1},
-        condition={
-            'timestamp': {
-                '$lt': datetime.datetime.utcnow()
-            }
-        },
-        initial={'info': []},
-        reduce=Code(
-            """
-            function(curr, result) {
-                result.info.push({
-                    'message': curr.message,
-                    'node_lineage': curr.node_lineage,
-                    '_id': curr._id
-                });
-            };
-            """
-        )
-    )
+    digests = db['notificationdigest'].find(
+        {'timestamp': {'$lt': datetime.datetime.utcnow()}},
+        {'user_id': True, 'message': True, 'node_lineage': True},
+    ).sort([
+        ('user_id', pymongo.ASCENDING),
+        ('timestamp', pymongo.ASCENDING),
+    ])
+    for user_id, user_digests in itertools.groupby(digests, key=lambda digest: digest['user_id']):
+        yield {
+            'user_id': user_id,
+            'info': [
+                {
+                    'message': digest['message'],
+                    'node_lineage': digest['node_lineage'],
+                    '_id': digest['_id'],
+                }
+                for digest in user_digests
+            ],
+        }
 
 
 if __name__ == '__main__':
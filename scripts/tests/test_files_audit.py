@@ -6,6 +6,7 @@ from nose.tools import *  # noqa
 
 from tests.base import OsfTestCase
 from website.addons.osfstorage.tests.factories import FileVersionFactory
+from website.addons.osfstorage.model import OsfStorageBlob
 from scripts.osfstorage import settings as storage_settings
 from scripts.osfstorage.files_audit import ensure_parity, ensure_glacier, download_from_cloudfiles
 
@@ -70,3 +71,22 @@ class TestFilesAudit(OsfTestCase):
         ensure_parity(version, dry_run=False)
         assert_false(mock_download.called)
         assert_false(mock_container.create.called)
+
+    @mock.patch('scripts.osfstorage.files_audit.download_from_cloudfiles')
+    @mock.patch('scripts.osfstorage.files_audit.vault')
+    def test_ensure_glacier_uses_blob_archive(self, mock_vault, mock_download):
+        archived = FileVersionFactory(metadata={'sha256': 'shared', 'vault': 'the cloud', 'archive': 'erchiv'})
+        OsfStorageBlob.add_reference(archived)
+        version = FileVersionFactory(metadata={'sha256': 'shared'})
+        ensure_glacier(version, dry_run=False)
+        assert_false(mock_vault.upload_archive.called)
+        version.reload()
+        assert_equal(version.metadata['archive'], 'erchiv')
+
+    @mock.patch('scripts.osfstorage.files_audit.container_parity')
+    def test_ensure_parity_skips_known_blob(self, mock_container):
+        version = FileVersionFactory(metadata={'sha256': 'shared'})
+        OsfStorageBlob.add_reference(version)
+        OsfStorageBlob.record_parity('shared')
+        ensure_parity(version, dry_run=False)
+        assert_false(mock_container.list_all.called)
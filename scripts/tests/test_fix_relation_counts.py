@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+from nose.tools import *  # noqa
+
+from tests.base import OsfTestCase
+from tests.factories import ProjectFactory, NodeFactory
+
+from website.models import Node
+from scripts.consistency.fix_relation_counts import find_bad_counts, fix_relation_counts
+
+
+class TestFixRelationCounts(OsfTestCase):
+
+    def setUp(self):
+        super(TestFixRelationCounts, self).setUp()
+        self.project = ProjectFactory()
+        NodeFactory(parent=self.project)
+        self.project.update_relation_counts()
+        Node._storage[0].store.update(
+            {'_id': self.project._id},
+            {'$set': {'relation_counts.children': 5}},
+        )
+        Node._clear_caches(self.project._id)
+
+    def test_find_bad_counts(self):
+        project = Node.load(self.project._id)
+        assert_equal(find_bad_counts(project), {'children': (5, 1)})
+
+    def test_fix_relation_counts(self):
+        fix_relation_counts(dry_run=False)
+        Node._clear_caches(self.project._id)
+        assert_equal(Node.load(self.project._id).relation_counts['children'], 1)
+
+    def test_dry_run(self):
+        fix_relation_counts(dry_run=True)
+        Node._clear_caches(self.project._id)
+        assert_equal(Node.load(self.project._id).relation_counts['children'], 5)
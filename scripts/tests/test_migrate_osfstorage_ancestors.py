@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+from nose.tools import *  # noqa
+
+from tests.base import OsfTestCase
+from tests.factories import ProjectFactory
+
+from website.addons.osfstorage.model import OsfStorageFileNode
+from scripts.osfstorage.migrate_ancestors import main
+
+
+class TestMigrateAncestors(OsfTestCase):
+
+    def setUp(self):
+        super(TestMigrateAncestors, self).setUp()
+        self.project = ProjectFactory()
+        self.root = self.project.get_addon('osfstorage').root_node
+        self.folder = self.root.append_folder('Cloud')
+        self.child = self.folder.append_file('Carp')
+        OsfStorageFileNode._storage[0].store.update(
+            {}, {'$unset': {'ancestors': True}}, multi=True,
+        )
+
+    def test_migrate_ancestors(self):
+        main(dry_run=False)
+        self.child.reload()
+        self.folder.reload()
+        assert_equal(self.folder.ancestors, [self.root._id])
+        assert_equal(self.child.ancestors, [self.root._id, self.folder._id])
+
+    def test_dry_run(self):
+        main(dry_run=True)
+        self.child.reload()
+        assert_false(self.child.ancestors)
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+from nose.tools import *  # noqa
+
+from tests.base import OsfTestCase
+
+from website.addons.osfstorage.model import OsfStorageBlob
+from website.addons.osfstorage.tests.factories import FileVersionFactory
+from scripts.osfstorage.migrate_blobs import main
+
+
+class TestMigrateBlobs(OsfTestCase):
+
+    def setUp(self):
+        super(TestMigrateBlobs, self).setUp()
+        FileVersionFactory(size=10, metadata={'sha256': 'shared'})
+        FileVersionFactory(size=10, metadata={'sha256': 'shared', 'vault': 'the cloud', 'archive': 'erchiv'})
+        FileVersionFactory(size=5, metadata={'sha256': 'unique'})
+        FileVersionFactory(size=5)
+
+    def test_migrate_blobs(self):
+        main(dry_run=False)
+        shared = OsfStorageBlob.load('shared')
+        assert_equal(shared.ref_count, 2)
+        assert_equal(shared.archive, 'erchiv')
+        assert_false(shared.has_parity)
+        assert_equal(OsfStorageBlob.load('unique').ref_count, 1)
+        assert_equal(OsfStorageBlob.find().count(), 2)
+        assert_equal(OsfStorageBlob.get_savings(), {'blobs': 2, 'stored': 15, 'saved': 10})
+
+    def test_migrate_blobs_twice(self):
+        main(dry_run=False)
+        main(dry_run=False)
+        assert_equal(OsfStorageBlob.load('shared').ref_count, 2)
+
+    def test_dry_run(self):
+        main(dry_run=True)
+        assert_equal(OsfStorageBlob.find().count(), 0)
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+
+import datetime
+
+import mock
+from nose.tools import *  # noqa
+
+from tests.base import OsfTestCase
+from tests.factories import ExternalAccountFactory
+
+from website.oauth.models import ExternalAccount
+
+from scripts.refresh_oauth_tokens import main
+
+
+class TestRefreshOAuthTokens(OsfTestCase):
+
+    def setUp(self):
+        super(TestRefreshOAuthTokens, self).setUp()
+        self.account = ExternalAccountFactory(
+            refresh_token='refresh_token',
+            expires_at=datetime.datetime.utcnow() + datetime.timedelta(minutes=10),
+        )
+
+    def tearDown(self):
+        super(TestRefreshOAuthTokens, self).tearDown()
+        ExternalAccount.remove()
+
+    @mock.patch('scripts.refresh_oauth_tokens.refresh.refresh_expiring_tokens')
+    def test_dry_run(self, mock_refresh):
+        main(30 * 60, dry_run=True)
+        assert_false(mock_refresh.called)
+
+    @mock.patch('scripts.refresh_oauth_tokens.refresh.refresh_expiring_tokens')
+    def test_refresh(self, mock_refresh):
+        mock_refresh.return_value = {'refreshed': 1, 'skipped': 0, 'failed': 0}
+        main(30 * 60, dry_run=False)
+        mock_refresh.assert_called_once_with(ahead=30 * 60)
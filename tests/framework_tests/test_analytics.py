@@ -5,14 +5,21 @@ Unit tests for analytics logic in framework/analytics/__init__.py
 
 import unittest
 
+import mock
+
 from nose.tools import *  # flake8: noqa  (PEP8 asserts)
 from flask import Flask
 
 from datetime import datetime
 
 from framework import analytics, sessions
+from framework.analytics.bloom import BloomFilter
+from framework.analytics.buffer import CounterBuffer
 from framework.sessions import session
 
+from website import settings
+from website.app import attach_handlers
+
 from tests.base import OsfTestCase
 from tests.factories import UserFactory, ProjectFactory
 
@@ -48,8 +55,10 @@ class UpdateCountersTestCase(OsfTestCase):
         self.ctx.push()
         # TODO: Think of something better @sloria @jmcarp
         sessions.set_session(sessions.Session())
+        analytics.flush_counters(db=self.db)
 
     def tearDown(self):
+        analytics.flush_counters(db=self.db)
         self.ctx.pop()
 
 
@@ -75,9 +84,6 @@ class TestUpdateCounters(UpdateCountersTestCase):
         count = analytics.get_basic_counters('download:{0}:{1}'.format(self.node, self.fid), db=self.db)
         assert_equal(count, (1, 1))
 
-        page = 'download:{0}:{1}'.format(self.node, self.fid)
-
-        session.data['visited'].append(page)
         download_file_(node=self.node, fid=self.fid)
 
         count = analytics.get_basic_counters('download:{0}:{1}'.format(self.node, self.fid), db=self.db)
@@ -96,9 +102,6 @@ class TestUpdateCounters(UpdateCountersTestCase):
         count = analytics.get_basic_counters('download:{0}:{1}:{2}'.format(self.node, self.fid, self.vid), db=self.db)
         assert_equal(count, (1, 1))
 
-        page = 'download:{0}:{1}:{2}'.format(self.node, self.fid, self.vid)
-
-        session.data['visited'].append(page)
         download_file_version_(node=self.node, fid=self.fid, vid=self.vid)
 
         count = analytics.get_basic_counters('download:{0}:{1}:{2}'.format(self.node, self.fid, self.vid), db=self.db)
@@ -116,6 +119,56 @@ class TestUpdateCounters(UpdateCountersTestCase):
         count = analytics.get_basic_counters(page, db=self.db)
         assert_equal(count, (3, 5))
 
+    def test_get_basic_counters_bulk(self):
+        stored = 'node:{0}'.format(self.node._id)
+        pending = 'node:{0}:pending'.format(self.node._id)
+        missing = 'node:{0}:missing'.format(self.node._id)
+        self.db['pagecounters'].update({'_id': stored}, {'$inc': {'total': 5, 'unique': 3}}, True, False)
+        analytics.update_counter(pending, db=self.db)
+        counts = analytics.get_basic_counters_bulk([stored, pending, missing], db=self.db)
+        assert_equal(counts, {
+            stored: (3, 5),
+            pending: (1, 1),
+            missing: (None, None),
+        })
+
+    def test_update_counters_buffers_writes(self):
+        page = 'node:{0}'.format(self.node._id)
+        analytics.update_counter(page, db=self.db)
+        analytics.update_counter(page, db=self.db)
+        assert_is_none(self.db['pagecounters'].find_one({'_id': page}))
+        assert_equal(analytics.get_basic_counters(page, db=self.db), (1, 2))
+
+        analytics.flush_counters(db=self.db)
+        result = self.db['pagecounters'].find_one({'_id': page})
+        assert_equal(result['unique'], 1)
+        assert_equal(result['total'], 2)
+        assert_equal(analytics.get_basic_counters(page, db=self.db), (1, 2))
+
+    def test_update_counter_does_not_flush(self):
+        # Flushing inside the request would write other requests' increments
+        # in this request's transaction, losing them if it is rolled back
+        page = 'node:{0}'.format(self.node._id)
+        other = 'node:{0}:other'.format(self.node._id)
+        analytics.page_counters.add(other, {'total': 1})
+        with mock.patch.object(analytics.page_counters, 'max_events', 1):
+            analytics.update_counter(page, db=self.db)
+        assert_is_none(self.db['pagecounters'].find_one({'_id': other}))
+        assert_equal(analytics.page_counters.pending(other), {'total': 1})
+
+        with mock.patch.object(analytics.page_counters, 'max_events', 1):
+            analytics.teardown_request(Exception())
+        assert_equal(analytics.page_counters.pending(other), {})
+        assert_equal(analytics.get_basic_counters(other)[1], 1)
+
+    def test_update_counters_migrates_legacy_visited(self):
+        page = 'node:{0}'.format(self.node._id)
+        session.data['visited'] = [page]
+        analytics.update_counter(page, db=self.db)
+        assert_not_in('visited', session.data)
+        assert_in(page, BloomFilter(data=session.data['visited_bloom']))
+        assert_equal(analytics.get_basic_counters(page, db=self.db), (0, 1))
+
     @unittest.skip('Reverted the fix for #2281. Unskip this once we use GUIDs for keys in the download counts collection')
     def test_update_counters_different_files(self):
         # Regression test for https://github.com/CenterForOpenScience/osf.io/issues/2281
@@ -133,9 +186,6 @@ class TestUpdateCounters(UpdateCountersTestCase):
         count = analytics.get_basic_counters('download:{0}:{1}'.format(self.node, fid2), db=self.db)
         assert_equal(count, (None, None))
 
-        page = 'download:{0}:{1}'.format(self.node, fid1)
-
-        session.data['visited'].append(page)
         download_file_(node=self.node, fid=fid1)
         download_file_(node=self.node, fid=fid2)
 
@@ -143,3 +193,62 @@ class TestUpdateCounters(UpdateCountersTestCase):
         assert_equal(count, (1, 2))
         count = analytics.get_basic_counters('download:{0}:{1}'.format(self.node, fid2), db=self.db)
         assert_equal(count, (1, 1))
+
+
+class TestBloomFilter(unittest.TestCase):
+
+    def test_add(self):
+        bloom = BloomFilter()
+        assert_true(bloom.add('node:abc12'))
+        assert_false(bloom.add('node:abc12'))
+        assert_in('node:abc12', bloom)
+        assert_not_in('node:def34', bloom)
+
+    def test_serialize(self):
+        bloom = BloomFilter()
+        bloom.add(u'download:abc12:caf\xe9')
+        loaded = BloomFilter(data=bloom.serialize())
+        assert_in(u'download:abc12:caf\xe9', loaded)
+
+    def test_size_mismatch_resets(self):
+        bloom = BloomFilter(size=1024)
+        bloom.add('node:abc12')
+        loaded = BloomFilter(size=2048, data=bloom.serialize())
+        assert_not_in('node:abc12', loaded)
+
+
+class TestCounterBuffer(OsfTestCase):
+
+    def test_coalesces_increments(self):
+        buffer = CounterBuffer('pagecounters', max_events=3, max_age=60)
+        buffer.add('node:abc12', {'total': 1, 'unique': 1})
+        buffer.add('node:abc12', {'total': 1})
+        assert_equal(buffer.pending('node:abc12'), {'total': 2, 'unique': 1})
+        assert_false(buffer.is_due())
+        buffer.add('node:def34', {'total': 1})
+        assert_true(buffer.is_due())
+
+        buffer.flush_if_due(self.db)
+        assert_equal(buffer.pending('node:abc12'), {})
+        result = self.db['pagecounters'].find_one({'_id': 'node:abc12'})
+        assert_equal(result['total'], 2)
+        assert_equal(result['unique'], 1)
+
+    def test_flush_failure_requeues(self):
+        buffer = CounterBuffer('pagecounters', max_events=1, max_age=60)
+        buffer.add('node:abc12', {'total': 1})
+        with mock.patch('pymongo.collection.Collection.update', side_effect=Exception):
+            assert_equal(buffer.flush(self.db), 0)
+        assert_equal(buffer.pending('node:abc12'), {'total': 1})
+
+    def test_flushed_after_rollback_on_error(self):
+        # Counters buffered from other requests must not be written inside a
+        # transaction that is about to be rolled back
+        app = Flask(__name__)
+        attach_handlers(app, settings)
+        calls = mock.Mock()
+        with mock.patch('framework.transactions.commands.rollback', calls.rollback), \
+                mock.patch.object(analytics.page_counters, 'flush_if_due', calls.flush_if_due):
+            with app.test_request_context('/'):
+                app.do_teardown_request(Exception())
+        assert_equal(calls.mock_calls, [mock.call.rollback(), mock.call.flush_if_due()])
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+
+import mock
+from nose.tools import *  # noqa
+from pymongo.errors import ConnectionFailure
+
+from framework.auth import Auth, User
+from framework.mongo import handlers
+from framework.mongo.utils import bulk_load, prefetch
+
+from tests.base import OsfTestCase
+from tests.factories import NodeFactory, ProjectFactory, UserFactory
+
+
+class TestClientPool(OsfTestCase):
+
+    def setUp(self):
+        super(TestClientPool, self).setUp()
+        self.pool = handlers.ClientPool(pool_size=5, health_check_interval=30)
+
+    def tearDown(self):
+        super(TestClientPool, self).tearDown()
+        self.pool.reset()
+
+    def test_client_is_shared(self):
+        assert_is(self.pool.client, self.pool.client)
+
+    @mock.patch('framework.mongo.handlers.os.getpid')
+    def test_client_rebuilt_after_fork(self, mock_getpid):
+        mock_getpid.return_value = 1
+        parent_client = self.pool.client
+        mock_getpid.return_value = 2
+        assert_is_not(self.pool.client, parent_client)
+
+    def test_acquire_records_stats(self):
+        client = self.pool.acquire()
+        self.pool.release(client)
+        assert_equal(self.pool.stats['acquired'], 1)
+        assert_greater_equal(self.pool.stats['wait_max'], 0)
+
+    def test_health_check_reconnects(self):
+        client = self.pool.client
+        self.pool._last_check = 0
+        with mock.patch('pymongo.database.Database.command', side_effect=ConnectionFailure):
+            self.pool.check_health()
+        assert_equal(self.pool.stats['reconnects'], 1)
+        assert_is_not(self.pool.client, client)
+
+    def test_health_check_skipped_within_interval(self):
+        client = self.pool.client
+        with mock.patch('pymongo.database.Database.command') as mock_command:
+            self.pool.check_health()
+        assert_false(mock_command.called)
+        assert_is(self.pool.client, client)
+
+
+class TestPrefetch(OsfTestCase):
+
+    def setUp(self):
+        super(TestPrefetch, self).setUp()
+        self.project = ProjectFactory()
+        self.contributor = UserFactory()
+        self.project.add_contributor(self.contributor, save=True)
+        self.child = NodeFactory(parent=self.project)
+        self.project.add_pointer(ProjectFactory(), Auth(self.project.creator), save=True)
+
+    @mock.patch('framework.mongo.utils.bulk_load')
+    def test_one_query_per_collection(self, mock_bulk_load):
+        mock_bulk_load.return_value = []
+        prefetch([self.project], 'contributors', 'nodes')
+        schemas = sorted(call[0][0]._name for call in mock_bulk_load.call_args_list)
+        assert_equal(schemas, ['node', 'pointer', 'user'])
+
+    def test_keys_collected_from_storage(self):
+        with mock.patch('framework.mongo.utils.bulk_load') as mock_bulk_load:
+            mock_bulk_load.return_value = []
+            prefetch([self.project], 'contributors')
+        keys = mock_bulk_load.call_args[0][1]
+        assert_equal(
+            set(keys),
+            {self.project.creator._id, self.contributor._id},
+        )
+
+    def test_nested_paths(self):
+        prefetch([self.project], 'nodes.contributors', 'nodes.node')
+        assert_equal(len(self.project.nodes), 2)
+
+    def test_skips_objects_without_field(self):
+        pointer = self.project.nodes[1]
+        with mock.patch('framework.mongo.utils.bulk_load') as mock_bulk_load:
+            prefetch([pointer], 'contributors')
+        assert_false(mock_bulk_load.called)
+
+    def test_bulk_load_reuses_cached_objects(self):
+        loaded = bulk_load(User, [self.contributor._id])
+        assert_equal(loaded, [self.contributor])
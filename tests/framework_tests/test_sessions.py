@@ -1,6 +1,16 @@
+import datetime
+import unittest
+
+import mock
+import itsdangerous
+from flask import Flask, Response
 from nose.tools import *
+from modularodm import Q
 
-from framework.sessions import utils
+from framework import sessions
+from framework.sessions import utils, model
+from framework.sessions.cache import SessionCache
+from website import settings
 from tests import factories
 from tests.base import DbTestCase
 from website.models import User
@@ -34,3 +44,133 @@ class SessionUtilsTestCase(DbTestCase):
 
         utils.remove_sessions_for_user(self.user)
         assert_equal(1, Session.find().count())
+
+
+class TestSessionCache(unittest.TestCase):
+
+    def test_lru_eviction(self):
+        cache = SessionCache(size=2, ttl=60)
+        cache.set('a', {'_id': 'a'})
+        cache.set('b', {'_id': 'b'})
+        cache.get('a')
+        cache.set('c', {'_id': 'c'})
+        assert_equal(cache.get('a'), {'_id': 'a'})
+        assert_is_none(cache.get('b'))
+        assert_equal(len(cache), 2)
+
+    def test_ttl(self):
+        cache = SessionCache(size=2, ttl=60)
+        with mock.patch('framework.sessions.cache.time.time', return_value=0):
+            cache.set('a', {'_id': 'a'})
+        with mock.patch('framework.sessions.cache.time.time', return_value=61):
+            assert_is_none(cache.get('a'))
+
+    def test_get_returns_copy(self):
+        cache = SessionCache(size=2, ttl=60)
+        cache.set('a', {'data': {'foo': 'bar'}})
+        cache.get('a')['data']['foo'] = 'baz'
+        assert_equal(cache.get('a'), {'data': {'foo': 'bar'}})
+
+
+class TestSessionRequests(DbTestCase):
+
+    def setUp(self):
+        super(TestSessionRequests, self).setUp()
+        self.user = factories.UserFactory()
+        self.session = factories.SessionFactory(user=self.user)
+        self.cookie = itsdangerous.Signer(settings.SECRET_KEY).sign(self.session._id)
+        self.app = Flask(__name__)
+        model.session_cache.clear()
+
+    def tearDown(self):
+        super(TestSessionRequests, self).tearDown()
+        User.remove()
+        Session.remove()
+
+    def request_context(self, cookie=None):
+        cookies = {settings.COOKIE_NAME: cookie} if cookie else {}
+        environ = {'HTTP_COOKIE': '; '.join('{0}={1}'.format(*item) for item in cookies.items())}
+        return self.app.test_request_context(environ_base=environ)
+
+    def test_session_loaded_lazily(self):
+        with self.request_context(self.cookie):
+            with mock.patch.object(Session, 'load_cached') as mock_load:
+                sessions.before_request()
+                sessions.after_request(Response())
+            assert_false(mock_load.called)
+
+    def test_unchanged_session_not_saved(self):
+        with self.request_context(self.cookie):
+            sessions.before_request()
+            assert_equal(sessions.session.data['auth_user_id'], self.user._id)
+            with mock.patch.object(Session, 'save') as mock_save:
+                sessions.after_request(Response())
+            assert_false(mock_save.called)
+
+    def test_changed_session_saved(self):
+        with self.request_context(self.cookie):
+            sessions.before_request()
+            sessions.session.data['foo'] = 'bar'
+            sessions.after_request(Response())
+        model.session_cache.clear()
+        Session._clear_caches()
+        assert_equal(Session.load(self.session._id).data['foo'], 'bar')
+
+    def test_cached_session_reads_modification_date_only(self):
+        Session.load_cached(self.session._id)
+        collection = Session._storage[0].store
+        with mock.patch.object(collection, 'find_one', wraps=collection.find_one) as mock_find:
+            session = Session.load_cached(self.session._id)
+        mock_find.assert_called_once_with({'_id': self.session._id}, {'date_modified': True})
+        assert_equal(session.data['auth_user_id'], self.user._id)
+
+    def test_cached_session_changed_elsewhere(self):
+        # e.g. OAuth state stored by a request handled by another process
+        Session.load_cached(self.session._id)
+        Session._storage[0].store.update(
+            {'_id': self.session._id},
+            {'$set': {
+                'data.oauth_states': {'mock2': {'state': 'abc'}},
+                'date_modified': datetime.datetime.utcnow() + datetime.timedelta(seconds=1),
+            }},
+        )
+        session = Session.load_cached(self.session._id)
+        assert_equal(session.data['oauth_states'], {'mock2': {'state': 'abc'}})
+
+    def test_cached_session_removed_elsewhere(self):
+        # e.g. logout or a password change handled by another process
+        Session.load_cached(self.session._id)
+        Session._storage[0].store.remove({'_id': self.session._id})
+        assert_is_none(Session.load_cached(self.session._id))
+
+    def test_save_invalidates_cache(self):
+        Session.load_cached(self.session._id)
+        self.session.data['foo'] = 'bar'
+        self.session.save()
+        assert_is_none(model.session_cache.get(self.session._id))
+
+    def test_remove_invalidates_cache(self):
+        other = factories.SessionFactory(user=self.user)
+        Session.load_cached(self.session._id)
+        Session.load_cached(other._id)
+        Session.remove(Q('_id', 'eq', self.session._id))
+        assert_is_none(model.session_cache.get(self.session._id))
+        assert_is_not_none(model.session_cache.get(other._id))
+        assert_is_none(Session.load_cached(self.session._id))
+
+    @mock.patch('website.settings.SESSION_CLIENT_SIDE', True)
+    def test_client_side_session(self):
+        response = Response()
+        with self.request_context():
+            sessions.before_request()
+            sessions.session.data['visited_bloom'] = 'abc'
+            sessions.after_request(response)
+        cookie = response.headers['Set-Cookie'].split(';')[0].split('=', 1)[1]
+        assert_equal(Session.find().count(), 1)
+
+        with self.app.test_request_context(environ_base={
+            'HTTP_COOKIE': '{0}={1}'.format(settings.SESSION_CLIENT_COOKIE_NAME, cookie),
+        }):
+            sessions.before_request()
+            assert_equal(sessions.session.data, {'visited_bloom': 'abc'})
+            assert_false(sessions.session.is_dirty)
@@ -4,6 +4,8 @@ import functools
 import json
 import logging
 import itertools
+import time
+import unittest
 
 import celery
 import mock  # noqa
@@ -11,15 +13,18 @@ from contextlib import nested
 from mock import call
 from nose.tools import *  # noqa PEP8 asserts
 import httpretty
+import requests
 from modularodm import Q
 
 from scripts import cleanup_failed_registrations as scripts
 
 from framework.auth import Auth
+from framework.auth import signing
 from framework.tasks import handlers
 
 from website.archiver import (
     ARCHIVER_INITIATED,
+    ARCHIVER_PENDING,
     ARCHIVER_SUCCESS,
     ARCHIVER_FAILURE,
     ARCHIVER_NETWORK_ERROR,
@@ -38,6 +43,7 @@ from website import settings
 from website.util import waterbutler_url_for
 from website.project.model import Node, NodeLog
 from website.addons.base import StorageAddonBase
+from website.addons.base.crawler import RateLimiter
 from website.util import api_url_for
 
 from tests import factories
@@ -82,7 +88,7 @@ class MockAddon(mock.MagicMock, StorageAddonBase):
 
     complete = True
 
-    def _get_file_tree(self, user, version):
+    def _get_file_tree(self, user, version, **kwargs):
         return FILE_TREE
 
     def after_register(self, *args):
@@ -187,6 +193,17 @@ class TestStorageAddonBase(ArchiverTestCase):
         assert_equal(FILE_TREE, file_tree)
         assert_equal(requests_made, ['/', '/qwerty'])  # no requests made for files
 
+    @mock.patch('website.addons.base.crawler.FileTreeCrawler.crawl')
+    def test_get_file_tree_streams_folders(self, mock_crawl):
+        def crawl(root, on_folder):
+            on_folder(root, [{'path': '/foo', 'name': 'foo', 'kind': 'file', 'size': 1}])
+        mock_crawl.side_effect = crawl
+        addon = self.src.get_or_add_addon('osfstorage', auth=self.auth)
+        on_folder = mock.Mock()
+        file_tree = addon._get_file_tree(user=self.user, on_folder=on_folder)
+        assert_equal(file_tree['children'], [{'path': '/foo', 'name': 'foo', 'kind': 'file', 'size': 1}])
+        on_folder.assert_called_once_with(file_tree, file_tree['children'])
+
     def _test_addon(self, addon_short_name):
         self._test__get_file_tree(addon_short_name)
 
@@ -195,6 +212,50 @@ class TestStorageAddonBase(ArchiverTestCase):
         for addon in [a for a in settings.ADDONS_ARCHIVABLE if a not in ['wiki']]:
             self._test_addon(addon)
 
+class TestFileTreeStatBuilder(ArchiverTestCase):
+
+    def _stream(self, builder, folder):
+        children = [
+            dict((key, value) for key, value in child.items() if key != 'children')
+            for child in folder.get('children', [])
+        ]
+        builder.add_folder(folder, children)
+        for child in folder.get('children', []):
+            if child['kind'] == 'folder':
+                self._stream(builder, child)
+
+    def test_matches_aggregate_file_tree_metadata(self):
+        builder = archiver_utils.FileTreeStatBuilder('dropbox', self.user)
+        self._stream(builder, FILE_TREE)
+        expected = archiver_utils.aggregate_file_tree_metadata('dropbox', FILE_TREE, self.user)
+        assert_equal(builder.finish(FILE_TREE)._to_dict(), expected._to_dict())
+
+    def test_reports_progress(self):
+        progress = mock.Mock()
+        builder = archiver_utils.FileTreeStatBuilder('dropbox', self.user, progress=progress, interval=2)
+        self._stream(builder, FILE_TREE)
+        progress.assert_called_once_with(num_folders=2, num_files=2, disk_usage=128 + 256)
+
+    def test_finish_without_streamed_folders(self):
+        builder = archiver_utils.FileTreeStatBuilder('dropbox', self.user)
+        expected = archiver_utils.aggregate_file_tree_metadata('dropbox', FILE_TREE, self.user)
+        assert_equal(builder.finish(FILE_TREE)._to_dict(), expected._to_dict())
+
+
+class TestRateLimiter(unittest.TestCase):
+
+    @mock.patch('website.addons.base.crawler.time')
+    def test_spaces_out_calls(self, mock_time):
+        mock_time.time.return_value = 100
+        limiter = RateLimiter(rate=4)
+        for _ in range(3):
+            limiter.wait()
+        assert_equal(
+            [call[0][0] for call in mock_time.sleep.call_args_list],
+            [0.25, 0.5],
+        )
+
+
 class TestArchiverTasks(ArchiverTestCase):
 
     @use_fake_addons
@@ -254,7 +315,7 @@ class TestArchiverTasks(ArchiverTestCase):
     def test_archive_node_does_not_archive_empty_addons(self, mock_archive_addon):
         with mock.patch.object(self.src, 'get_addon') as mock_get_addon:
             mock_addon = MockAddon()
-            def empty_file_tree(user, version):
+            def empty_file_tree(user, version, **kwargs):
                 return {
                     'path': '/',
                     'kind': 'folder',
@@ -286,31 +347,162 @@ class TestArchiverTasks(ArchiverTestCase):
         assert(mock_group.called_with(archive_dropbox_signature))
 
     @use_fake_addons
-    @mock.patch('website.archiver.tasks.make_copy_request.delay')
-    def test_archive_addon(self, mock_make_copy_request):
-        result = archiver_utils.aggregate_file_tree_metadata('dropbox', FILE_TREE, self.user)
+    @mock.patch('website.archiver.tasks.archive_batch.delay')
+    def test_archive_addon(self, mock_archive_batch):
+        result = AggregateStatResult(
+            'dropbox_id', 'dropbox',
+            targets=[archiver_utils.aggregate_file_tree_metadata('dropbox', FILE_TREE, self.user)],
+        )
         archive_addon('dropbox', self.archive_job._id, result)
+        target = self.archive_job.get_target('dropbox')
+        assert_equal(target.status, ARCHIVER_INITIATED)
+        assert_equal(len(target.batches), 1)
+        assert_equal(target.batches[0]['path'], '/')
+        assert_equal(target.batches[0]['name'], 'Some Archive')
+        assert_equal(target.batches[0]['status'], ARCHIVER_PENDING)
+        mock_archive_batch.assert_called_once_with(
+            addon_short_name='dropbox',
+            job_pk=self.archive_job._id,
+            batch_id='0',
+        )
+
+    @use_fake_addons
+    @mock.patch('website.archiver.tasks.archive_batch.delay')
+    def test_archive_addon_resumes(self, mock_archive_batch):
+        target = self.archive_job.get_target('dropbox')
+        target.batches = archiver_utils.plan_archive_batches(
+            archiver_utils.aggregate_file_tree_metadata('dropbox', FILE_TREE, self.user),
+            'Some Archive',
+            max_files=1,
+        )
+        target.batches[0]['status'] = ARCHIVER_SUCCESS
+        target.batches[0]['destination'] = '/archive/'
+        target.batches[1]['status'] = ARCHIVER_SUCCESS
+        target.batches[2]['status'] = ARCHIVER_PENDING
+        target.save()
+        archive_addon('dropbox', self.archive_job._id, None)
+        # Only the batch that was in flight is started again
+        mock_archive_batch.assert_called_once_with(
+            addon_short_name='dropbox',
+            job_pk=self.archive_job._id,
+            batch_id='2',
+        )
+
+
+class TestArchiveBatches(ArchiverTestCase):
+
+    def setUp(self):
+        super(TestArchiveBatches, self).setUp()
+        self.target = self.archive_job.get_target('dropbox')
+        self.target.batches = archiver_utils.plan_archive_batches(
+            archiver_utils.aggregate_file_tree_metadata('dropbox', FILE_TREE, self.user),
+            'Some Archive',
+            max_files=1,
+        )
+        self.target.save()
+
+    def test_plan_archive_batches(self):
+        assert_equal(
+            [(batch['kind'], batch['path'], batch['name'], batch['parent']) for batch in self.target.batches],
+            [
+                ('folder', '/', 'Some Archive', None),
+                ('copy', '/1234567', 'Afile.file', '0'),
+                ('copy', '/qwerty', 'A Folder', '0'),
+            ],
+        )
+
+    def test_plan_archive_batches_without_split(self):
+        batches = archiver_utils.plan_archive_batches(
+            archiver_utils.aggregate_file_tree_metadata('dropbox', FILE_TREE, self.user),
+            'Some Archive',
+            max_files=1,
+            split=False,
+        )
+        assert_equal(len(batches), 1)
+        assert_equal(batches[0]['num_files'], 2)
+
+    def test_ready_batches_wait_for_parent(self):
+        assert_equal([batch['id'] for batch in self.target.ready_batches()], ['0'])
+        self.archive_job.update_batch('dropbox', '0', status=ARCHIVER_SUCCESS, destination='/archive/')
+        assert_equal([batch['id'] for batch in self.target.ready_batches()], ['1', '2'])
+
+    def test_claim_batch_once(self):
+        assert_true(self.archive_job.claim_batch('dropbox', '0'))
+        assert_false(self.archive_job.claim_batch('dropbox', '0'))
+
+    def test_target_succeeds_with_all_batches(self):
+        for batch_id in ['0', '1']:
+            self.archive_job.update_batch('dropbox', batch_id, status=ARCHIVER_SUCCESS)
+        assert_equal(self.target.status, ARCHIVER_INITIATED)
+        self.archive_job.update_batch('dropbox', '2', status=ARCHIVER_SUCCESS)
+        assert_equal(self.target.status, ARCHIVER_SUCCESS)
+
+    @use_fake_addons
+    @mock.patch('website.archiver.tasks.archive_batch.delay')
+    @mock.patch('website.archiver.tasks.requests.post')
+    def test_archive_batch_creates_folder_then_children(self, mock_post, mock_archive_batch):
+        mock_post.return_value = mock.Mock(status_code=201, json=lambda: {'data': {'path': '/archive/'}})
+        self.archive_job.claim_batch('dropbox', '0')
+        archive_batch('dropbox', self.archive_job._id, '0')
+        assert_equal(self.target.get_batch('0')['destination'], '/archive/')
+        assert_equal(mock_archive_batch.call_count, 2)
+
+    @use_fake_addons
+    @mock.patch('website.archiver.tasks.requests.post')
+    def test_archive_batch_copies_into_parent(self, mock_post):
+        mock_post.return_value = mock.Mock(status_code=202)
+        self.archive_job.update_batch('dropbox', '0', status=ARCHIVER_SUCCESS, destination='/archive/')
+        self.archive_job.claim_batch('dropbox', '2')
+        archive_batch('dropbox', self.archive_job._id, '2')
+        data = json.loads(mock_post.call_args[1]['data'])
+        assert_equal(data['source']['path'], '/qwerty')
+        assert_equal(data['destination']['path'], '/archive/')
+        assert_equal(data['rename'], 'A Folder')
+        # Completed by the WaterButler callback
+        assert_equal(self.target.get_batch('2')['status'], ARCHIVER_PENDING)
+
+    @use_fake_addons
+    @mock.patch('website.archiver.tasks.archive_batch.retry')
+    @mock.patch('website.archiver.tasks.requests.post')
+    def test_archive_batch_retries_network_errors(self, mock_post, mock_retry):
+        mock_post.side_effect = requests.ConnectionError('boom')
+        mock_retry.return_value = Exception()
+        self.archive_job.claim_batch('dropbox', '0')
+        with assert_raises(Exception):
+            archive_batch('dropbox', self.archive_job._id, '0')
+        assert_equal(mock_retry.call_args[1]['countdown'], settings.ARCHIVE_COPY_RETRY_BACKOFF * 2)
+        assert_equal(self.target.get_batch('0')['attempts'], 1)
+
+    @mock.patch('website.archiver.tasks.archive_batch.apply_async')
+    def test_failed_callback_retries_batch(self, mock_apply_async):
+        self.archive_job.claim_batch('dropbox', '0')
+        handle_batch_callback(self.archive_job, 'dropbox', '0', errors=['boom'])
+        assert_true(mock_apply_async.called)
+        assert_equal(self.target.get_batch('0')['status'], ARCHIVER_PENDING)
+
+    @mock.patch('website.archiver.tasks.archive_batch.apply_async')
+    def test_failed_callback_fails_target_after_max_retries(self, mock_apply_async):
+        self.archive_job.update_batch('dropbox', '0', attempts=settings.ARCHIVE_COPY_MAX_RETRIES)
+        handle_batch_callback(self.archive_job, 'dropbox', '0', errors=['boom'])
+        assert_false(mock_apply_async.called)
+        assert_equal(self.target.status, ARCHIVER_FAILURE)
+
+    @mock.patch('website.project.signals.archive_callback.send')
+    def test_callback_without_batch_leaves_target_pending(self, mock_send):
+        message, signature = signing.default_signer.sign_payload({
+            'action': 'copy',
+            'source': {'provider': 'dropbox', 'path': '/unplanned'},
+            'destination': {'name': 'Archive of DropBox'},
+            'time': time.time() + 1000,
+        })
+        self.app.put_json(
+            self.dst.api_url_for('registration_callbacks'),
+            {'payload': message, 'signature': signature},
+        )
+        self.archive_job.reload()
         assert_equal(self.archive_job.get_target('dropbox').status, ARCHIVER_INITIATED)
-        cookie = self.user.get_or_create_cookie()
-        assert(mock_make_copy_request.called_with(
-            self.archive_job._id,
-            settings.WATERBUTLER_URL + '/ops/copy',
-            data=dict(
-                source=dict(
-                    cookie=cookie,
-                    nid=self.src._id,
-                    provider='dropbox',
-                    path='/',
-                ),
-                destination=dict(
-                    cookie=cookie,
-                    nid=self.dst._id,
-                    provider=settings.ARCHIVE_PROVIDER,
-                    path='/',
-                ),
-                rename='Archive of DropBox',
-            )
-        ))
+        assert_false(mock_send.called)
+
 
 class TestArchiverUtils(ArchiverTestCase):
 
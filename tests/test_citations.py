@@ -6,8 +6,9 @@ from nose.tools import *  # noqa
 from scripts import parse_citation_styles
 from framework.auth.core import Auth
 from website.util import api_url_for
-from website.citations.utils import datetime_to_csl
+from website.citations.utils import datetime_to_csl, get_search_grams, get_term_grams
 from website.models import Node, User
+from website.project.model import bulk_csl
 from flask import redirect
 
 from tests.base import OsfTestCase
@@ -24,6 +25,18 @@ class CitationsUtilsTestCase(OsfTestCase):
             {'date-parts': [[now.year, now.month, now.day]]},
         )
 
+    def test_search_grams(self):
+        assert_equal(
+            get_search_grams('APA', None, 'ab'),
+            set(['a', 'p', 'b', 'ap', 'pa', 'ab', 'apa']),
+        )
+
+    def test_term_grams(self):
+        assert_equal(get_term_grams('Ap'), set(['ap']))
+        assert_equal(get_term_grams('Nature'), set(['nat', 'atu', 'tur', 'ure']))
+        # Every text containing the term has all of its grams
+        assert_true(get_term_grams('Nature') <= get_search_grams('The nature journal'))
+
 
 class CitationsNodeTestCase(OsfTestCase):
     def setUp(self):
@@ -95,6 +108,19 @@ class CitationsNodeTestCase(OsfTestCase):
 
         assert_equal(node.csl['author'], expected_authors)
 
+    def test_bulk_csl(self):
+        # CSL built in bulk is the same as that built per node
+        other = ProjectFactory()
+        other.add_contributor(UserFactory(), auth=Auth(other.creator), save=True)
+        self.node.set_identifier_value('doi', '10.5072/FK2TEST')
+        nodes = [Node.load(self.node._id), Node.load(other._id)]
+        assert_equal(
+            bulk_csl(nodes),
+            {self.node._id: self.node.csl, other._id: other.csl},
+        )
+        assert_equal(bulk_csl(nodes)[self.node._id]['DOI'], '10.5072/FK2TEST')
+
+
 class CitationsUserTestCase(OsfTestCase):
     def setUp(self):
         super(CitationsUserTestCase, self).setUp()
@@ -155,6 +181,35 @@ class CitationsViewsTestCase(OsfTestCase):
             response.json['styles'][0]['id'], 'bibtex'
         )
 
+    def test_list_styles_filter_substring(self):
+        # Search matches any part of the ID or titles, ignoring case
+        response = self.app.get(api_url_for('list_citation_styles', q='IBTE'))
+        assert_in('bibtex', [style['id'] for style in response.json['styles']])
+
+    def test_list_styles_filter_no_match(self):
+        response = self.app.get(api_url_for('list_citation_styles', q='no such style'))
+        assert_equal(response.json['styles'], [])
+
+    def test_render_node_citations(self):
+        public = ProjectFactory(is_public=True)
+        private = ProjectFactory()
+        response = self.app.get(api_url_for(
+            'render_node_citations',
+            style='apa',
+            nodes=','.join([public._id, private._id, 'nonexistent']),
+        ))
+        citations = response.json['citations']
+        assert_equal(list(citations), [public._id])
+        assert_in(public.title, citations[public._id])
+
+    def test_render_node_citations_unknown_style(self):
+        node = ProjectFactory(is_public=True)
+        response = self.app.get(
+            api_url_for('render_node_citations', style='../styles/apa', nodes=node._id),
+            expect_errors=True,
+        )
+        assert_equal(response.status_code, 404)
+
     def test_node_citation_view(self):
         node = ProjectFactory()
         user = AuthUserFactory()
@@ -8,7 +8,7 @@ import mock
 from framework.auth.core import Auth
 from website import settings
 import website.search.search as search
-from website.search import elastic_search
+from website.search import elastic_search, tasks
 from website.search.util import build_query
 from website.search_migration.migrate import migrate
 from website.models import Retraction
@@ -29,12 +29,16 @@ class SearchTestCase(OsfTestCase):
 
     def tearDown(self):
         super(SearchTestCase, self).tearDown()
+        settings.ELASTIC_REFRESH_ON_WRITE = self._refresh_on_write
         search.delete_index(elastic_search.INDEX)
         search.create_index(elastic_search.INDEX)
     def setUp(self):
         super(SearchTestCase, self).setUp()
         elastic_search.INDEX = TEST_INDEX
         settings.ELASTIC_INDEX = TEST_INDEX
+        # Make writes visible to the queries that immediately follow them
+        self._refresh_on_write = settings.ELASTIC_REFRESH_ON_WRITE
+        settings.ELASTIC_REFRESH_ON_WRITE = True
         search.delete_index(elastic_search.INDEX)
         search.create_index(elastic_search.INDEX)
 
@@ -746,3 +750,107 @@ class TestSearchMigration(SearchTestCase):
             var = self.es.indices.get_aliases()
             assert_equal(var[settings.ELASTIC_INDEX + '_v{}'.format(n + 1)]['aliases'].keys()[0], settings.ELASTIC_INDEX)
             assert not var.get(settings.ELASTIC_INDEX + '_v{}'.format(n))
+
+
+@requires_search
+class TestSearchQueue(SearchTestCase):
+
+    def setUp(self):
+        super(TestSearchQueue, self).setUp()
+        self.project = ProjectFactory(title='Inflatable Ducks', is_public=True)
+        self.queue = self.db[tasks.QUEUE_COLLECTION]
+        self.queue.remove()
+
+    def test_repeated_saves_are_coalesced(self):
+        with mock.patch('website.search.tasks.enqueue_task'):
+            tasks.enqueue_nodes([self.project._id])
+            tasks.enqueue_nodes([self.project._id])
+        assert_equal(self.queue.count(), 1)
+
+    @mock.patch('website.search.search.bulk_update_nodes')
+    def test_drain_batch_indexes_and_clears_queue(self, mock_bulk_update):
+        other = ProjectFactory(is_public=True)
+        with mock.patch('website.search.tasks.enqueue_task'):
+            tasks.enqueue_nodes([self.project._id, other._id])
+        assert_equal(tasks.drain_batch(), 2)
+        nodes = mock_bulk_update.call_args[0][0]
+        assert_equal({node._id for node in nodes}, {self.project._id, other._id})
+        assert_equal(self.queue.count(), 0)
+
+    @mock.patch('website.search.search.bulk_update_nodes')
+    def test_flush_respects_batch_size(self, mock_bulk_update):
+        others = [ProjectFactory(is_public=True) for _ in range(2)]
+        with mock.patch('website.search.tasks.enqueue_task'):
+            tasks.enqueue_nodes([self.project._id] + [each._id for each in others])
+        assert_equal(tasks.flush_node_queue(batch_size=2), 3)
+        assert_equal(mock_bulk_update.call_count, 2)
+
+    def test_drain_batch_skips_unserializable_node(self):
+        broken = ProjectFactory(is_public=True)
+        node_action = elastic_search.node_action
+
+        def fail_on_broken(node, index=None):
+            if node._id == broken._id:
+                raise ValueError('boom')
+            return node_action(node, index=index)
+
+        with mock.patch('website.search.tasks.enqueue_task'):
+            self.project.set_privacy('private')
+            tasks.enqueue_nodes([broken._id])
+        with mock.patch('website.search.elastic_search.node_action', side_effect=fail_on_broken):
+            assert_equal(tasks.drain_batch(), 2)
+        assert_equal(self.queue.count(), 0)
+        assert_equal(len(query('Inflatable')['results']), 0)
+
+    def test_flush_updates_index(self):
+        with mock.patch('website.search.tasks.enqueue_task'):
+            self.project.set_privacy('private')
+        assert_equal(self.queue.count(), 1)
+        assert_equal(len(query('Inflatable')['results']), 1)
+        tasks.flush_node_queue()
+        assert_equal(len(query('Inflatable')['results']), 0)
+
+    def test_node_action_deletes_private_node(self):
+        self.project.is_public = False
+        action = elastic_search.node_action(self.project)
+        assert_equal(action['_op_type'], 'delete')
+
+
+@requires_search
+class TestSingleRequestSearch(SearchTestCase):
+
+    def setUp(self):
+        super(TestSingleRequestSearch, self).setUp()
+        self.project = ProjectFactory(title='Parent Ducks', is_public=True)
+        self.component = NodeFactory(
+            title='Child Ducks', parent=self.project, is_public=True,
+        )
+        self.component.update_search()
+
+    def test_one_elasticsearch_request(self):
+        with mock.patch.object(elastic_search.es, 'search', wraps=elastic_search.es.search) as mock_search:
+            results = query('Ducks')
+        assert_equal(mock_search.call_count, 1)
+        assert_equal(results['counts']['total'], 2)
+
+    def test_type_filter_applies_to_hits_only(self):
+        results = search.search(build_query('Ducks'), index=elastic_search.INDEX, doc_type='component')
+        assert_equal(len(results['results']), 1)
+        assert_equal(results['counts']['total'], 2)
+
+    def test_parent_info_denormalized(self):
+        with mock.patch('website.search.elastic_search.Node.load') as mock_load:
+            results = query('Child')['results']
+        assert_false(mock_load.called)
+        assert_equal(results[0]['parent_title'], 'Parent Ducks')
+        assert_equal(results[0]['parent_url'], self.project.url)
+
+    def test_parent_rename_reindexes_children(self):
+        self.project.set_title('Renamed Ducks', auth=Auth(self.project.creator), save=True)
+        results = query('Child')['results']
+        assert_equal(results[0]['parent_title'], 'Renamed Ducks')
+
+    def test_type_filter(self):
+        assert_is_none(elastic_search.type_filter('_all'))
+        assert_equal(elastic_search.type_filter('user'), {'type': {'value': 'user'}})
+        assert_equal(len(elastic_search.type_filter('project,component')['or']), 2)
@@ -33,7 +33,7 @@ from website.profile.utils import serialize_user
 from website.project.signals import contributor_added
 from website.project.model import (
     Comment, Node, NodeLog, Pointer, ensure_schemas, has_anonymous_link,
-    get_pointer_parent, Embargo,
+    get_pointer_parent, Embargo, WatchConfig, filter_viewable,
 )
 from website.util.permissions import CREATOR_PERMISSIONS
 from website.util import web_url_for, api_url_for
@@ -2495,6 +2495,39 @@ class TestProject(OsfTestCase):
         assert_equal(child1.parents, [self.project])
         assert_equal(child2.parents, [child1, self.project])
 
+    def test_ancestor_ids_set_on_create(self):
+        child1 = ProjectFactory(parent=self.project)
+        child2 = ProjectFactory(parent=child1)
+        assert_equal(self.project.ancestor_ids, [])
+        assert_equal(child1.ancestor_ids, [self.project._id])
+        assert_equal(child2.ancestor_ids, [child1._id, self.project._id])
+
+    def test_ancestor_ids_updated_on_fork(self):
+        child = NodeFactory(parent=self.project, creator=self.user)
+        fork = self.project.fork_node(auth=self.consolidate_auth)
+        forked_child = fork.nodes[0]
+        assert_equal(fork.ancestor_ids, [])
+        assert_equal(forked_child.ancestor_ids, [fork._id])
+        assert_equal(child.ancestor_ids, [self.project._id])
+
+    def test_ancestor_ids_ignore_pointers(self):
+        pointed = ProjectFactory()
+        self.project.add_pointer(pointed, auth=self.consolidate_auth)
+        assert_equal(pointed.ancestor_ids, [])
+
+    def test_root(self):
+        child1 = ProjectFactory(parent=self.project)
+        child2 = ProjectFactory(parent=child1)
+        assert_equal(child2.root, self.project)
+        assert_equal(self.project.root, self.project)
+
+    def test_parents_stop_at_deleted_parent(self):
+        child1 = ProjectFactory(parent=self.project)
+        child2 = ProjectFactory(parent=child1)
+        child1.is_deleted = True
+        child1.save()
+        assert_equal(child2.parents, [])
+
     def test_admin_contributor_ids(self):
         assert_equal(self.project.admin_contributor_ids, set())
         child1 = ProjectFactory(parent=self.project)
@@ -2713,6 +2746,7 @@ class TestProject(OsfTestCase):
         # Add some logs
         for _ in range(5):
             self.project.logs.append(NodeLogFactory())
+        self.project.save()
         # Expected logs appears
         assert_equal(
             self.project.get_recent_logs(3),
@@ -2725,9 +2759,43 @@ class TestProject(OsfTestCase):
 
     def test_date_modified(self):
         self.project.logs.append(NodeLogFactory())
+        self.project.save()
         assert_equal(self.project.date_modified, self.project.logs[-1].date)
         assert_not_equal(self.project.date_modified, self.project.date_created)
 
+    def test_date_modified_updated_by_add_log(self):
+        log = self.project.add_log(
+            NodeLog.TAG_ADDED,
+            params={'node': self.project._id},
+            auth=self.consolidate_auth,
+            save=False,
+        )
+        assert_equal(self.project.date_modified, log.date)
+
+    def test_get_aggregate_log_ids(self):
+        child = NodeFactory(parent=self.project, creator=self.user)
+        child_log = child.add_log(
+            NodeLog.TAG_ADDED,
+            params={'node': child._id},
+            auth=self.consolidate_auth,
+        )
+        project_log = self.project.add_log(
+            NodeLog.TAG_ADDED,
+            params={'node': self.project._id},
+            auth=self.consolidate_auth,
+        )
+        expected = [
+            log._id for log in
+            sorted(list(self.project.logs) + list(child.logs), key=lambda log: (log.date, log._id), reverse=True)
+        ]
+        assert_equal(expected[:2], [project_log._id, child_log._id])
+
+        log_ids, cursor = self.project.get_aggregate_log_ids(self.consolidate_auth, 2)
+        assert_equal(log_ids, expected[:2])
+        rest, last_cursor = self.project.get_aggregate_log_ids(self.consolidate_auth, 100, cursor=cursor)
+        assert_equal(rest, expected[2:])
+        assert_is_none(last_cursor)
+
     def test_replace_contributor(self):
         contrib = UserFactory()
         self.project.add_contributor(contrib, auth=Auth(self.project.creator))
@@ -3579,6 +3647,144 @@ class TestWatchConfig(OsfTestCase):
         assert_true(config.node._id)
 
 
+class TestResolvedPermissions(OsfTestCase):
+
+    def setUp(self):
+        super(TestResolvedPermissions, self).setUp()
+        self.admin = UserFactory()
+        self.user = UserFactory()
+        self.project = ProjectFactory(creator=self.admin)
+        self.component = NodeFactory(parent=self.project, creator=self.user)
+        self.subcomponent = NodeFactory(parent=self.component, creator=self.user)
+
+    def test_get_admin_ids_includes_ancestors(self):
+        assert_equal(
+            self.subcomponent.get_admin_ids(),
+            frozenset([self.admin._id, self.user._id]),
+        )
+
+    def test_is_admin_parent_grandparent(self):
+        assert_true(self.subcomponent.is_admin_parent(self.admin))
+        assert_false(self.subcomponent.is_admin_parent(UserFactory()))
+        assert_false(self.subcomponent.is_admin_parent(None))
+
+    def test_deleted_parent_stops_inheritance(self):
+        self.component.is_deleted = True
+        self.component.save()
+        assert_false(self.subcomponent.is_admin_parent(self.admin))
+
+    def test_permission_change_invalidates(self):
+        other = UserFactory()
+        assert_false(self.subcomponent.is_admin_parent(other))
+        self.project.add_permission(other, 'admin')
+        assert_true(self.subcomponent.is_admin_parent(other))
+        self.project.remove_permission(other, 'admin')
+        assert_false(self.subcomponent.is_admin_parent(other))
+
+    def test_has_permission_on_children_grandchild(self):
+        other = UserFactory()
+        self.subcomponent.add_contributor(other, permissions=['read'], auth=Auth(self.user), save=True)
+        assert_true(self.project.has_permission_on_children(other, 'read'))
+        assert_false(self.project.has_permission_on_children(other, 'write'))
+
+    def test_filter_viewable(self):
+        public = ProjectFactory(is_public=True)
+        private = ProjectFactory()
+        nodes = [self.subcomponent, public, private]
+        assert_equal(filter_viewable(nodes, Auth(self.admin)), [self.subcomponent, public])
+        assert_equal(filter_viewable(nodes, Auth(None)), [public])
+
+
+class TestNodeRelationCounts(OsfTestCase):
+
+    def setUp(self):
+        super(TestNodeRelationCounts, self).setUp()
+        self.user = UserFactory()
+        self.auth = Auth(user=self.user)
+        self.project = ProjectFactory(creator=self.user, is_public=True)
+
+    def stored_count(self, node, relation):
+        Node._clear_caches(node._id)
+        return Node.load(node._id).relation_counts.get(relation)
+
+    def test_get_relation_count_fills_missing(self):
+        NodeFactory(parent=self.project)
+        self.project.relation_counts = {}
+        self.project.save()
+        assert_equal(self.project.get_relation_count('children'), 1)
+        assert_equal(self.stored_count(self.project, 'children'), 1)
+
+    def test_children(self):
+        child = NodeFactory(parent=self.project, creator=self.user)
+        assert_equal(self.stored_count(self.project, 'children'), 1)
+        child.remove_node(self.auth)
+        assert_equal(self.stored_count(self.project, 'children'), 0)
+
+    def test_forks(self):
+        fork = self.project.fork_node(self.auth)
+        assert_equal(self.stored_count(self.project, 'forks'), 1)
+        assert_equal(fork.relation_counts, {})
+        fork.remove_node(self.auth)
+        assert_equal(self.stored_count(self.project, 'forks'), 0)
+
+    def test_registrations(self):
+        RegistrationFactory(project=self.project)
+        assert_equal(self.stored_count(self.project, 'registrations'), 1)
+
+    def test_templates(self):
+        new = self.project.use_as_template(self.auth)
+        assert_equal(self.stored_count(self.project, 'templates'), 1)
+        new.remove_node(self.auth)
+        assert_equal(self.stored_count(self.project, 'templates'), 0)
+
+    def test_watchers(self):
+        self.user.watch(WatchConfig(node=self.project))
+        assert_equal(self.stored_count(self.project, 'watchers'), 1)
+        self.user.unwatch(WatchConfig(node=self.project))
+        assert_equal(self.stored_count(self.project, 'watchers'), 0)
+
+    def test_pointers(self):
+        parent = ProjectFactory(creator=self.user)
+        pointer = parent.add_pointer(self.project, self.auth)
+        assert_equal(self.stored_count(self.project, 'pointers'), 1)
+        assert_equal(self.stored_count(parent, 'children'), 1)
+        parent.rm_pointer(pointer, self.auth)
+        assert_equal(self.stored_count(self.project, 'pointers'), 0)
+
+    def test_pointers_from_deleted_parent(self):
+        parent = ProjectFactory(creator=self.user)
+        parent.add_pointer(self.project, self.auth)
+        parent.remove_node(self.auth)
+        assert_equal(self.stored_count(self.project, 'pointers'), 0)
+
+    def test_deleting_pointed_node_updates_pointer_parents(self):
+        parent = ProjectFactory(creator=self.user)
+        parent.add_pointer(self.project, self.auth)
+        self.project.remove_node(self.auth)
+        assert_equal(self.stored_count(parent, 'children'), 0)
+
+    def test_adding_pointer_recounts_only_its_node(self):
+        parent = ProjectFactory(creator=self.user)
+        other = ProjectFactory(creator=self.user)
+        parent.add_pointer(other, self.auth)
+        with mock.patch.object(Node, 'update_relation_counts', autospec=True) as mock_update:
+            parent.add_pointer(self.project, self.auth)
+        recounted = [
+            call[0][0] for call in mock_update.call_args_list
+            if call[0][1:] == ('pointers', )
+        ]
+        assert_equal(recounted, [self.project])
+
+    def test_folder_pointers_not_recounted(self):
+        folder = FolderFactory(creator=self.user)
+        with mock.patch.object(Node, 'update_relation_counts', autospec=True) as mock_update:
+            folder.add_pointer(self.project, self.auth)
+        assert_not_in(
+            ('pointers', ),
+            [call[0][1:] for call in mock_update.call_args_list],
+        )
+
+
 class TestUnregisteredUser(OsfTestCase):
 
     def setUp(self):
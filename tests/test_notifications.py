@@ -1161,6 +1161,40 @@ class TestSendEmails(OsfTestCase):
         digest_count = NotificationDigest.find().count()
         assert_equal(digest_count_before, digest_count)
 
+    @mock.patch('website.mails.render_message')
+    def test_send_email_digest_renders_once_per_locale(self, mock_render):
+        mock_render.return_value = 'Hello'
+        users = [factories.UserFactory(timezone='Etc/UTC', locale='en_US') for _ in range(3)]
+        users.append(factories.UserFactory(timezone='America/New_York', locale='en_US'))
+        digest_count_before = NotificationDigest.find().count()
+        emails.email_digest([u._id for u in users], self.project._id, 'comments',
+                            user=self.user,
+                            node=self.project,
+                            timestamp=datetime.datetime.utcnow().replace(tzinfo=pytz.utc),
+                            gravatar_url=self.user.gravatar_url,
+                            content='',
+                            parent_comment='',
+                            title=self.project.title,
+                            url=self.project.absolute_url
+        )
+        assert_equal(mock_render.call_count, 2)
+        assert_equal(NotificationDigest.find().count() - digest_count_before, 4)
+
+    @mock.patch('website.notifications.emails.send')
+    def test_notify_sends_to_all_subscribers_at_once(self, mock_send):
+        users = [factories.UserFactory() for _ in range(3)]
+        for user in users:
+            self.project_subscription.email_transactional.append(user)
+        self.project_subscription.save()
+        time_now = datetime.datetime.utcnow()
+        emails.notify(self.project._id, 'comments', user=self.user, node=self.project, timestamp=time_now)
+        assert_equal(mock_send.call_count, 1)
+        recipient_ids = mock_send.call_args[0][0]
+        assert_equal(
+            set(recipient_ids),
+            set([self.project.creator._id] + [user._id for user in users]),
+        )
+
     def test_get_settings_url_for_node(self):
         url = emails.get_settings_url(self.project._id, self.user)
         assert_equal(url, self.project.absolute_url + 'settings/')
@@ -1242,7 +1276,7 @@ class TestSendDigest(OsfTestCase):
             node_lineage=[project._id]
         )
         d2.save()
-        user_groups = group_digest_notifications_by_user()
+        user_groups = list(group_digest_notifications_by_user())
         expected = [{
                     u'user_id': user._id,
                     u'info': [{
@@ -1259,6 +1293,7 @@ class TestSendDigest(OsfTestCase):
                         u'_id': d2._id
                     }]
         }]
+        expected.sort(key=lambda group: group['user_id'])
 
         assert_equal(len(user_groups), 2)
         assert_equal(user_groups, expected)
@@ -1273,7 +1308,7 @@ class TestSendDigest(OsfTestCase):
             node_lineage=[factories.ProjectFactory()._id]
         )
         d.save()
-        user_groups = group_digest_notifications_by_user()
+        user_groups = list(group_digest_notifications_by_user())
         send_digest(user_groups)
         assert_true(mock_send_mail.called)
         assert_equals(mock_send_mail.call_count, len(user_groups))
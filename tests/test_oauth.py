@@ -1,3 +1,4 @@
+import datetime
 import httplib as http
 import logging
 import json
@@ -5,6 +6,8 @@ import time
 import urlparse
 
 import httpretty
+import mock
+from flask import has_request_context
 from nose.tools import *  # noqa
 
 from framework.auth import authenticate
@@ -16,6 +19,7 @@ from website.oauth.models import (
     OAUTH1,
     OAUTH2,
 )
+from website.oauth import refresh
 from website.util import api_url_for, web_url_for
 
 from tests.base import OsfTestCase
@@ -67,6 +71,21 @@ def _prepare_mock_oauth2_handshake_response(expires_in=3600):
         content_type='application/json',
     )
 
+def _prepare_mock_oauth2_refresh_response(expires_in=3600):
+
+    httpretty.register_uri(
+        httpretty.POST,
+        'https://mock2.com/refresh',
+        body=json.dumps({
+            'access_token': 'refreshed_access_token',
+            'expires_in': expires_in,
+            'refresh_token': 'refreshed_refresh_token',
+            'token_type': 'bearer',
+        }),
+        status=200,
+        content_type='application/json',
+    )
+
 def _prepare_mock_500_error():
     httpretty.register_uri(
         httpretty.POST,
@@ -502,3 +521,125 @@ class TestExternalProviderOAuth2(OsfTestCase):
             ExternalAccount.find().count(),
             1
         )
+
+
+class TestRefreshOAuthKey(OsfTestCase):
+
+    def setUp(self):
+        super(TestRefreshOAuthKey, self).setUp()
+        refresh._tokens.clear()
+        self.account = ExternalAccountFactory(
+            oauth_key='old_access_token',
+            refresh_token='old_refresh_token',
+            expires_at=datetime.datetime.utcnow() + datetime.timedelta(minutes=10),
+        )
+        self.provider = MockOAuth2Provider()
+        self.provider.account = self.account
+        self.refresh_url = mock.patch.object(MockOAuth2Provider, 'refresh_url', 'https://mock2.com/refresh')
+        self.refresh_url.start()
+
+    def tearDown(self):
+        self.refresh_url.stop()
+        refresh._tokens.clear()
+        refresh.get_claims_collection().remove()
+        ExternalAccount._clear_caches()
+        ExternalAccount.remove()
+        super(TestRefreshOAuthKey, self).tearDown()
+
+    def _expire_in(self, **kwargs):
+        self.account.expires_at = datetime.datetime.utcnow() + datetime.timedelta(**kwargs)
+        self.account.save()
+
+    @httpretty.activate
+    def test_refresh_oauth_key(self):
+        _prepare_mock_oauth2_refresh_response()
+        assert_true(self.provider.refresh_oauth_key())
+        self.account.reload()
+        assert_equal(self.account.oauth_key, 'refreshed_access_token')
+        assert_equal(self.account.refresh_token, 'refreshed_refresh_token')
+        body = urlparse.parse_qs(httpretty.last_request().body)
+        assert_equal(body['grant_type'], ['refresh_token'])
+        assert_equal(body['refresh_token'], ['old_refresh_token'])
+
+    def test_refresh_oauth_key_without_refresh_url(self):
+        self.refresh_url.stop()
+        try:
+            assert_false(self.provider.refresh_oauth_key())
+        finally:
+            self.refresh_url.start()
+
+    def test_get_expiring_account_ids(self):
+        later = ExternalAccountFactory(
+            refresh_token='refresh_token',
+            expires_at=datetime.datetime.utcnow() + datetime.timedelta(hours=2),
+        )
+        no_refresh_token = ExternalAccountFactory(
+            expires_at=datetime.datetime.utcnow() + datetime.timedelta(minutes=5),
+        )
+        account_ids = refresh.get_expiring_account_ids(30 * 60)
+        assert_equal(account_ids, [self.account._id])
+        assert_not_in(later._id, account_ids)
+        assert_not_in(no_refresh_token._id, account_ids)
+
+    @httpretty.activate
+    def test_refresh_expiring_tokens(self):
+        _prepare_mock_oauth2_refresh_response()
+        counts = refresh.refresh_expiring_tokens(ahead=30 * 60, concurrency=2)
+        assert_equal(counts, {'refreshed': 1, 'skipped': 0, 'failed': 0})
+        self.account.reload()
+        assert_equal(self.account.oauth_key, 'refreshed_access_token')
+
+    @mock.patch.object(MockOAuth2Provider, 'refresh_oauth_key')
+    def test_refresh_expiring_tokens_failure(self, mock_refresh):
+        mock_refresh.side_effect = Exception('invalid_grant')
+        counts = refresh.refresh_expiring_tokens(ahead=30 * 60)
+        assert_equal(counts, {'refreshed': 0, 'skipped': 0, 'failed': 1})
+        # The claim is released for the next run
+        assert_is_none(refresh.get_claims_collection().find_one({'_id': self.account._id}))
+
+    @mock.patch.object(MockOAuth2Provider, 'refresh_oauth_key')
+    def test_refresh_account_skipped_while_claimed(self, mock_refresh):
+        assert_true(refresh._claim(self.account._id))
+        assert_false(refresh.refresh_account(self.account._id, ahead=30 * 60))
+        assert_false(mock_refresh.called)
+
+    @mock.patch.object(MockOAuth2Provider, 'refresh_oauth_key')
+    def test_refresh_account_skipped_when_valid(self, mock_refresh):
+        assert_false(refresh.refresh_account(self.account._id, ahead=60))
+        assert_false(mock_refresh.called)
+
+    def test_get_access_token_cached(self):
+        self._expire_in(days=1)
+        token = refresh.get_access_token(self.account)
+        assert_equal(token.key, 'old_access_token')
+        refresh.get_account_collection().update(
+            {'_id': self.account._id},
+            {'$set': {'oauth_key': 'other_access_token'}},
+        )
+        assert_equal(refresh.get_access_token(self.account).key, 'old_access_token')
+        refresh._tokens.clear()
+        assert_equal(refresh.get_access_token(self.account).key, 'other_access_token')
+
+    @mock.patch('website.oauth.refresh.enqueue_task')
+    def test_get_access_token_expiring_refreshed_in_background(self, mock_enqueue):
+        self._expire_in(minutes=1)
+        token = refresh.get_access_token(self.account)
+        assert_equal(token.key, 'old_access_token')
+        assert_equal(mock_enqueue.call_count, 1)
+        assert_equal(len(refresh._tokens), 0)
+
+    @httpretty.activate
+    def test_get_access_token_expired_refreshed(self):
+        _prepare_mock_oauth2_refresh_response()
+        self._expire_in(minutes=-1)
+        token = refresh.get_access_token(self.account)
+        assert_equal(token.key, 'refreshed_access_token')
+
+    @mock.patch('website.oauth.refresh.refresh_account')
+    def test_get_access_token_expired_refreshed_outside_request(self, mock_refresh):
+        # Writes made in the request context would join its transaction
+        in_request = []
+        mock_refresh.side_effect = lambda account_id: in_request.append(has_request_context())
+        self._expire_in(minutes=-1)
+        refresh.get_access_token(self.account)
+        assert_equal(in_request, [False])
@@ -2,6 +2,8 @@
 # encoding: utf-8
 
 import os
+import threading
+import time
 from types import NoneType
 from xmlrpclib import DateTime
 
@@ -385,6 +387,118 @@ class TestSerializingNodeWithAddon(OsfTestCase):
         assert_in('baz.js', result)
 
 
+def make_mock_addon(short_name, get_hgrid_data, local=False):
+    addon = mock.Mock()
+    addon.config.short_name = short_name
+    addon.config.full_name = short_name.capitalize()
+    addon.config.has_hgrid_files = True
+    addon.config.local_hgrid_data = local
+    addon.config.get_hgrid_data.side_effect = get_hgrid_data
+    return addon
+
+
+class TestCollectingAddonRoots(OsfTestCase):
+
+    def setUp(self):
+        super(TestCollectingAddonRoots, self).setUp()
+        self.auth = AuthFactory()
+        self.project = ProjectFactory(creator=self.auth.user)
+        self.component = NodeFactory(creator=self.auth.user, parent=self.project)
+
+    def _root(self, name):
+        return [{'name': name, 'kind': rubeus.FOLDER}]
+
+    def test_roots_collected_for_whole_tree(self):
+        self.project.get_addons = mock.Mock(return_value=[
+            make_mock_addon('first', lambda *args, **kwargs: self._root('project')),
+        ])
+        self.component.get_addons = mock.Mock(return_value=[
+            make_mock_addon('second', lambda *args, **kwargs: self._root('component')),
+        ])
+        root = rubeus.NodeFileCollector(self.project, self.auth).to_hgrid()[0]
+        assert_equal(root['children'][0]['name'], 'project')
+        component = root['children'][1]
+        assert_equal(component['nodeID'], self.component._id)
+        assert_equal(component['children'][0]['name'], 'component')
+
+    def test_roots_fetched_concurrently(self):
+        def slow(*args, **kwargs):
+            time.sleep(0.2)
+            return self._root('slow')
+        self.project.get_addons = mock.Mock(return_value=[
+            make_mock_addon('first', slow),
+            make_mock_addon('second', slow),
+        ])
+        self.component.get_addons = mock.Mock(return_value=[
+            make_mock_addon('third', slow),
+        ])
+        start = time.time()
+        rubeus.NodeFileCollector(self.project, self.auth).to_hgrid()
+        assert_less(time.time() - start, 0.5)
+
+    @mock.patch('website.util.rubeus.settings.ADDON_HGRID_TIMEOUT', 0.05)
+    def test_slow_addon_shown_as_loading(self):
+        def slow(*args, **kwargs):
+            time.sleep(0.5)
+            return self._root('slow')
+        self.project.get_addons = mock.Mock(return_value=[
+            make_mock_addon('fast', lambda *args, **kwargs: self._root('fast')),
+            make_mock_addon('slowaddon', slow),
+        ])
+        roots = rubeus.NodeFileCollector(self.project, self.auth)._collect_addons(self.project)
+        assert_equal(roots[0]['name'], 'fast')
+        assert_true(roots[1]['loading'])
+        assert_equal(roots[1]['provider'], 'slowaddon')
+        assert_equal(rubeus.get_addon_root_stats()['slowaddon']['timeouts'], 1)
+
+    @mock.patch('website.util.rubeus.settings.ADDON_HGRID_TIMEOUT', 0.05)
+    @mock.patch('website.util.rubeus.settings.ADDON_HGRID_PROVIDER_CONCURRENCY', 1)
+    def test_hung_addon_limited_to_its_slots(self):
+        hung = threading.Event()
+        self.project.get_addons = mock.Mock(return_value=[
+            make_mock_addon('hung', lambda *args, **kwargs: hung.wait(5)),
+        ])
+        self.component.get_addons = mock.Mock(return_value=[
+            make_mock_addon('hung', lambda *args, **kwargs: hung.wait(5)),
+        ])
+        collector = rubeus.NodeFileCollector(self.project, self.auth)
+        try:
+            roots = collector._get_addon_roots([self.project, self.component])
+            # The second root was not queued behind the first
+            assert_equal(rubeus.get_addon_root_stats()['hung']['throttled'], 1)
+            assert_true(roots[self.component._id][0]['loading'])
+        finally:
+            hung.set()
+
+    def test_local_addon_fetched_inline(self):
+        self.project.get_addons = mock.Mock(return_value=[
+            make_mock_addon('local', lambda *args, **kwargs: self._root('local'), local=True),
+        ])
+        with mock.patch('website.util.rubeus.get_addon_pool') as mock_pool:
+            roots = rubeus.NodeFileCollector(self.project, self.auth)._collect_addons(self.project)
+        assert_false(mock_pool.called)
+        assert_equal(roots, self._root('local'))
+
+    def test_failing_addon_shown_as_unavailable(self):
+        def fail(*args, **kwargs):
+            raise ValueError()
+        self.project.get_addons = mock.Mock(return_value=[
+            make_mock_addon('broken', fail),
+        ])
+        roots = rubeus.NodeFileCollector(self.project, self.auth)._collect_addons(self.project)
+        assert_true(roots[0]['unavailable'])
+        assert_equal(rubeus.get_addon_root_stats()['broken']['errors'], 1)
+
+    @mock.patch('website.util.rubeus.settings.ADDON_HGRID_CONCURRENCY', 0)
+    def test_roots_fetched_inline(self):
+        self.project.get_addons = mock.Mock(return_value=[
+            make_mock_addon('inline', lambda *args, **kwargs: self._root('inline')),
+        ])
+        roots = rubeus.NodeFileCollector(self.project, self.auth)._collect_addons(self.project)
+        assert_equal(roots, self._root('inline'))
+        assert_equal(rubeus.get_addon_root_stats()['inline']['fetched'], 1)
+
+
 class TestSerializingEmptyDashboard(OsfTestCase):
 
 
@@ -597,3 +711,74 @@ def assert_valid_hgrid_smart_folder(node_hgrid):
     assert_valid_hgrid_folder(node_hgrid)
     for attr, correct_value in smart_folder_values.items():
         assert_equal(correct_value, node_hgrid[attr])
+
+
+class TestOrganizerCache(OsfTestCase):
+
+    def setUp(self):
+        super(TestOrganizerCache, self).setUp()
+        self.user = UserFactory()
+        self.auth = Auth(user=self.user)
+        self.project = ProjectFactory(creator=self.user)
+        self.child = NodeFactory(creator=self.user, parent=self.project, title='Original')
+
+    def test_second_load_uses_cache(self):
+        rubeus.to_project_hgrid(self.project, self.auth)
+        with mock.patch.object(rubeus.NodeProjectCollector, '_serialize_node') as mock_serialize:
+            hgrid = rubeus.to_project_hgrid(self.project, self.auth)
+        assert_false(mock_serialize.called)
+        assert_equal(hgrid[0]['name'], 'Original')
+
+    def test_cache_is_per_user(self):
+        other = UserFactory()
+        self.project.add_contributor(other, auth=self.auth, save=True)
+        self.child.add_contributor(other, auth=self.auth, permissions=['read'], save=True)
+        rubeus.to_project_hgrid(self.project, self.auth)
+        hgrid = rubeus.to_project_hgrid(self.project, Auth(user=other))
+        assert_false(hgrid[0]['permissions']['edit'])
+
+    def test_node_save_invalidates(self):
+        rubeus.to_project_hgrid(self.project, self.auth)
+        self.child.set_title('Changed', auth=self.auth, save=True)
+        hgrid = rubeus.to_project_hgrid(self.project, self.auth)
+        assert_equal(hgrid[0]['name'], 'Changed')
+
+    def test_grandchild_changes_invalidate_children_count(self):
+        rubeus.to_project_hgrid(self.project, self.auth)
+        NodeFactory(creator=self.user, parent=self.child)
+        hgrid = rubeus.to_project_hgrid(self.project, self.auth)
+        assert_equal(hgrid[0]['childrenCount'], 1)
+
+    def test_ancestor_admin_change_invalidates_descendants(self):
+        other = UserFactory()
+        self.project.add_contributor(other, auth=self.auth, permissions=['read', 'write', 'admin'], save=True)
+        self.child.add_contributor(other, auth=self.auth, permissions=['read'], save=True)
+        NodeFactory(creator=self.user, parent=self.child)
+        hgrid = rubeus.to_project_hgrid(self.project, Auth(user=other))
+        assert_equal(hgrid[0]['childrenCount'], 1)
+        # The grandchild was only visible through admin rights on the project
+        self.project.set_permissions(other, ['read'], save=True)
+        hgrid = rubeus.to_project_hgrid(self.project, Auth(user=other))
+        assert_equal(hgrid[0]['childrenCount'], 0)
+
+    def test_contributor_rename_invalidates(self):
+        rubeus.to_project_hgrid(self.project, self.auth)
+        self.user.fullname = 'Freddie Mercury'
+        self.user.family_name = 'Mercury'
+        self.user.save()
+        hgrid = rubeus.to_project_hgrid(self.project, self.auth)
+        assert_in('Mercury', [each['name'] for each in hgrid[0]['contributors']])
+
+    def test_modified_delta_is_recomputed(self):
+        rubeus.to_project_hgrid(self.project, self.auth)
+        with mock.patch('website.util.rubeus.delta_date') as mock_delta:
+            mock_delta.return_value = 42
+            hgrid = rubeus.to_project_hgrid(self.project, self.auth)
+        assert_equal(hgrid[0]['modifiedDelta'], 42)
+
+    def test_smart_folder_count_cached_until_new_project(self):
+        dash = DashboardFactory(creator=self.user)
+        collector = rubeus.NodeProjectCollector(dash, self.auth)
+        assert_equal(collector.collect_all_projects_smart_folder()['childrenCount'], 1)
+        ProjectFactory(creator=self.user)
+        assert_equal(collector.collect_all_projects_smart_folder()['childrenCount'], 2)
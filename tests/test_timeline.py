@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""Tests for node log timelines."""
+
+import datetime
+import unittest
+
+from nose.tools import *  # flake8: noqa (PEP8 asserts)
+
+from website.project import timeline
+
+
+class TestTimeline(unittest.TestCase):
+
+    def setUp(self):
+        self.now = datetime.datetime(2015, 6, 1, 12, 0, 0, 123456)
+
+    def entries(self, *offsets):
+        return [
+            (self.now - datetime.timedelta(minutes=offset), 'log{0}'.format(offset))
+            for offset in offsets
+        ]
+
+    def test_merge_timelines(self):
+        merged = timeline.merge_timelines([
+            self.entries(1, 4, 5),
+            self.entries(2, 3),
+            [],
+            self.entries(6),
+        ])
+        assert_equal(
+            [log_id for _, log_id in merged],
+            ['log1', 'log2', 'log3', 'log4', 'log5', 'log6'],
+        )
+
+    def test_merge_timelines_skips_shared_logs(self):
+        merged = timeline.merge_timelines([
+            self.entries(1, 3),
+            self.entries(1, 2),
+        ])
+        assert_equal(
+            [log_id for _, log_id in merged],
+            ['log1', 'log2', 'log3'],
+        )
+
+    def test_cursor_round_trip(self):
+        cursor = timeline.encode_cursor(self.now, '5570a4d1e4b0b1f3c2d1a0b9')
+        assert_equal(
+            timeline.decode_cursor(cursor),
+            (self.now, '5570a4d1e4b0b1f3c2d1a0b9'),
+        )
+
+    def test_invalid_cursor(self):
+        with assert_raises(ValueError):
+            timeline.decode_cursor('notacursor')
+        with assert_raises(ValueError):
+            timeline.decode_cursor('2015-abc')
@@ -7,7 +7,6 @@ from bson import ObjectId
 from flask import request
 from modularodm import fields
 from mako.lookup import TemplateLookup
-from time import sleep
 
 import furl
 import requests
@@ -26,6 +25,7 @@ from framework.exceptions import (
 from website import settings
 from website.addons.base import exceptions
 from website.addons.base import serializer
+from website.addons.base.crawler import FileTreeCrawler
 from website.project.model import Node
 from website.util import waterbutler_url_for
 
@@ -66,7 +66,8 @@ class AddonConfig(object):
                  added_default=None, added_mandatory=None,
                  node_settings_model=None, user_settings_model=None, include_js=None, include_css=None,
                  widget_help=None, views=None, configs=None, models=None,
-                 has_hgrid_files=False, get_hgrid_data=None, max_file_size=None, high_max_file_size=None,
+                 has_hgrid_files=False, get_hgrid_data=None, local_hgrid_data=False,
+                 max_file_size=None, high_max_file_size=None,
                  accept_extensions=True,
                  node_settings_template=None, user_settings_template=None,
                  **kwargs):
@@ -103,6 +104,8 @@ class AddonConfig(object):
         self.has_hgrid_files = has_hgrid_files
         # WARNING: get_hgrid_data can return None if the addon is added but has no credentials.
         self.get_hgrid_data = get_hgrid_data  # if has_hgrid_files and not get_hgrid_data rubeus.make_dummy()
+        # Whether get_hgrid_data only reads our own database, without calling the provider
+        self.local_hgrid_data = local_hgrid_data
         self.max_file_size = max_file_size
         self.high_max_file_size = high_max_file_size
         self.accept_extensions = accept_extensions
@@ -878,7 +881,7 @@ class StorageAddonBase(object):
             name = name + ": {folder}".format(folder=folder_name)
         return name
 
-    def _get_fileobj_child_metadata(self, filenode, user, cookie=None, version=None):
+    def _get_fileobj_child_metadata_url(self, filenode, user, cookie=None, version=None):
         kwargs = dict(
             provider=self.config.short_name,
             path=filenode.get('path', ''),
@@ -890,40 +893,44 @@ class StorageAddonBase(object):
             kwargs['cookie'] = cookie
         if version:
             kwargs['version'] = version
-        metadata_url = waterbutler_url_for(
+        return waterbutler_url_for(
             'metadata',
             **kwargs
         )
-        res = requests.get(metadata_url)
+
+    def _parse_fileobj_child_metadata(self, res, version=None):
         if res.status_code != 200:
             raise HTTPError(res.status_code, data={
                 'error': res.json(),
             })
-        # TODO: better throttling?
-        sleep(1.0 / 5.0)
         return res.json().get('data', [])
 
-    def _get_file_tree(self, filenode=None, user=None, cookie=None, version=None):
+    def _get_fileobj_child_metadata(self, filenode, user, cookie=None, version=None):
+        metadata_url = self._get_fileobj_child_metadata_url(filenode, user, cookie=cookie, version=version)
+        res = requests.get(metadata_url, timeout=settings.ARCHIVE_CRAWL_TIMEOUT)
+        return self._parse_fileobj_child_metadata(res, version=version)
+
+    def _get_file_tree(self, filenode=None, user=None, cookie=None, version=None, on_folder=None):
         """
-        Recursively get file metadata
+        Get file metadata for the whole tree below `filenode`, listing the
+        folders of each level concurrently.
+
+        :param on_folder: Optional callback, called with each folder and its
+            children as they are listed
         """
         filenode = filenode or {
             'path': '/',
             'kind': 'folder',
             'name': self.root_node.name,
         }
-        if filenode.get('kind') == 'file':
-            return filenode
-        elif 'size' in filenode:
-            return filenode
-        kwargs = {
-            'version': version,
-            'cookie': cookie,
-        }
-        filenode['children'] = [
-            self._get_file_tree(child, user, cookie=cookie)
-            for child in self._get_fileobj_child_metadata(filenode, user, **kwargs)
-        ]
+
+        def add_children(folder, children):
+            folder['children'] = children
+            if on_folder:
+                on_folder(folder, children)
+
+        crawler = FileTreeCrawler(self, user, cookie=cookie, version=version)
+        crawler.crawl(filenode, add_children)
         return filenode
 
 class AddonOAuthNodeSettingsBase(AddonNodeSettingsBase):
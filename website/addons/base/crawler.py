@@ -0,0 +1,110 @@
+"""
+Concurrent traversal of storage add-on file trees through WaterButler.
+"""
+
+import time
+import threading
+from multiprocessing.pool import ThreadPool
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from website import settings
+
+
+class RateLimiter(object):
+    """Space out calls to `wait` so that at most `rate` proceed per second,
+    across all threads.
+    """
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.time()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+_rate_limiters = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(provider):
+    """Get the process-wide rate limiter for requests to `provider`."""
+    with _rate_limiters_lock:
+        if provider not in _rate_limiters:
+            rate = settings.ARCHIVE_CRAWL_PROVIDER_RATES.get(provider, settings.ARCHIVE_CRAWL_RATE)
+            _rate_limiters[provider] = RateLimiter(rate)
+        return _rate_limiters[provider]
+
+
+class FileTreeCrawler(object):
+    """Breadth-first crawler that lists the folders of each level of a file
+    tree in parallel. Listings are handed to `on_folder` as they are parsed,
+    on the calling thread, so callers can process large trees incrementally.
+
+    :param StorageAddonBase addon: Add-on whose files to crawl
+    :param User user: User to crawl as
+    :param str cookie: WaterButler cookie, if not that of `user`
+    :param str version: Version of the tree to crawl, for providers that have them
+    :param int concurrency: Maximum number of requests in flight
+    """
+
+    def __init__(self, addon, user, cookie=None, version=None, concurrency=None):
+        self.addon = addon
+        self.user = user
+        self.cookie = cookie
+        self.version = version
+        self.concurrency = concurrency or settings.ARCHIVE_CRAWL_CONCURRENCY
+        self.rate_limiter = get_rate_limiter(addon.config.short_name)
+
+    @staticmethod
+    def needs_listing(filenode):
+        # Folders reported with a size are treated as opaque
+        return filenode.get('kind') != 'file' and 'size' not in filenode
+
+    def crawl(self, root, on_folder):
+        """List every folder below `root`, calling `on_folder(folder, children)`
+        for each one, parents before their children.
+        """
+        if not self.needs_listing(root):
+            return
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.concurrency)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        pool = ThreadPool(self.concurrency)
+
+        def fetch(url):
+            self.rate_limiter.wait()
+            return session.get(url, timeout=settings.ARCHIVE_CRAWL_TIMEOUT)
+
+        try:
+            frontier = [root]
+            while frontier:
+                # URLs are built here rather than in the pool, since building
+                # them may touch the database
+                urls = [
+                    self.addon._get_fileobj_child_metadata_url(
+                        folder, self.user, cookie=self.cookie, version=self.version
+                    )
+                    for folder in frontier
+                ]
+                next_frontier = []
+                for folder, response in zip(frontier, pool.imap(fetch, urls)):
+                    children = self.addon._parse_fileobj_child_metadata(response, version=self.version)
+                    on_folder(folder, children)
+                    next_frontier.extend(
+                        child for child in children
+                        if self.needs_listing(child)
+                    )
+                frontier = next_frontier
+        finally:
+            pool.terminate()
+            session.close()
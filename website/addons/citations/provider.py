@@ -4,6 +4,8 @@ import httplib as http
 from framework.exceptions import HTTPError
 from framework.exceptions import PermissionsError
 
+from website import settings
+from website.addons.citations import snapshot
 from website.oauth.models import ExternalAccount
 
 class CitationsProvider(object):
@@ -89,10 +91,21 @@ class CitationsProvider(object):
 
         return None
 
-    def citation_list(self, node_addon, user, list_id, show='all'):
+    def citation_list(self, node_addon, user, list_id, show='all', page=None, size=None):
+        """List the folders and citations in a list, read from the snapshot of
+        the connected account. Citations are paginated if `page` is given.
+
+        :param int page: Zero-based page number of citations
+        :param int size: Number of citations per page
+        """
+        if page is not None:
+            size = size or settings.CITATIONS_PAGE_SIZE
+            if page < 0 or size < 1:
+                raise HTTPError(http.BAD_REQUEST)
+            size = min(size, settings.CITATIONS_MAX_PAGE_SIZE)
 
         attached_list_id = self._folder_id(node_addon)
-        account_folders = node_addon.api.citation_lists(self._extract_folder)
+        account_folders = snapshot.get_snapshot(self, node_addon, snapshot.FOLDERS)
 
         # Folders with 'parent_list_id'==None are children of 'All Documents'
         for folder in account_folders:
@@ -122,6 +135,7 @@ class CitationsProvider(object):
                     raise HTTPError(http.FORBIDDEN)
                 ancestor_id = folders[ancestor_id].get('parent_list_id')
 
+        ret = {}
         contents = []
         if list_id is None:
             contents = [node_addon.root_folder]
@@ -138,14 +152,22 @@ class CitationsProvider(object):
                 ]
 
             if show in ('all', 'citations'):
+                citations = snapshot.get_snapshot(self, node_addon, list_id)
+                if page is not None:
+                    total = len(citations)
+                    ret.update({
+                        'total': total,
+                        'page': page,
+                        'pages': (total + size - 1) // size,
+                    })
+                    citations = citations[page * size:(page + 1) * size]
                 contents += [
                     self.serializer(
                         node_settings=node_addon,
                         user_settings=user_settings,
                     ).serialize_citation(each)
-                    for each in node_addon.api.get_list(list_id)
+                    for each in citations
                 ]
 
-        return {
-            'contents': contents
-        }
+        ret['contents'] = contents
+        return ret
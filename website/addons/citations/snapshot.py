@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""Snapshots of the folders and citations of citation manager accounts,
+shared by every node an account is connected to. Stale snapshots are served
+as they are while a Celery task brings them up to date; where the provider
+supports it, a refresh only fetches the documents modified since the last one.
+"""
+
+import datetime
+import importlib
+import logging
+
+from framework.mongo import database
+from framework.tasks import app
+from framework.tasks.handlers import enqueue_task
+
+from website import settings
+from website.oauth.models import ExternalAccount
+from website.oauth.utils import get_service
+
+
+logger = logging.getLogger(__name__)
+
+COLLECTION = 'citationsnapshots'
+
+# Snapshot key of the folder listing of an account
+FOLDERS = '__folders__'
+
+
+def get_collection():
+    collection = database[COLLECTION]
+    # Cached by pymongo; only hits the server once per process
+    collection.ensure_index('synced', expireAfterSeconds=settings.CITATIONS_SNAPSHOT_EXPIRATION)
+    return collection
+
+
+def _snapshot_id(account_id, list_id):
+    return '{0}:{1}'.format(account_id, list_id)
+
+
+def get_citations_provider(provider_name):
+    """Return the ``CitationsProvider`` of the add-on named `provider_name`."""
+    from website.addons.citations.provider import CitationsProvider
+    # Importing the add-on defines its provider
+    importlib.import_module('website.addons.{0}'.format(provider_name))
+    for cls in CitationsProvider.__subclasses__():
+        provider = cls()
+        if provider.provider_name == provider_name:
+            return provider
+    raise KeyError(provider_name)
+
+
+def sync_snapshot(provider, api, list_id, entry=None):
+    """Fetch the folders or the citations of a list from the provider and
+    store them as the snapshot of the account of `api`.
+
+    :param CitationsProvider provider:
+    :param ExternalProvider api: Provider session authenticated as the account
+    :param str list_id: ID of the list, or ``FOLDERS`` for the folder listing
+    :param dict entry: The current snapshot, if any; only changes since it
+        was taken are fetched, unless a full refresh is due
+    :return dict: The new snapshot
+    """
+    now = datetime.datetime.utcnow()
+    full_refresh_before = now - datetime.timedelta(seconds=settings.CITATIONS_SNAPSHOT_FULL_REFRESH)
+    if entry is not None and entry['full_synced'] < full_refresh_before:
+        entry = None
+    if list_id == FOLDERS:
+        value, token = api.citation_lists(provider._extract_folder), None
+    elif entry is None:
+        value, token = api.sync_list(list_id)
+    else:
+        value, token = api.sync_list(list_id, entry['value'], entry['token'])
+    snapshot = {
+        '_id': _snapshot_id(api.account._id, list_id),
+        'value': value,
+        'token': token,
+        'synced': now,
+        'full_synced': entry['full_synced'] if entry is not None else now,
+    }
+    # Replacing the document also releases any claim to refresh it
+    get_collection().save(snapshot)
+    return snapshot
+
+
+def get_snapshot(provider, node_addon, list_id):
+    """Return the folders or the citations of a list of the account connected
+    to `node_addon`, fetching them from the provider only if the account has no
+    snapshot of them yet. Stale snapshots are refreshed after the request.
+    """
+    collection = get_collection()
+    account = node_addon.external_account
+    snapshot_id = _snapshot_id(account._id, list_id)
+    entry = collection.find_one({'_id': snapshot_id})
+    if entry is None:
+        return sync_snapshot(provider, node_addon.api, list_id)['value']
+
+    now = datetime.datetime.utcnow()
+    stale_before = now - datetime.timedelta(seconds=settings.CITATIONS_SNAPSHOT_TTL)
+    if entry['synced'] < stale_before:
+        # Claim the refresh so that concurrent requests only enqueue it once;
+        # claims older than the TTL belong to refreshes that failed
+        result = collection.update(
+            {
+                '_id': snapshot_id,
+                'synced': entry['synced'],
+                '$or': [
+                    {'refreshing': {'$exists': False}},
+                    {'refreshing': {'$lt': stale_before}},
+                ],
+            },
+            {'$set': {'refreshing': now}},
+        )
+        if result and result.get('n'):
+            enqueue_task(refresh_snapshot.si(provider.provider_name, account._id, list_id))
+    return entry['value']
+
+
+def clear_snapshots(account_id):
+    """Remove all snapshots of an account."""
+    get_collection().remove({'_id': {'$regex': '^{0}:'.format(account_id)}})
+
+
+@app.task(ignore_result=True)
+def refresh_snapshot(provider_name, account_id, list_id):
+    """Bring a snapshot up to date, fetching only what changed since it was
+    taken where the provider supports it.
+    """
+    account = ExternalAccount.load(account_id)
+    if account is None:
+        clear_snapshots(account_id)
+        return
+    provider = get_citations_provider(provider_name)
+    api = get_service(account.provider)
+    api.account = account
+    entry = get_collection().find_one({'_id': _snapshot_id(account_id, list_id)})
+    try:
+        sync_snapshot(provider, api, list_id, entry)
+    except Exception:
+        # The stale snapshot is still served; a later request retries once the
+        # claim on the refresh expires
+        logger.exception('Could not refresh citations snapshot {0}'.format(
+            _snapshot_id(account_id, list_id)
+        ))
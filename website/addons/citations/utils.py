@@ -1,4 +1,6 @@
 # -*- coding: utf-8 -*-
+import collections
+
 from website.util import api_url_for, web_url_for
 
 def serialize_account(account):
@@ -34,3 +36,22 @@ def serialize_urls(node_addon):
         ret['owner'] = external_account.profile_url
 
     return ret
+
+def merge_citations(citations, changed, deleted_ids=(), key=lambda citation: citation['id']):
+    """Apply changes fetched from a provider to a list of CSL citations.
+    Changed citations replace those with the same key in place; new ones are
+    appended, and citations whose keys are in `deleted_ids` are dropped.
+    """
+    changed = collections.OrderedDict((key(each), each) for each in changed)
+    deleted_ids = set(deleted_ids)
+    merged = []
+    for citation in citations:
+        citation_key = key(citation)
+        if citation_key in deleted_ids:
+            continue
+        merged.append(changed.pop(citation_key, citation))
+    merged.extend(
+        each for citation_key, each in changed.iteritems()
+        if citation_key not in deleted_ids
+    )
+    return merged
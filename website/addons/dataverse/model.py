@@ -1,6 +1,4 @@
 # -*- coding: utf-8 -*-
-from time import sleep
-import requests
 import httplib as http
 
 import pymongo
@@ -14,7 +12,6 @@ from website.addons.base import (
     AddonOAuthNodeSettingsBase, AddonOAuthUserSettingsBase, GuidFile, exceptions,
 )
 from website.addons.base import StorageAddonBase
-from website.util import waterbutler_url_for
 
 from website.addons.dataverse.client import connect_from_settings_or_401
 from website.addons.dataverse import serializer
@@ -117,23 +114,7 @@ class AddonDataverseNodeSettings(StorageAddonBase, AddonOAuthNodeSettingsBase):
     def complete(self):
         return bool(self.has_auth and self.dataset_doi is not None)
 
-    def _get_fileobj_child_metadata(self, filenode, user, cookie=None, version=None):
-        kwargs = dict(
-            provider=self.config.short_name,
-            path=filenode.get('path', ''),
-            node=self.owner,
-            user=user,
-            view_only=True,
-        )
-        if cookie:
-            kwargs['cookie'] = cookie
-        if version:
-            kwargs['version'] = version
-        metadata_url = waterbutler_url_for(
-            'metadata',
-            **kwargs
-        )
-        res = requests.get(metadata_url)
+    def _parse_fileobj_child_metadata(self, res, version=None):
         if res.status_code != 200:
             # The Dataverse API returns a 404 if the dataset has no published files
             if res.status_code == http.NOT_FOUND and version == 'latest-published':
@@ -141,8 +122,6 @@ class AddonDataverseNodeSettings(StorageAddonBase, AddonOAuthNodeSettingsBase):
             raise HTTPError(res.status_code, data={
                 'error': res.json(),
             })
-        # TODO: better throttling?
-        sleep(1.0 / 5.0)
         return res.json().get('data', [])
 
     def find_or_create_file_guid(self, path):
@@ -6,11 +6,15 @@ import cachecontrol
 from requests.adapters import HTTPAdapter
 
 from website.addons.github import settings as github_settings
+from website.addons.github.cache import ETagCacheAdapter
 from website.addons.github.exceptions import NotFoundError
 
 
 # Initialize caches
-https_cache = cachecontrol.CacheControlAdapter()
+if github_settings.CACHE_BACKEND == 'mongo':
+    https_cache = ETagCacheAdapter()
+else:
+    https_cache = cachecontrol.CacheControlAdapter()
 default_adapter = HTTPAdapter()
 
 
@@ -27,6 +31,11 @@ class GitHub(object):
         else:
             self.gh3 = github3.GitHub()
 
+        # Repos and branches fetched through this connection, so that the
+        # several checks made while handling one request share API calls
+        self._repos = {}
+        self._branches = {}
+
         # Caching libary
         if github_settings.CACHE:
             self.gh3._session.mount('https://api.github.com/user', default_adapter)
@@ -58,7 +67,10 @@ class GitHub(object):
         :return: Dict of repo information
             See http://developer.github.com/v3/repos/#get
         """
-        rv = self.gh3.repository(user, repo)
+        key = (user, repo)
+        if key not in self._repos:
+            self._repos[key] = self.gh3.repository(user, repo)
+        rv = self._repos[key]
         if rv:
             return rv
         raise NotFoundError
@@ -89,9 +101,13 @@ class GitHub(object):
         :return: List of branch dicts
             http://developer.github.com/v3/repos/#list-branches
         """
-        if branch:
-            return [self.repo(user, repo).branch(branch)]
-        return self.repo(user, repo).iter_branches() or []
+        key = (user, repo, branch)
+        if key not in self._branches:
+            if branch:
+                self._branches[key] = [self.repo(user, repo).branch(branch)]
+            else:
+                self._branches[key] = list(self.repo(user, repo).iter_branches() or [])
+        return self._branches[key]
 
     # TODO: Test
     def starball(self, user, repo, archive='tar', ref='master'):
@@ -119,7 +135,9 @@ class GitHub(object):
         :param bool private: Make repo private; see
             http://developer.github.com/v3/repos/#edit
         """
-        return self.repo(user, repo).edit(repo, private=private)
+        rv = self.repo(user, repo).edit(repo, private=private)
+        self._repos.pop((user, repo), None)
+        return rv
 
     #########
     # Hooks #
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""Response cache for GitHub API calls, shared by all processes through
+MongoDB. Only the ETag and body of each response are stored, so stale entries
+can be revalidated with ``If-None-Match``; GitHub answers those with
+``304 Not Modified``, which does not count against the rate limit.
+
+Entries are keyed by a hash of the URL and the ``Authorization`` header, so
+that a response is only reused for the token it was fetched with, and tokens
+are never stored.
+"""
+
+import datetime
+import hashlib
+
+import requests
+from bson.binary import Binary
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from framework.mongo import database
+
+from website.addons.github import settings as github_settings
+
+
+COLLECTION = 'githubcache'
+
+# Response headers kept with the body; others come from the 304 response
+STORED_HEADERS = ('content-type', 'etag', 'last-modified', 'link')
+
+
+class ETagCacheAdapter(HTTPAdapter):
+    """Transport adapter that revalidates GET requests against the ETags of
+    earlier responses, serving the stored body when GitHub answers 304.
+    Entries unused for `CACHE_EXPIRATION` seconds are removed by MongoDB.
+    """
+
+    def __init__(self, collection=COLLECTION, *args, **kwargs):
+        super(ETagCacheAdapter, self).__init__(*args, **kwargs)
+        self.collection_name = collection
+
+    @property
+    def collection(self):
+        collection = database[self.collection_name]
+        # Cached by pymongo; only hits the server once per process
+        collection.ensure_index('date', expireAfterSeconds=github_settings.CACHE_EXPIRATION)
+        return collection
+
+    @staticmethod
+    def cache_key(request):
+        token = request.headers.get('Authorization') or ''
+        return hashlib.sha256('{0}\n{1}'.format(token, request.url)).hexdigest()
+
+    def send(self, request, stream=False, **kwargs):
+        if request.method != 'GET' or stream:
+            return super(ETagCacheAdapter, self).send(request, stream=stream, **kwargs)
+
+        key = self.cache_key(request)
+        entry = self.collection.find_one({'_id': key})
+        if entry is not None:
+            request.headers['If-None-Match'] = entry['etag']
+        response = super(ETagCacheAdapter, self).send(request, stream=stream, **kwargs)
+
+        if response.status_code == 304 and entry is not None:
+            self.collection.update({'_id': key}, {'$set': {'date': datetime.datetime.utcnow()}})
+            return self.build_cached_response(request, response, entry)
+        if response.status_code == 200 and response.headers.get('ETag'):
+            self.collection.update(
+                {'_id': key},
+                {'$set': {
+                    'etag': response.headers['ETag'],
+                    'headers': dict(
+                        (name, response.headers[name])
+                        for name in STORED_HEADERS
+                        if name in response.headers
+                    ),
+                    'body': Binary(response.content),
+                    'date': datetime.datetime.utcnow(),
+                }},
+                upsert=True,
+            )
+        return response
+
+    def build_cached_response(self, request, response, entry):
+        """Turn the 304 answer to a revalidation into the stored response."""
+        cached = requests.Response()
+        cached.status_code = 200
+        cached.reason = 'OK'
+        cached.headers = CaseInsensitiveDict(response.headers)
+        cached.headers.update(entry['headers'])
+        cached._content = str(entry['body'])
+        cached.encoding = get_encoding_from_headers(cached.headers)
+        cached.url = response.url
+        cached.request = request
+        cached.connection = self
+        cached.elapsed = response.elapsed
+        return cached
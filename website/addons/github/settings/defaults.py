@@ -16,3 +16,9 @@ HOOK_CONTENT_TYPE = 'json'
 MAX_RENDER_SIZE = None
 
 CACHE = False
+# Where cached API responses are kept: 'mongo' to share the ETags and bodies
+# of responses between processes, keyed by token; 'memory' for a per-process
+# cachecontrol cache
+CACHE_BACKEND = 'mongo'
+# Seconds before unused cached responses are dropped
+CACHE_EXPIRATION = 60 * 60 * 24
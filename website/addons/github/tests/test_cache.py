@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+import json
+
+import mock
+import httpretty
+import requests
+from nose.tools import *  # noqa
+
+from tests.base import OsfTestCase
+
+from website.addons.github.api import GitHub
+from website.addons.github.cache import ETagCacheAdapter
+from website.addons.github.exceptions import NotFoundError
+
+
+REPO_URL = 'https://api.github.com/repos/octo-cat/mock-repo'
+ETAG = '"644b5b0155e6404a9cc4bd9d8b1ae730"'
+
+
+class FakeGitHub(object):
+    """Fake GitHub API server that answers conditional requests for an
+    unchanged resource with 304 Not Modified, as GitHub does.
+    """
+    def __init__(self):
+        self.requests = []
+
+    def __call__(self, request, uri, headers):
+        self.requests.append(request)
+        headers['ETag'] = ETAG
+        if request.headers.get('If-None-Match') == ETAG:
+            return 304, headers, ''
+        headers['Content-Type'] = 'application/json'
+        return 200, headers, json.dumps({'name': 'mock-repo'})
+
+
+class TestETagCacheAdapter(OsfTestCase):
+
+    def setUp(self):
+        super(TestETagCacheAdapter, self).setUp()
+        ETagCacheAdapter().collection.remove()
+        self.fake = FakeGitHub()
+
+    def make_session(self, token='token abc'):
+        # Each session stands in for a separate process sharing the cache
+        session = requests.Session()
+        session.headers['Authorization'] = token
+        session.mount('https://', ETagCacheAdapter())
+        return session
+
+    @httpretty.activate
+    def test_revalidates_across_sessions(self):
+        httpretty.register_uri(httpretty.GET, REPO_URL, body=self.fake)
+        first = self.make_session().get(REPO_URL)
+        second = self.make_session().get(REPO_URL)
+        assert_equal(first.json(), {'name': 'mock-repo'})
+        assert_equal(second.status_code, 200)
+        assert_equal(second.json(), {'name': 'mock-repo'})
+        assert_equal(len(self.fake.requests), 2)
+        assert_is_none(self.fake.requests[0].headers.get('If-None-Match'))
+        assert_equal(self.fake.requests[1].headers.get('If-None-Match'), ETAG)
+
+    @httpretty.activate
+    def test_entries_not_shared_between_tokens(self):
+        httpretty.register_uri(httpretty.GET, REPO_URL, body=self.fake)
+        self.make_session().get(REPO_URL)
+        self.make_session(token='token other').get(REPO_URL)
+        assert_is_none(self.fake.requests[1].headers.get('If-None-Match'))
+
+    @httpretty.activate
+    def test_token_not_stored(self):
+        httpretty.register_uri(httpretty.GET, REPO_URL, body=self.fake)
+        self.make_session().get(REPO_URL)
+        entry = ETagCacheAdapter().collection.find_one()
+        assert_equal(set(entry.keys()), {'_id', 'etag', 'headers', 'body', 'date'})
+        assert_not_in('abc', repr(entry))
+
+
+class TestConnectionDedup(OsfTestCase):
+
+    def setUp(self):
+        super(TestConnectionDedup, self).setUp()
+        self.connection = GitHub()
+        self.connection.gh3 = mock.Mock()
+
+    def test_repo_fetched_once(self):
+        self.connection.repo('octo-cat', 'mock-repo')
+        self.connection.repo('octo-cat', 'mock-repo')
+        self.connection.branches('octo-cat', 'mock-repo')
+        self.connection.gh3.repository.assert_called_once_with('octo-cat', 'mock-repo')
+
+    def test_branches_fetched_once(self):
+        repo = self.connection.gh3.repository.return_value
+        repo.iter_branches.return_value = iter(['master', 'dev'])
+        assert_equal(self.connection.branches('octo-cat', 'mock-repo'), ['master', 'dev'])
+        assert_equal(self.connection.branches('octo-cat', 'mock-repo'), ['master', 'dev'])
+        assert_equal(repo.iter_branches.call_count, 1)
+
+    def test_missing_repo(self):
+        self.connection.gh3.repository.return_value = None
+        for _ in range(2):
+            with assert_raises(NotFoundError):
+                self.connection.repo('octo-cat', 'mock-repo')
+        assert_equal(self.connection.gh3.repository.call_count, 1)
@@ -4,5 +4,6 @@ from mendeley.session import MendeleySession
 class APISession(MendeleySession):
 
     def request(self, *args, **kwargs):
-        kwargs['params'] = {'view': 'all', 'limit': '500'}
+        # Keep parameters such as `modified_since` set by the SDK
+        kwargs['params'] = dict(kwargs.get('params') or {}, view='all', limit='500')
         return super(APISession, self).request(*args, **kwargs)
@@ -1,17 +1,20 @@
 # -*- coding: utf-8 -*-
 
 import time
+import datetime
 
 import mendeley
 from modularodm import fields
 
 from website.addons.base import AddonOAuthNodeSettingsBase
 from website.addons.base import AddonOAuthUserSettingsBase
+from website.addons.citations.utils import merge_citations
 from website.addons.citations.utils import serialize_folder
 from website.addons.mendeley import serializer
 from website.addons.mendeley import settings
 from website.addons.mendeley.api import APISession
 from website.oauth.models import ExternalProvider
+from website.oauth.refresh import get_access_token
 from website.util import web_url_for
 
 
@@ -24,6 +27,7 @@ class Mendeley(ExternalProvider):
 
     auth_url_base = 'https://api.mendeley.com/oauth/authorize'
     callback_url = 'https://api.mendeley.com/oauth/token'
+    refresh_url = 'https://api.mendeley.com/oauth/token'
     default_scopes = ['all']
 
     _client = None
@@ -64,10 +68,12 @@ class Mendeley(ExternalProvider):
     def client(self):
         """An API session with Mendeley"""
         if not self._client:
+            # Refreshed ahead of expiry by `website.oauth.refresh`
+            token = get_access_token(self.account)
             self._client = self._get_client({
-                'access_token': self.account.oauth_key,
+                'access_token': token.key,
                 'refresh_token': self.account.refresh_token,
-                'expires_at': time.mktime(self.account.expires_at.timetuple()),
+                'expires_at': time.mktime(token.expires_at.timetuple()),
                 'token_type': 'bearer',
             })
         return self._client
@@ -102,16 +108,62 @@ class Mendeley(ExternalProvider):
             return self._citations_for_mendeley_folder(folder)
         return self._citations_for_mendeley_user()
 
+    def sync_list(self, list_id='ROOT', citations=None, since=None):
+        """Get a single CitationList, along with a token to pass as `since`
+        to the next sync. Given the citations of an earlier sync, only the
+        documents modified since are fetched.
+
+        :param str list_id: ID for a Mendeley folder. Optional.
+        :param list citations: Citations returned by an earlier sync
+        :param str since: Token returned by an earlier sync
+        :return tuple: CitationList and token
+        """
+        # Overlap with the previous sync to allow for clock skew; documents
+        # fetched twice are simply replaced
+        token = (
+            datetime.datetime.utcnow() - datetime.timedelta(minutes=1)
+        ).strftime('%Y-%m-%dT%H:%M:%S.000Z')
+        if citations is None or since is None:
+            return self.get_list(list_id), token
+
+        modified = [
+            self._citation_for_mendeley_document(document)
+            for document in self.client.documents.iter(page_size=500, modified_since=since)
+        ]
+        if list_id == 'ROOT':
+            deleted_ids = [
+                document.id
+                for document in self.client.documents.iter(page_size=500, deleted_since=since)
+            ]
+            return merge_citations(citations, modified, deleted_ids), token
+
+        # Folder membership has no modification date, so it is always listed;
+        # only documents new to the snapshot are fetched individually
+        known = {
+            citation['id']: citation
+            for citation in merge_citations(citations, modified)
+        }
+        document_ids = self._document_ids_for_mendeley_folder(self.client.folders.get(list_id))
+        for document_id in document_ids:
+            if document_id not in known:
+                known[document_id] = self._citation_for_mendeley_document(
+                    self.client.documents.get(document_id)
+                )
+        return [known[document_id] for document_id in document_ids], token
+
     def _folder_metadata(self, folder_id):
         folder = self.client.folders.get(folder_id)
         return folder
 
-    def _citations_for_mendeley_folder(self, folder):
-
-        document_ids = [
+    def _document_ids_for_mendeley_folder(self, folder):
+        return [
             document.id
             for document in folder.documents.iter(page_size=500)
         ]
+
+    def _citations_for_mendeley_folder(self, folder):
+
+        document_ids = self._document_ids_for_mendeley_folder(folder)
         citations = {
             citation['id']: citation
             for citation in self._citations_for_mendeley_user()
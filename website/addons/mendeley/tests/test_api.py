@@ -36,3 +36,15 @@ class MendeleyApiTestCase(OsfTestCase):
         client.request()
         args, kwargs = mock_request.call_args
         assert_equal(kwargs['params'], {'view': 'all', 'limit': '500'})
+
+    @mock.patch('website.addons.mendeley.api.MendeleySession.request')
+    def test_request_params_kept(self, mock_request):
+        # Parameters set by the SDK are sent along with the defaults
+        client = APISession(self.mock_partial, self.mock_credentials)
+        client.request(params={'modified_since': '2015-01-01T00:00:00.000Z'})
+        args, kwargs = mock_request.call_args
+        assert_equal(kwargs['params'], {
+            'view': 'all',
+            'limit': '500',
+            'modified_since': '2015-01-01T00:00:00.000Z',
+        })
@@ -48,15 +48,19 @@ class MendeleyProviderTestCase(OsfTestCase):
         assert_equal(res.get('provider_id'), 'testid')
         assert_equal(res.get('display_name'), 'testdisplay')
 
+    @mock.patch('website.addons.mendeley.model.get_access_token')
     @mock.patch('website.addons.mendeley.model.Mendeley._get_client')
-    def test_client_not_cached(self, mock_get_client):
+    def test_client_not_cached(self, mock_get_client, mock_get_access_token):
         # The first call to .client returns a new client
+        expires_at = datetime.datetime.now()
+        mock_get_access_token.return_value = mock.Mock(key='fresh_key', expires_at=expires_at)
         mock_account = mock.Mock()
-        mock_account.expires_at = datetime.datetime.now()
+        mock_account.expires_at = expires_at
         self.provider.account = mock_account
         self.provider.client
-        mock_get_client.assert_called
+        mock_get_access_token.assert_called_once_with(mock_account)
         assert_true(mock_get_client.called)
+        assert_equal(mock_get_client.call_args[0][0]['access_token'], 'fresh_key')
 
     @mock.patch('website.addons.mendeley.model.Mendeley._get_client')
     def test_client_cached(self, mock_get_client):
@@ -79,6 +83,34 @@ class MendeleyProviderTestCase(OsfTestCase):
         assert_equal(res[1]['name'], mock_folders[0].name)
         assert_equal(res[1]['id'], mock_folders[0].json['id'])
 
+    @mock.patch('website.addons.mendeley.model.Mendeley._citation_for_mendeley_document')
+    def test_sync_list_folder_incremental(self, mock_citation):
+        mock_citation.side_effect = lambda document: {'id': document.id, 'new': True}
+        mock_client = mock.Mock()
+        mock_client.documents.iter.return_value = [mock.Mock(id='b')]
+        mock_client.documents.get.side_effect = lambda document_id: mock.Mock(id=document_id)
+        mock_client.folders.get.return_value.documents.iter.return_value = [
+            mock.Mock(id='a'), mock.Mock(id='b'), mock.Mock(id='c'),
+        ]
+        self.provider._client = mock_client
+
+        citations, token = self.provider.sync_list(
+            'folder',
+            [{'id': 'a'}, {'id': 'b'}],
+            '2015-01-01T00:00:00.000Z',
+        )
+        # Modified and new documents are fetched; unchanged ones are reused
+        assert_equal(citations, [
+            {'id': 'a'},
+            {'id': 'b', 'new': True},
+            {'id': 'c', 'new': True},
+        ])
+        mock_client.documents.iter.assert_called_once_with(
+            page_size=500,
+            modified_since='2015-01-01T00:00:00.000Z',
+        )
+        mock_client.documents.get.assert_called_once_with('c')
+
 class MendeleyNodeSettingsTestCase(OsfTestCase):
 
     def setUp(self):
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+from nose.tools import *  # noqa
+
+import datetime
+
+import mock
+
+from tests.base import OsfTestCase
+from tests.factories import ProjectFactory, UserFactory
+
+from website.addons.citations import snapshot
+from website.addons.citations.utils import merge_citations
+from website.addons.mendeley.provider import MendeleyCitationsProvider
+from website.addons.mendeley.tests.factories import (
+    MendeleyAccountFactory,
+    MendeleyNodeSettingsFactory,
+)
+
+
+class MergeCitationsTestCase(OsfTestCase):
+
+    def test_merge_citations(self):
+        citations = [{'id': 'a', 'title': 'A'}, {'id': 'b'}, {'id': 'c'}]
+        changed = [{'id': 'd'}, {'id': 'a', 'title': 'A2'}, {'id': 'e'}]
+        merged = merge_citations(citations, changed, deleted_ids=['b', 'e'])
+        assert_equal(merged, [{'id': 'a', 'title': 'A2'}, {'id': 'c'}, {'id': 'd'}])
+
+    def test_merge_citations_key(self):
+        citations = [{'id': '1/a'}, {'id': '1/b'}]
+        merged = merge_citations(citations, [], ['a'], key=lambda each: each['id'].split('/')[-1])
+        assert_equal(merged, [{'id': '1/b'}])
+
+
+class CitationsSnapshotTestCase(OsfTestCase):
+
+    def setUp(self):
+        super(CitationsSnapshotTestCase, self).setUp()
+        self.account = MendeleyAccountFactory()
+        self.user = UserFactory(external_accounts=[self.account])
+        self.node_addon = MendeleyNodeSettingsFactory(owner=ProjectFactory(creator=self.user))
+        self.node_addon.external_account = self.account
+        self.api = mock.Mock()
+        self.api.account = self.account
+        self.api.sync_list.return_value = ([{'id': 'a'}], 'token-1')
+        self.node_addon._api = self.api
+        self.provider = MendeleyCitationsProvider()
+
+    def tearDown(self):
+        super(CitationsSnapshotTestCase, self).tearDown()
+        snapshot.get_collection().remove()
+
+    def _age(self, list_id, seconds):
+        snapshot.get_collection().update(
+            {'_id': snapshot._snapshot_id(self.account._id, list_id)},
+            {'$set': {'synced': datetime.datetime.utcnow() - datetime.timedelta(seconds=seconds)}},
+        )
+
+    def test_first_read_syncs(self):
+        citations = snapshot.get_snapshot(self.provider, self.node_addon, 'ROOT')
+        assert_equal(citations, [{'id': 'a'}])
+        self.api.sync_list.assert_called_once_with('ROOT')
+
+    def test_fresh_snapshot_served_without_api_calls(self):
+        snapshot.get_snapshot(self.provider, self.node_addon, 'ROOT')
+        self.api.reset_mock()
+        with mock.patch.object(snapshot, 'enqueue_task') as mock_enqueue:
+            citations = snapshot.get_snapshot(self.provider, self.node_addon, 'ROOT')
+        assert_equal(citations, [{'id': 'a'}])
+        assert_false(self.api.sync_list.called)
+        assert_false(mock_enqueue.called)
+
+    def test_folders_snapshot(self):
+        self.api.citation_lists.return_value = [{'id': 'ROOT'}]
+        folders = snapshot.get_snapshot(self.provider, self.node_addon, snapshot.FOLDERS)
+        assert_equal(folders, [{'id': 'ROOT'}])
+        self.api.citation_lists.assert_called_once_with(self.provider._extract_folder)
+
+    def test_stale_snapshot_served_and_refreshed_once(self):
+        snapshot.get_snapshot(self.provider, self.node_addon, 'ROOT')
+        self._age('ROOT', snapshot.settings.CITATIONS_SNAPSHOT_TTL + 10)
+        self.api.reset_mock()
+        with mock.patch.object(snapshot, 'enqueue_task') as mock_enqueue:
+            assert_equal(snapshot.get_snapshot(self.provider, self.node_addon, 'ROOT'), [{'id': 'a'}])
+            assert_equal(snapshot.get_snapshot(self.provider, self.node_addon, 'ROOT'), [{'id': 'a'}])
+        assert_false(self.api.sync_list.called)
+        assert_equal(mock_enqueue.call_count, 1)
+
+    @mock.patch('website.addons.citations.snapshot.get_service')
+    def test_refresh_is_incremental(self, mock_get_service):
+        snapshot.get_snapshot(self.provider, self.node_addon, 'ROOT')
+        self.api.sync_list.return_value = ([{'id': 'a'}, {'id': 'b'}], 'token-2')
+        mock_get_service.return_value = self.api
+        snapshot.refresh_snapshot('mendeley', self.account._id, 'ROOT')
+        self.api.sync_list.assert_called_with('ROOT', [{'id': 'a'}], 'token-1')
+        with mock.patch.object(snapshot, 'enqueue_task'):
+            citations = snapshot.get_snapshot(self.provider, self.node_addon, 'ROOT')
+        assert_equal(citations, [{'id': 'a'}, {'id': 'b'}])
+
+    @mock.patch('website.addons.citations.snapshot.get_service')
+    def test_refresh_is_full_when_due(self, mock_get_service):
+        snapshot.get_snapshot(self.provider, self.node_addon, 'ROOT')
+        snapshot.get_collection().update(
+            {'_id': snapshot._snapshot_id(self.account._id, 'ROOT')},
+            {'$set': {'full_synced': datetime.datetime(2000, 1, 1)}},
+        )
+        mock_get_service.return_value = self.api
+        snapshot.refresh_snapshot('mendeley', self.account._id, 'ROOT')
+        self.api.sync_list.assert_called_with('ROOT')
+
+    def test_citation_list_paginated(self):
+        self.api.sync_list.return_value = ([{'id': str(each)} for each in range(5)], 'token-1')
+        self.api.citation_lists.return_value = [
+            {'id': 'ROOT', 'provider_list_id': None, 'parent_list_id': '__'},
+        ]
+        with mock.patch.object(MendeleyCitationsProvider, 'serializer') as mock_serializer:
+            mock_serializer.return_value.serialize_citation.side_effect = lambda each: each
+            res = self.provider.citation_list(self.node_addon, self.user, 'ROOT', show='citations', page=1, size=2)
+        assert_equal(res['contents'], [{'id': '2'}, {'id': '3'}])
+        assert_equal(res['total'], 5)
+        assert_equal(res['page'], 1)
+        assert_equal(res['pages'], 3)
@@ -98,9 +98,12 @@ def mendeley_citation_list(auth, node_addon, mendeley_list_id=None, **kwargs):
     """
     This function collects a listing of folders and citations based on the
     passed mendeley_list_id. If mendeley_list_id is None, then all of the
-    authorizer's folders and citations are listed
+    authorizer's folders and citations are listed. Pass `page` and `size` to
+    paginate the citations.
     """
 
     provider = MendeleyCitationsProvider()
     show = request.args.get('view', 'all')
-    return provider.citation_list(node_addon, auth.user, mendeley_list_id, show)
+    page = request.args.get('page', type=int)
+    size = request.args.get('size', type=int)
+    return provider.citation_list(node_addon, auth.user, mendeley_list_id, show, page=page, size=size)
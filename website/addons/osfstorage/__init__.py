@@ -9,6 +9,7 @@ MODELS = [
     model.OsfStorageFileNode,
     model.OsfStorageGuidFile,
     model.OsfStorageFileVersion,
+    model.OsfStorageBlob,
     model.OsfStorageNodeSettings,
     model.OsfStorageTrashedFileNode,
 ]
@@ -39,6 +40,7 @@ INCLUDE_JS = {
 
 HAS_HGRID_FILES = True
 GET_HGRID_DATA = views.osf_storage_root
+LOCAL_HGRID_DATA = True
 
 MAX_FILE_SIZE = 128  # 128 MB
 HIGH_MAX_FILE_SIZE = 5 * 1024  # 5 GB
@@ -3,8 +3,10 @@ from __future__ import unicode_literals
 import os
 import bson
 import logging
+import datetime
 
 import furl
+import pymongo
 
 from modularodm import fields, Q
 from dateutil.parser import parse as parse_date
@@ -12,8 +14,8 @@ from modularodm.exceptions import NoResultsFound
 from modularodm.storage.base import KeyExistsException
 
 from framework.mongo import StoredObject
-from framework.mongo.utils import unique_on
-from framework.analytics import get_basic_counters
+from framework.mongo.utils import unique_on, bulk_load
+from framework.analytics import get_basic_counters, get_basic_counters_bulk
 
 from website.addons.base import AddonNodeSettingsBase, GuidFile, StorageAddonBase
 from website.addons.osfstorage import utils
@@ -127,6 +129,15 @@ class OsfStorageFileNode(StoredObject):
             grandchild1
     """
 
+    __indices__ = [
+        {
+            'key_or_list': [
+                ('parent', pymongo.ASCENDING),
+                ('_id', pymongo.ASCENDING),
+            ],
+        },
+    ]
+
     _id = fields.StringField(primary=True, default=lambda: str(bson.ObjectId()))
 
     is_deleted = fields.BooleanField(default=False)
@@ -135,6 +146,9 @@ class OsfStorageFileNode(StoredObject):
     parent = fields.ForeignField('OsfStorageFileNode', index=True)
     versions = fields.ForeignField('OsfStorageFileVersion', list=True)
     node_settings = fields.ForeignField('OsfStorageNodeSettings', required=True, index=True)
+    # IDs of all folders above this node, root first. Indexed so that whole
+    # subtrees can be found, moved and removed with a few queries
+    ancestors = fields.StringField(list=True, index=True)
 
     @classmethod
     def create_child_by_path(cls, path, node_settings):
@@ -218,28 +232,41 @@ class OsfStorageFileNode(StoredObject):
     def node(self):
         return self.node_settings.owner
 
+    @property
+    def lineage_ids(self):
+        """IDs of this node and all folders above it, root first."""
+        if self.parent and not self.ancestors:
+            # Not yet migrated by scripts/osfstorage/migrate_ancestors.py
+            return self.parent.lineage_ids + [self._id]
+        return self.ancestors + [self._id]
+
     def materialized_path(self):
-        """creates the full path to a the given filenode
-        Note: Possibly high complexity/ many database calls
-        USE SPARINGLY
+        """Build the full path of this node from the names of its ancestors,
+        which are loaded with a single query.
         """
         if not self.parent:
             return '/'
-        # Note: ODM cache can be abused here
-        # for highly nested folders calling
-        # list(self.__class__.find(Q(nodesetting),Q(folder))
-        # may result in a massive increase in performance
-        def lineage():
-            current = self
-            while current:
-                yield current
-                current = current.parent
-
-        path = os.path.join(*reversed([x.name for x in lineage()]))
+        ancestor_ids = self.lineage_ids[:-1]
+        ancestors = dict(
+            (ancestor._id, ancestor)
+            for ancestor in bulk_load(self.__class__, ancestor_ids)
+        )
+        names = [ancestors[each].name for each in ancestor_ids] + [self.name]
+        path = os.path.join(*names)
         if self.is_folder:
             return '/{}/'.format(path)
         return '/{}'.format(path)
 
+    def find_descendants(self, fields=None):
+        """Raw storage data of every node below this one.
+
+        :param list fields: Fields to return, defaults to all
+        """
+        return self._storage[0].store.find(
+            {'ancestors': self._id},
+            dict((field, True) for field in fields) if fields else None,
+        )
+
     @utils.must_be('folder')
     def find_child_by_name(self, name, kind='file'):
         return self.__class__.find_one(
@@ -260,21 +287,24 @@ class OsfStorageFileNode(StoredObject):
             name=name,
             kind=kind,
             parent=self,
-            node_settings=self.node_settings
+            node_settings=self.node_settings,
+            ancestors=self.lineage_ids,
         )
         if save:
             child.save()
         return child
 
+    def _download_page(self, version=None):
+        parts = ['download', self.node._id, self._id]
+        if version is not None:
+            parts.append(version)
+        return ':'.join([format(part) for part in parts])
+
     def get_download_count(self, version=None):
         if self.is_folder:
             return None
 
-        parts = ['download', self.node._id, self._id]
-        if version is not None:
-            parts.append(version)
-        page = ':'.join([format(part) for part in parts])
-        _, count = get_basic_counters(page)
+        _, count = get_basic_counters(self._download_page(version))
 
         return count or 0
 
@@ -295,12 +325,18 @@ class OsfStorageFileNode(StoredObject):
         if latest_version and latest_version.is_duplicate(version):
             return latest_version
 
+        sha256 = (metadata or {}).get('sha256')
+        if latest_version and sha256 and latest_version.metadata.get('sha256') == sha256:
+            # Same content uploaded again
+            return latest_version
+
         if metadata:
             version.update_metadata(metadata)
 
         version._find_matching_archive(save=False)
 
         version.save()
+        OsfStorageBlob.add_reference(version)
         self.versions.append(version)
         self.save()
 
@@ -315,6 +351,9 @@ class OsfStorageFileNode(StoredObject):
         raise errors.VersionNotFoundError
 
     def delete(self, recurse=True):
+        """Move this node, and unless `recurse` is false everything below it,
+        to the trash. Subtrees are moved with one insert and one remove.
+        """
         trashed = OsfStorageTrashedFileNode()
         trashed._id = self._id
         trashed.name = self.name
@@ -322,18 +361,35 @@ class OsfStorageFileNode(StoredObject):
         trashed.parent = self.parent
         trashed.versions = self.versions
         trashed.node_settings = self.node_settings
+        trashed.ancestors = self.ancestors
 
         trashed.save()
 
         if self.is_folder and recurse:
-            for child in self.children:
-                child.delete()
+            descendants = list(self.find_descendants())
+            if descendants:
+                for data in descendants:
+                    data.pop('is_deleted', None)
+                OsfStorageTrashedFileNode._storage[0].store.insert(descendants, manipulate=False)
+                descendant_ids = [data['_id'] for data in descendants]
+                self._storage[0].store.remove({'_id': {'$in': descendant_ids}})
+                for key in descendant_ids:
+                    self._clear_caches(key)
 
         self.__class__.remove_one(self)
 
     def serialized(self, include_full=False):
         """Build Treebeard JSON for folder or file.
         """
+        if self.is_folder:
+            return self._serialize(None, None, include_full=include_full)
+        return self._serialize(
+            self.get_version(),
+            self.get_download_count(),
+            include_full=include_full,
+        )
+
+    def _serialize(self, version, downloads, include_full=False):
         data = {
             'id': self._id,
             'path': self.path,
@@ -347,38 +403,119 @@ class OsfStorageFileNode(StoredObject):
         if self.is_folder:
             return data
 
-        version = self.get_version()
-
         data.update({
             'version': len(self.versions),
-            'downloads': self.get_download_count(),
+            'downloads': downloads,
             'size': version.size if version else None,
             'contentType': version.content_type if version else None,
-            'md5': self.versions[-1].metadata.get('md5') if self.versions else None,
-            'sha256': self.versions[-1].metadata.get('sha256') if self.versions else None,
+            'md5': version.metadata.get('md5') if version else None,
+            'sha256': version.metadata.get('sha256') if version else None,
             'modified': version.date_modified.isoformat() if version and version.date_modified else None,
         })
         return data
 
+    @classmethod
+    def serialize_many(cls, file_nodes):
+        """Serialize file nodes as `serialized` does, loading the latest
+        versions and the download counts of all files with one query each.
+        """
+        files = [each for each in file_nodes if each.is_file]
+        version_ids = {}
+        for each in files:
+            # Read version IDs from storage data so no versions are loaded
+            stored_versions = each.to_storage()['versions']
+            if stored_versions:
+                version_ids[each._id] = stored_versions[-1]
+        versions = dict(
+            (version._id, version)
+            for version in bulk_load(OsfStorageFileVersion, version_ids.values())
+        )
+        pages = dict((each._id, each._download_page()) for each in files)
+        counters = get_basic_counters_bulk(pages.values())
+        return [
+            each._serialize(
+                versions.get(version_ids.get(each._id)),
+                counters[pages[each._id]][1] or 0,
+            )
+            if each.is_file else each._serialize(None, None)
+            for each in file_nodes
+        ]
+
+    @utils.must_be('folder')
+    def find_children_page(self, size, cursor=None):
+        """Load one page of the children of this folder, ordered by ID, with
+        a single query.
+
+        :param int size: Number of children per page
+        :param str cursor: ID of the last child of the previous page
+        :return: Tuple of children and the cursor of the next page, or `None`
+            if this is the last page
+        """
+        spec = {'parent': self._id}
+        if cursor:
+            spec['_id'] = {'$gt': cursor}
+        results = list(
+            self._storage[0].store.find(spec).sort('_id', pymongo.ASCENDING).limit(size + 1)
+        )
+        next_cursor = results[size - 1]['_id'] if len(results) > size else None
+        children = [
+            self.__class__.load(key=data['_id'], data=data)
+            for data in results[:size]
+        ]
+        return children, next_cursor
+
+    def iter_serialized_children(self, batch_size):
+        """Serialize all children of this folder, `batch_size` at a time."""
+        cursor = None
+        while True:
+            children, cursor = self.find_children_page(batch_size, cursor=cursor)
+            for data in self.serialize_many(children):
+                yield data
+            if cursor is None:
+                return
+
     def copy_under(self, destination_parent, name=None):
         return utils.copy_files(self, destination_parent.node_settings, destination_parent, name=name)
 
     def move_under(self, destination_parent, name=None):
+        old_lineage = self.lineage_ids
         self.name = name or self.name
         self.parent = destination_parent
-        self._update_node_settings(save=True)
-        # Trust _update_node_settings to save us
+        self.node_settings = destination_parent.node_settings
+        self.ancestors = destination_parent.lineage_ids
+        self.save()
+
+        if self.is_folder:
+            self._update_descendants(old_lineage)
 
         return self
 
-    def _update_node_settings(self, recursive=True, save=True):
-        if self.parent is not None:
-            self.node_settings = self.parent.node_settings
-        if save:
-            self.save()
-        if recursive and self.is_folder:
-            for child in self.children:
-                child._update_node_settings(save=save)
+    def _update_descendants(self, old_lineage):
+        """Rewrite the ancestors and node settings of everything below this
+        folder after it has moved from `old_lineage`. Children of a folder
+        share their ancestors, so the subtree is updated with one query per
+        folder rather than one save per node.
+        """
+        collection = self._storage[0].store
+        new_lineage = self.lineage_ids
+        node_settings_id = self.node_settings._id
+        folders = [{'_id': self._id, 'ancestors': old_lineage[:-1]}]
+        folders.extend(collection.find(
+            {'ancestors': self._id, 'kind': 'folder'},
+            {'ancestors': True},
+        ))
+        for folder in folders:
+            ancestors = folder['ancestors'] + [folder['_id']]
+            collection.update(
+                {'parent': folder['_id']},
+                {'$set': {
+                    'ancestors': new_lineage + ancestors[len(old_lineage):],
+                    'node_settings': node_settings_id,
+                }},
+                multi=True,
+            )
+        for data in self.find_descendants(fields=['_id']):
+            self._clear_caches(data['_id'])
 
     def __repr__(self):
         return '<{}(name={!r}, node_settings={!r})>'.format(
@@ -393,6 +530,14 @@ class OsfStorageFileVersion(StoredObject):
     about where the file is located, hashes and datetimes
     """
 
+    __indices__ = [
+        {
+            'key_or_list': [
+                ('metadata.sha256', pymongo.ASCENDING),
+            ],
+        },
+    ]
+
     _id = fields.StringField(primary=True, default=lambda: str(bson.ObjectId()))
     creator = fields.ForeignField('user', required=True)
 
@@ -447,6 +592,14 @@ class OsfStorageFileVersion(StoredObject):
             # Incorrect version
             self.date_modified = parse_date(self.metadata['modified'], ignoretz=True)
         self.save()
+        if 'archive' in metadata:
+            OsfStorageBlob.record_archive(self)
+
+    @property
+    def blob(self):
+        """The OsfStorageBlob holding the content of this version, if known."""
+        sha256 = self.metadata.get('sha256')
+        return OsfStorageBlob.load(sha256) if sha256 else None
 
     def _find_matching_archive(self, save=True):
         """Find another version with the same sha256 as this file.
@@ -460,6 +613,16 @@ class OsfStorageFileVersion(StoredObject):
             # Shouldn't ever happen, but we already have an archive
             return True  # We've found ourself
 
+        blob = self.blob
+        if blob and blob.archive:
+            self.metadata['vault'] = blob.vault
+            self.metadata['archive'] = blob.archive
+            if save:
+                self.save()
+            return True
+
+        # Fall back to versions whose blobs have not been recorded by
+        # scripts/osfstorage/migrate_blobs.py
         qs = self.__class__.find(
             Q('_id', 'ne', self._id) &
             Q('metadata.vault', 'ne', None) &
@@ -479,6 +642,107 @@ class OsfStorageFileVersion(StoredObject):
         return True
 
 
+class OsfStorageBlob(StoredObject):
+    """Content stored by OSF Storage, keyed by its sha256. Versions with the
+    same content share a blob, so it is backed up to Glacier and protected by
+    parity files only once.
+    """
+
+    _id = fields.StringField(primary=True)  # sha256 of the content
+
+    # Location of the first version stored with this content; see
+    # OsfStorageFileVersion.location
+    location = fields.DictionaryField()
+    size = fields.IntegerField()
+    date_created = fields.DateTimeField(auto_now_add=True)
+
+    # Number of versions with this content
+    ref_count = fields.IntegerField(default=0)
+
+    # Glacier backup of the content, if any
+    vault = fields.StringField()
+    archive = fields.StringField()
+    # Whether parity files of the content are known to exist
+    has_parity = fields.BooleanField(default=False)
+
+    @classmethod
+    def _update(cls, sha256, update, upsert=False):
+        data = cls._storage[0].store.find_and_modify(
+            {'_id': sha256},
+            update,
+            upsert=upsert,
+            new=True,
+        )
+        cls._clear_caches(sha256)
+        if data is None:
+            return None
+        return cls.load(key=sha256, data=data)
+
+    @classmethod
+    def add_reference(cls, version):
+        """Atomically count `version` as a reference to the blob of its
+        content, creating the blob if this is the first.
+
+        :return: The blob, or None if the content hash of `version` is unknown
+        """
+        sha256 = version.metadata.get('sha256')
+        if not sha256:
+            return None
+        update = {
+            '$inc': {'ref_count': 1},
+            '$setOnInsert': {
+                'location': version.location,
+                'size': version.size,
+                'date_created': datetime.datetime.utcnow(),
+                'has_parity': False,
+            },
+        }
+        if version.archive:
+            update['$set'] = {
+                'vault': version.metadata.get('vault'),
+                'archive': version.archive,
+            }
+        return cls._update(sha256, update, upsert=True)
+
+    @classmethod
+    def record_archive(cls, version):
+        """Record the Glacier backup of `version` on the blob of its content."""
+        sha256 = version.metadata.get('sha256')
+        if not sha256:
+            return None
+        return cls._update(sha256, {'$set': {
+            'vault': version.metadata.get('vault'),
+            'archive': version.archive,
+        }})
+
+    @classmethod
+    def record_parity(cls, sha256):
+        return cls._update(sha256, {'$set': {'has_parity': True}})
+
+    @classmethod
+    def get_savings(cls):
+        """Summarize storage saved by deduplicating content.
+
+        :return: Dict of the number of `blobs`, the bytes `stored` once per
+            blob, and the bytes `saved` by not storing duplicates
+        """
+        result = cls._storage[0].store.aggregate([
+            {'$group': {
+                '_id': None,
+                'blobs': {'$sum': 1},
+                'stored': {'$sum': '$size'},
+                'referenced': {'$sum': {'$multiply': ['$size', '$ref_count']}},
+            }},
+        ])['result']
+        if not result:
+            return {'blobs': 0, 'stored': 0, 'saved': 0}
+        return {
+            'blobs': result[0]['blobs'],
+            'stored': result[0]['stored'],
+            'saved': result[0]['referenced'] - result[0]['stored'],
+        }
+
+
 @unique_on(['node', 'path'])
 class OsfStorageGuidFile(GuidFile):
     """A reference back to a OsfStorageFileNode
@@ -544,3 +808,4 @@ class OsfStorageTrashedFileNode(StoredObject):
     parent = fields.ForeignField('OsfStorageFileNode', index=True)
     versions = fields.ForeignField('OsfStorageFileVersion', list=True)
     node_settings = fields.ForeignField('OsfStorageNodeSettings', required=True, index=True)
+    ancestors = fields.StringField(list=True)
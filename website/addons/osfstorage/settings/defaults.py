@@ -19,3 +19,9 @@ WATERBUTLER_SETTINGS = {
 WATERBUTLER_RESOURCE = 'folder'
 
 DISK_SAVING_MODE = settings.DISK_SAVING_MODE
+
+# Children are listed and serialized this many at a time; unpaginated
+# listings are streamed in batches of this size
+CHILDREN_BATCH_SIZE = 500
+# Largest page of children a paginated listing may request
+CHILDREN_MAX_PAGE_SIZE = 1000
@@ -343,9 +343,84 @@ class TestOsfstorageFileNode(StorageTestCase):
         assert_equal(to_move.name, 'Tuna')
         assert_equal(moved.parent, move_to)
 
-    @unittest.skip
+    def test_serialize_many(self):
+        root = self.node_settings.root_node
+        folder = root.append_folder('Cloud')
+        empty = root.append_file('Empty')
+        versioned = root.append_file('Carp')
+        versioned.versions.append(factories.FileVersionFactory())
+        versioned.save()
+        file_nodes = [folder, empty, versioned]
+        assert_equal(
+            model.OsfStorageFileNode.serialize_many(file_nodes),
+            [each.serialized() for each in file_nodes],
+        )
+
+    def test_find_children_page(self):
+        root = self.node_settings.root_node
+        children = [root.append_file(str(index)) for index in range(5)]
+        page, cursor = root.find_children_page(3)
+        assert_equal(page, children[:3])
+        page, cursor = root.find_children_page(3, cursor=cursor)
+        assert_equal(page, children[3:])
+        assert_is_none(cursor)
+
+    def test_ancestors(self):
+        root = self.node_settings.root_node
+        folder = root.append_folder('Cloud')
+        child = folder.append_file('Carp')
+        assert_equal(root.ancestors, [])
+        assert_equal(child.ancestors, [root._id, folder._id])
+        assert_equal(child.lineage_ids, [root._id, folder._id, child._id])
+
+    def test_materialized_path_unmigrated(self):
+        child = self.node_settings.root_node.append_folder('Cloud').append_file('Carp')
+        child.ancestors = []
+        child.save()
+        assert_equals('/Cloud/Carp', child.materialized_path())
+
+    def test_delete_nested_folder(self):
+        parent = self.node_settings.root_node.append_folder('Cloud')
+        grandchild = parent.append_folder('Carp').append_file('A dee um')
+        tcount = model.OsfStorageTrashedFileNode.find().count()
+
+        parent.delete()
+
+        assert_is(model.OsfStorageFileNode.load(grandchild._id), None)
+        assert_equals(tcount + 3, model.OsfStorageTrashedFileNode.find().count())
+        trashed = model.OsfStorageTrashedFileNode.load(grandchild._id)
+        assert_equal(trashed.name, 'A dee um')
+        assert_equal(trashed.ancestors, grandchild.ancestors)
+
+    def test_copy_nested_folder(self):
+        to_copy = self.node_settings.root_node.append_folder('Cloud')
+        grandchild = to_copy.append_folder('Carp').append_file('A dee um')
+        grandchild.versions.append(factories.FileVersionFactory())
+        grandchild.save()
+        copy_to = self.node_settings.root_node.append_folder('Sky')
+
+        copied = to_copy.copy_under(copy_to)
+
+        copied_child = copied.find_child_by_name('Carp', kind='folder')
+        copied_grandchild = copied_child.find_child_by_name('A dee um')
+        assert_not_equal(copied_grandchild._id, grandchild._id)
+        assert_equal(copied_grandchild.versions, grandchild.versions)
+        assert_equal(copied_grandchild.materialized_path(), '/Sky/Cloud/Carp/A dee um')
+        assert_equal(grandchild.materialized_path(), '/Cloud/Carp/A dee um')
+
     def test_move_folder(self):
-        pass
+        to_move = self.node_settings.root_node.append_folder('Cloud')
+        grandchild = to_move.append_folder('Carp').append_file('A dee um')
+        move_to = self.node_settings.root_node.append_folder('Sky')
+
+        to_move.move_under(move_to)
+        grandchild.reload()
+
+        assert_equal(grandchild.materialized_path(), '/Sky/Cloud/Carp/A dee um')
+        assert_equal(
+            grandchild.ancestors[:3],
+            [self.node_settings.root_node._id, move_to._id, to_move._id],
+        )
 
     @unittest.skip
     def test_move_folder_and_rename(self):
@@ -521,6 +596,48 @@ class TestOsfStorageFileVersion(StorageTestCase):
 
         assert_equal(version2.archive, 'erchiv')
 
+    def _create_version(self, fnode, obj, **metadata):
+        return fnode.create_version(
+            self.user,
+            {
+                'service': 'cloud',
+                settings.WATERBUTLER_RESOURCE: 'osf',
+                'object': obj,
+            },
+            dict({'size': 1024}, **metadata),
+        )
+
+    def test_create_version_counts_blob_references(self):
+        root = self.project.get_addon('osfstorage').root_node
+        self._create_version(root.append_file('one'), 'd077f2', sha256='shared')
+        self._create_version(root.append_file('two'), 'd077f2', sha256='shared')
+        blob = model.OsfStorageBlob.load('shared')
+        assert_equal(blob.ref_count, 2)
+        assert_equal(blob.size, 1024)
+        assert_equal(blob.location['object'], 'd077f2')
+        assert_equal(
+            model.OsfStorageBlob.get_savings(),
+            {'blobs': 1, 'stored': 1024, 'saved': 1024},
+        )
+
+    def test_create_version_same_content(self):
+        fnode = self.project.get_addon('osfstorage').root_node.append_file('one')
+        version = self._create_version(fnode, 'd077f2', sha256='shared')
+        again = self._create_version(fnode, '06d80e', sha256='shared')
+        assert_equal(version, again)
+        assert_equal(len(fnode.versions), 1)
+
+    def test_update_metadata_records_blob_archive(self):
+        fnode = self.project.get_addon('osfstorage').root_node.append_file('one')
+        version = self._create_version(fnode, 'd077f2', sha256='shared')
+        version.update_metadata({'vault': 'the cloud', 'archive': 'erchiv'})
+        blob = model.OsfStorageBlob.load('shared')
+        assert_equal(blob.vault, 'the cloud')
+        assert_equal(blob.archive, 'erchiv')
+
+        other = self.project.get_addon('osfstorage').root_node.append_file('two')
+        assert_equal(self._create_version(other, '07d80a', sha256='shared').archive, 'erchiv')
+
     def test_no_matching_archive(self):
         model.OsfStorageFileVersion.remove()
         assert_is(False, factories.FileVersionFactory(
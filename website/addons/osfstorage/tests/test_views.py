@@ -74,6 +74,32 @@ class TestGetMetadataHook(HookTestCase):
             record.serialized()
         )
 
+    def test_children_metadata_paginated(self):
+        parent = self.node_settings.root_node.append_folder('parent')
+        children = [parent.append_file('file{0}'.format(index)) for index in range(3)]
+        res = self.send_hook(
+            'osfstorage_get_children',
+            {'fid': parent._id},
+            {'page_size': 2},
+        )
+        assert_equal(res.json['data'], [child.serialized() for child in children[:2]])
+        res = self.send_hook(
+            'osfstorage_get_children',
+            {'fid': parent._id},
+            {'page_size': 2, 'cursor': res.json['next']},
+        )
+        assert_equal(res.json['data'], [children[2].serialized()])
+        assert_is_none(res.json['next'])
+
+    def test_children_metadata_invalid_page_size(self):
+        res = self.send_hook(
+            'osfstorage_get_children',
+            {'fid': self.node_settings.root_node._id},
+            {'page_size': 0},
+            expect_errors=True,
+        )
+        assert_equal(res.status_code, 400)
+
     def test_osf_storage_root(self):
         auth = Auth(self.project.creator)
         result = views.osf_storage_root(self.node_settings, auth=auth)
@@ -5,6 +5,7 @@ import httplib
 import logging
 import functools
 
+import bson
 from modularodm.exceptions import ValidationValueError
 
 from framework.exceptions import HTTPError
@@ -113,6 +114,7 @@ def copy_files(src, target_settings, parent=None, name=None):
     cloned.parent = parent
     cloned.name = name or cloned.name
     cloned.node_settings = target_settings
+    cloned.ancestors = parent.lineage_ids if parent else []
 
     if src.is_file:
         cloned.versions = src.versions
@@ -120,7 +122,30 @@ def copy_files(src, target_settings, parent=None, name=None):
     cloned.save()
 
     if src.is_folder:
-        for child in src.children:
-            copy_files(child, target_settings, parent=cloned)
+        _copy_descendants(src, cloned)
 
     return cloned
+
+
+def _copy_descendants(src, cloned):
+    """Clone everything below folder `src` under its clone `cloned` with a
+    single insert. Descendants are given new IDs, and their parents and
+    ancestors are remapped to the clones.
+    """
+    descendants = list(src.find_descendants())
+    if not descendants:
+        return
+    new_ids = dict(
+        (data['_id'], str(bson.ObjectId()))
+        for data in descendants
+    )
+    new_ids[src._id] = cloned._id
+    prefix = cloned.ancestors
+    start = len(src.ancestors)
+    for data in descendants:
+        data['_id'] = new_ids[data['_id']]
+        data['parent'] = new_ids[data['parent']]
+        data['node_settings'] = cloned.node_settings._id
+        data['ancestors'] = prefix + [new_ids[each] for each in data['ancestors'][start:]]
+        data.pop('__backrefs', None)
+    cloned._storage[0].store.insert(descendants, manipulate=False)
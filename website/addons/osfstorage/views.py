@@ -1,16 +1,17 @@
 from __future__ import unicode_literals
 
+import json
 import httplib
 import logging
 
-from modularodm import Q
 from modularodm.storage.base import KeyExistsException
 
-from flask import request
+from flask import request, Response, stream_with_context
 
 from framework.auth import Auth
 from framework.exceptions import HTTPError
 from framework.auth.decorators import must_be_signed
+from framework.mongo.utils import bulk_load
 
 from website.models import User
 from website.project.decorators import (
@@ -98,16 +99,16 @@ def osfstorage_move_hook(source, destination, name=None, **kwargs):
 @must_be_signed
 @decorators.autoload_filenode(default_root=True)
 def osfstorage_get_lineage(file_node, node_addon, **kwargs):
-    #TODO Profile
-    list(model.OsfStorageFileNode.find(Q('kind', 'eq', 'folder') & Q('node_settings', 'eq', node_addon)))
-
-    lineage = []
-
-    while file_node:
-        lineage.append(file_node.serialized())
-        file_node = file_node.parent
+    lineage_ids = file_node.lineage_ids
+    file_nodes = dict(
+        (each._id, each)
+        for each in bulk_load(model.OsfStorageFileNode, lineage_ids)
+    )
 
-    return {'data': lineage}
+    return {'data': [
+        file_nodes[each].serialized()
+        for each in reversed(lineage_ids)
+    ]}
 
 
 @must_be_signed
@@ -118,11 +119,33 @@ def osfstorage_get_metadata(file_node, **kwargs):
 
 @must_be_signed
 @decorators.autoload_filenode(must_be='folder')
-def osfstorage_get_children(file_node, **kwargs):
-    return [
-        child.serialized()
-        for child in file_node.children
-    ]
+def osfstorage_get_children(file_node, payload, **kwargs):
+    """List the children of a folder. If the payload includes `page_size` or
+    `cursor`, return one page of children and the cursor of the next page;
+    otherwise stream all children as a JSON list.
+    """
+    if 'page_size' in payload or 'cursor' in payload:
+        try:
+            page_size = int(payload.get('page_size', osf_storage_settings.CHILDREN_BATCH_SIZE))
+        except ValueError:
+            raise HTTPError(httplib.BAD_REQUEST)
+        if not 0 < page_size <= osf_storage_settings.CHILDREN_MAX_PAGE_SIZE:
+            raise HTTPError(httplib.BAD_REQUEST)
+        children, cursor = file_node.find_children_page(page_size, cursor=payload.get('cursor'))
+        return {
+            'data': model.OsfStorageFileNode.serialize_many(children),
+            'next': cursor,
+        }
+
+    def stream():
+        yield '['
+        for index, data in enumerate(file_node.iter_serialized_children(osf_storage_settings.CHILDREN_BATCH_SIZE)):
+            if index:
+                yield ','
+            yield json.dumps(data)
+        yield ']'
+
+    return Response(stream_with_context(stream()), mimetype='application/json')
 
 
 @must_be_signed
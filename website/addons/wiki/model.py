@@ -2,6 +2,7 @@
 
 import datetime
 import functools
+import hashlib
 import logging
 
 from bleach import linkify
@@ -18,7 +19,7 @@ from framework.guid.model import GuidStoredObject
 from website import settings
 from website.addons.base import AddonNodeSettingsBase
 from website.addons.wiki import utils as wiki_utils
-from website.addons.wiki.settings import WIKI_CHANGE_DATE
+from website.addons.wiki.settings import WIKI_CHANGE_DATE, WIKI_RENDER_VERSION
 from website.project.signals import write_permissions_revoked
 
 from website.exceptions import NodeStateError
@@ -152,6 +153,14 @@ def render_content(content, node):
     return sanitized_content
 
 
+def get_render_key(content, node):
+    """Key of the rendered output of `content` on `node`. Changes when the
+    content, the render settings or the node URLs built by wikilinks change.
+    """
+    digest = hashlib.sha256((content or u'').encode('utf-8')).hexdigest()
+    return '{0}:{1}:{2}'.format(WIKI_RENDER_VERSION, node.url, digest)
+
+
 class NodeWikiPage(GuidStoredObject):
 
     _id = fields.StringField(primary=True)
@@ -165,6 +174,10 @@ class NodeWikiPage(GuidStoredObject):
     user = fields.ForeignField('user')
     node = fields.ForeignField('node')
 
+    # Rendered HTML and plain text by node ID; registrations and forks share
+    # pages with their source, but wikilinks point into their own node
+    rendered = fields.DictionaryField()
+
     @property
     def deep_url(self):
         return '{}wiki/{}/'.format(self.node.deep_url, self.page_name)
@@ -177,22 +190,50 @@ class NodeWikiPage(GuidStoredObject):
     def rendered_before_update(self):
         return self.date < WIKI_CHANGE_DATE
 
-    def html(self, node):
-        """The cleaned HTML of the page"""
+    def _render(self, node):
         sanitized_content = render_content(self.content, node=node)
         try:
-            return linkify(
+            html = linkify(
                 sanitized_content,
                 [nofollow, ],
             )
         except TypeError:
             logger.warning('Returning unlinkified content.')
-            return sanitized_content
+            html = sanitized_content
+        return {
+            'key': get_render_key(self.content, node),
+            'html': html,
+            'text': sanitize(html, tags=[], strip=True),
+        }
+
+    def get_rendered(self, node, save=True):
+        """Return the rendered output of the page on `node`, rendering and
+        caching it if the cached output is missing or stale.
+
+        :param Node node: Node whose URLs wikilinks are built against
+        :param bool save: Write newly rendered output straight to the database;
+            the page itself is not saved, so search is not reindexed
+        """
+        key = get_render_key(self.content, node)
+        rendered = (self.rendered or {}).get(node._id)
+        if rendered and rendered.get('key') == key:
+            return rendered
+        rendered = self._render(node)
+        self.rendered[node._id] = rendered
+        if save and self._id:
+            self._storage[0].store.update(
+                {'_id': self._id},
+                {'$set': {'rendered.{0}'.format(node._id): rendered}},
+            )
+        return rendered
+
+    def html(self, node):
+        """The cleaned HTML of the page"""
+        return self.get_rendered(node)['html']
 
     def raw_text(self, node):
         """ The raw text of the page, suitable for using in a test search"""
-
-        return sanitize(self.html(node), tags=[], strip=True)
+        return self.get_rendered(node)['text']
 
     def get_draft(self, node):
         """
@@ -200,22 +241,17 @@ class NodeWikiPage(GuidStoredObject):
         last saved version or the most recent sharejs draft.
         """
 
-        db = wiki_utils.share_db()
         sharejs_uuid = wiki_utils.get_sharejs_uuid(node, self.page_name)
-
-        doc_item = db['docs'].find_one({'_id': sharejs_uuid})
-        if doc_item:
-            sharejs_version = doc_item['_v']
-            sharejs_timestamp = doc_item['_m']['mtime']
-            sharejs_timestamp /= 1000   # Convert to appropriate units
-            sharejs_date = datetime.datetime.utcfromtimestamp(sharejs_timestamp)
-
-            if sharejs_version > 1 and sharejs_date > self.date:
-                return doc_item['_data']
+        draft = wiki_utils.get_sharejs_draft(sharejs_uuid)
+        if draft and draft['version'] > 1 and draft['date'] > self.date:
+            return draft['content']
 
         return self.content
 
     def save(self, *args, **kwargs):
+        if self.node:
+            # Render new content once on save rather than on every view
+            self.get_rendered(self.node, save=False)
         rv = super(NodeWikiPage, self).save(*args, **kwargs)
         if self.node:
             self.node.update_search()
@@ -96,6 +96,12 @@ api_routes = {
             '/project/<pid>/node/<nid>/wiki/<wname>/content/<wver>/',
         ], 'get', views.wiki_page_content, json_renderer),
 
+        # Versions : GET
+        Rule([
+            '/project/<pid>/wiki/<wname>/versions/',
+            '/project/<pid>/node/<nid>/wiki/<wname>/versions/',
+        ], 'get', views.project_wiki_versions, json_renderer),
+
         # Validate | GET
         Rule([
             '/project/<pid>/wiki/<wname>/validate/',
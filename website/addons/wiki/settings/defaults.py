@@ -4,6 +4,19 @@ SHAREJS_DB_NAME = 'sharejs'
 SHAREJS_HOST = 'localhost'
 SHAREJS_PORT = 7007
 SHAREJS_URL = '{}:{}'.format(SHAREJS_HOST, SHAREJS_PORT)
+# Connections to the sharejs db are pooled per process
+SHAREJS_MAX_POOL_SIZE = 10
+# Drafts read from the sharejs db are reused for this many seconds; 0 disables
+SHAREJS_DRAFT_CACHE_TTL = 10
+SHAREJS_DRAFT_CACHE_SIZE = 1000
 
 # TODO: Change to release date for wiki change
 WIKI_CHANGE_DATE = datetime.datetime.utcfromtimestamp(1423760098)
+
+# Default and largest number of versions per page of a wiki page's history
+WIKI_VERSIONS_PAGE_SIZE = 50
+WIKI_VERSIONS_MAX_PAGE_SIZE = 500
+
+# Bump when the Markdown extensions, sanitizer whitelist or wikilink URLs
+# change, so that cached rendered wiki pages are rendered again
+WIKI_RENDER_VERSION = 1
@@ -20,10 +20,11 @@ from website.exceptions import NodeStateError
 from website.addons.wiki import settings
 from website.addons.wiki import views
 from website.addons.wiki.exceptions import InvalidVersionError
-from website.addons.wiki.model import NodeWikiPage, render_content
+from website.addons.wiki.model import NodeWikiPage, render_content, get_render_key
 from website.addons.wiki.utils import (
     get_sharejs_uuid, generate_private_uuid, share_db, delete_share_doc,
     migrate_uuid, format_wiki_version, serialize_wiki_settings,
+    get_sharejs_drafts, clear_draft_cache,
 )
 from website.addons.wiki.tests.config import EXAMPLE_DOCS, EXAMPLE_OPS
 from framework.auth import Auth
@@ -56,6 +57,20 @@ class TestWikiViews(OsfTestCase):
         res = self.app.get(url)
         assert_equal(res.status_code, 200)
 
+    def test_wiki_versions_paginated(self):
+        for content in ['some content', 'more content', 'most content']:
+            self.project.update_node_wiki('home', content, self.consolidate_auth)
+        url = self.project.api_url_for('project_wiki_versions', wname='home')
+        res = self.app.get(url, {'page': 1, 'size': 2}, auth=self.user.auth)
+        assert_equal(res.json['total'], 3)
+        assert_equal(res.json['pages'], 2)
+        assert_equal([version['version'] for version in res.json['versions']], [1])
+
+    def test_wiki_versions_invalid_page(self):
+        url = self.project.api_url_for('project_wiki_versions', wname='home')
+        res = self.app.get(url, {'page': 'carp'}, auth=self.user.auth, expect_errors=True)
+        assert_equal(res.status_code, 400)
+
     def test_wiki_url_404_with_no_write_permission(self): # and not public
         url = self.project.web_url_for('project_wiki_view', wname='somerandomid')
         res = self.app.get(url, auth=self.user.auth)
@@ -483,6 +498,22 @@ class TestViewHelpers(OsfTestCase):
         assert_equal(urls['content'], self.project.api_url_for('wiki_page_content', wname=self.wname))
         assert_equal(urls['settings'], self.project.api_url_for('edit_wiki_settings'))
 
+    def test_get_wiki_versions(self):
+        self.project.update_node_wiki(self.wname, 'more content', Auth(self.project.creator))
+        self.project.update_node_wiki(self.wname, 'most content', Auth(self.project.creator))
+        versions = views._get_wiki_versions(self.project, self.wname)
+        assert_equal([version['version'] for version in versions], [3, 2, 1])
+        assert_equal(versions[0]['user_fullname'], self.project.creator.fullname)
+        versions = views._get_wiki_versions(self.project, self.wname, start=1, limit=1)
+        assert_equal([version['version'] for version in versions], [2])
+
+    def test_get_wiki_versions_anonymous(self):
+        versions = views._get_wiki_versions(self.project, self.wname, anonymous=True)
+        assert_not_equal(versions[0]['user_fullname'], self.project.creator.fullname)
+
+    def test_get_wiki_versions_missing_page(self):
+        assert_equal(views._get_wiki_versions(self.project, 'nonexistent'), [])
+
 
 class TestWikiDelete(OsfTestCase):
 
@@ -708,6 +739,45 @@ class TestWikiLinks(OsfTestCase):
         assert_equal(expected, wiki.html(node))
 
 
+class TestWikiRenderCache(OsfTestCase):
+
+    def setUp(self):
+        super(TestWikiRenderCache, self).setUp()
+        self.project = ProjectFactory()
+        self.wiki = NodeWikiFactory(content='# Cloud\n\n[[wiki2]]', node=self.project)
+
+    def test_rendered_on_save(self):
+        rendered = self.wiki.rendered[self.project._id]
+        assert_equal(rendered['key'], get_render_key(self.wiki.content, self.project))
+        assert_in('<h1>Cloud</h1>', rendered['html'])
+        assert_not_in('<h1>', rendered['text'])
+
+    @mock.patch('website.addons.wiki.model.render_content')
+    def test_html_uses_cache(self, mock_render):
+        assert_in('<h1>Cloud</h1>', self.wiki.html(self.project))
+        assert_in('Cloud', self.wiki.raw_text(self.project))
+        assert_false(mock_render.called)
+
+    def test_other_node_rendered_and_stored(self):
+        fork = ProjectFactory()
+        html = self.wiki.html(fork)
+        assert_in(fork.web_url_for('project_wiki_view', wname='wiki2'), html)
+        NodeWikiPage._clear_caches(self.wiki._id)
+        wiki = NodeWikiPage.load(self.wiki._id)
+        assert_equal(wiki.rendered[fork._id]['html'], html)
+        assert_in(self.project._id, wiki.rendered)
+
+    @mock.patch('website.addons.wiki.model.WIKI_RENDER_VERSION', 2)
+    def test_render_version_invalidates(self):
+        self.wiki.rendered[self.project._id]['html'] = 'stale'
+        assert_not_equal(self.wiki.html(self.project), 'stale')
+
+    def test_changed_content_invalidates(self):
+        self.wiki.content = 'Carp'
+        assert_in('Carp', self.wiki.html(self.project))
+        assert_not_in('Cloud', self.wiki.raw_text(self.project))
+
+
 class TestWikiUuid(OsfTestCase):
 
     def setUp(self):
@@ -1029,11 +1099,45 @@ class TestWikiShareJSMongo(OsfTestCase):
                 '_data': new_content
             }}
         )
+        # Drafts are cached briefly; drop the cached copy of the outdated draft
+        clear_draft_cache(self.sharejs_uuid)
         current_content = self.wiki_page.get_draft(self.project)
         assert_equals(current_content, new_content)
 
+    def test_share_db_client_is_shared(self):
+        assert_is(share_db().connection, share_db().connection)
+
+    @mock.patch('framework.mongo.handlers.os.getpid')
+    def test_share_db_client_rebuilt_after_fork(self, mock_getpid):
+        mock_getpid.return_value = 1
+        parent_client = share_db().connection
+        mock_getpid.return_value = 2
+        assert_is_not(share_db().connection, parent_client)
+
+    def test_get_sharejs_drafts(self):
+        other_uuid = get_sharejs_uuid(self.project, 'bar.baz') or 'nonexistent'
+        drafts = get_sharejs_drafts([self.sharejs_uuid, other_uuid, None])
+        assert_equal(drafts[self.sharejs_uuid]['content'], self.example_docs[0]['_data'])
+        assert_equal(drafts[self.sharejs_uuid]['version'], self.example_docs[0]['_v'])
+        assert_is_none(drafts[other_uuid])
+        assert_not_in(None, drafts)
+
+    def test_get_sharejs_drafts_cached(self):
+        get_sharejs_drafts([self.sharejs_uuid])
+        with mock.patch('website.addons.wiki.utils.share_db') as mock_db:
+            drafts = get_sharejs_drafts([self.sharejs_uuid])
+        assert_false(mock_db.called)
+        assert_equal(drafts[self.sharejs_uuid]['content'], self.example_docs[0]['_data'])
+
+    @mock.patch('website.addons.wiki.utils.broadcast_to_sharejs')
+    def test_delete_share_doc_clears_draft(self, mock_sharejs):
+        get_sharejs_drafts([self.sharejs_uuid])
+        delete_share_doc(self.project, self.wname)
+        assert_is_none(get_sharejs_drafts([self.sharejs_uuid])[self.sharejs_uuid])
+
     def tearDown(self):
         super(TestWikiShareJSMongo, self).tearDown()
+        clear_draft_cache()
         self.db.drop_collection('docs')
         self.db.drop_collection('docs_ops')
 
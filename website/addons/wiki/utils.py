@@ -1,11 +1,14 @@
 # -*- coding: utf-8 -*-
 import os
+import time
 import urllib
 import uuid
+import datetime
+import threading
 
-from pymongo import MongoClient
 import requests
 
+from framework.mongo.handlers import ClientPool
 from framework.mongo.utils import to_mongo_key
 
 from website import settings
@@ -49,6 +52,7 @@ def delete_share_doc(node, wname):
 
     db['docs'].remove({'_id': sharejs_uuid})
     db['docs_ops'].remove({'name': sharejs_uuid})
+    clear_draft_cache(sharejs_uuid)
 
     wiki_key = to_mongo_key(wname)
     del node.wiki_private_uuids[wiki_key]
@@ -79,6 +83,7 @@ def migrate_uuid(node, wname):
             item['name'] = new_sharejs_uuid
         db['docs_ops'].insert(ops_items)
         db['docs_ops'].remove({'name': old_sharejs_uuid})
+    clear_draft_cache(old_sharejs_uuid)
 
     write_contributors = [
         user._id for user in node.contributors
@@ -87,18 +92,99 @@ def migrate_uuid(node, wname):
     broadcast_to_sharejs('unlock', old_sharejs_uuid, data=write_contributors)
 
 
+share_client_pool = ClientPool(pool_size=wiki_settings.SHAREJS_MAX_POOL_SIZE)
+
+
+def share_client():
+    """Get the process-wide, pooled client for the sharejs db"""
+    return share_client_pool.client
+
+
 def share_db():
-    """Generate db client for sharejs db"""
-    client = MongoClient(settings.DB_HOST, settings.DB_PORT)
-    return client[wiki_settings.SHAREJS_DB_NAME]
+    """Get the sharejs db"""
+    return share_client()[wiki_settings.SHAREJS_DB_NAME]
 
 
-def get_sharejs_content(node, wname):
-    db = share_db()
-    sharejs_uuid = get_sharejs_uuid(node, wname)
+# Draft metadata by sharejs uuid, as (expiration time, draft) pairs
+_draft_cache = {}
+_draft_cache_lock = threading.Lock()
+
+
+def clear_draft_cache(*sharejs_uuids):
+    """Drop cached drafts of `sharejs_uuids`, or of every document if none
+    are given.
+    """
+    with _draft_cache_lock:
+        if not sharejs_uuids:
+            _draft_cache.clear()
+        for sharejs_uuid in sharejs_uuids:
+            _draft_cache.pop(sharejs_uuid, None)
 
-    doc_item = db['docs'].find_one({'_id': sharejs_uuid})
-    return doc_item['_data'] if doc_item else ''
+
+def _serialize_draft(doc_item):
+    return {
+        'version': doc_item['_v'],
+        # Timestamps are stored in milliseconds
+        'date': datetime.datetime.utcfromtimestamp(doc_item['_m']['mtime'] / 1000),
+        'content': doc_item['_data'],
+    }
+
+
+def get_sharejs_drafts(sharejs_uuids):
+    """Look up the drafts of several sharejs documents with one query, reusing
+    drafts read in the last `SHAREJS_DRAFT_CACHE_TTL` seconds.
+
+    :param list sharejs_uuids: Document uuids; `None` entries are ignored
+    :return: Dict mapping each uuid to a dict of the draft `version`, `date`
+        and `content`, or to `None` if the document does not exist
+    """
+    now = time.time()
+    drafts = {}
+    with _draft_cache_lock:
+        for sharejs_uuid in sharejs_uuids:
+            if sharejs_uuid is None:
+                continue
+            cached = _draft_cache.get(sharejs_uuid)
+            if cached and cached[0] > now:
+                drafts[sharejs_uuid] = cached[1]
+    missing = [
+        sharejs_uuid for sharejs_uuid in set(sharejs_uuids)
+        if sharejs_uuid is not None and sharejs_uuid not in drafts
+    ]
+    if not missing:
+        return drafts
+    found = {
+        doc_item['_id']: _serialize_draft(doc_item)
+        for doc_item in share_db()['docs'].find(
+            {'_id': {'$in': missing}},
+            {'_v': True, '_m.mtime': True, '_data': True},
+        )
+    }
+    expires = now + wiki_settings.SHAREJS_DRAFT_CACHE_TTL
+    with _draft_cache_lock:
+        if len(_draft_cache) + len(missing) > wiki_settings.SHAREJS_DRAFT_CACHE_SIZE:
+            for sharejs_uuid, (expiration, _) in _draft_cache.items():
+                if expiration <= now:
+                    del _draft_cache[sharejs_uuid]
+            if len(_draft_cache) + len(missing) > wiki_settings.SHAREJS_DRAFT_CACHE_SIZE:
+                _draft_cache.clear()
+        for sharejs_uuid in missing:
+            drafts[sharejs_uuid] = found.get(sharejs_uuid)
+            if wiki_settings.SHAREJS_DRAFT_CACHE_TTL:
+                _draft_cache[sharejs_uuid] = (expires, drafts[sharejs_uuid])
+    return drafts
+
+
+def get_sharejs_draft(sharejs_uuid):
+    """Look up the draft of one sharejs document; see `get_sharejs_drafts`."""
+    if sharejs_uuid is None:
+        return None
+    return get_sharejs_drafts([sharejs_uuid])[sharejs_uuid]
+
+
+def get_sharejs_content(node, wname):
+    draft = get_sharejs_draft(get_sharejs_uuid(node, wname))
+    return draft['content'] if draft else ''
 
 
 def broadcast_to_sharejs(action, sharejs_uuid, node=None, wiki_name='home', data=None):
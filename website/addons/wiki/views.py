@@ -8,6 +8,7 @@ from flask import request
 
 from framework.mongo.utils import to_mongo_key
 from framework.exceptions import HTTPError
+from framework.auth import User
 from framework.auth.utils import privacy_info_handle
 from framework.auth.decorators import must_be_logged_in
 from framework.flask import redirect
@@ -67,7 +68,13 @@ WIKI_INVALID_VERSION_ERROR = HTTPError(http.BAD_REQUEST, data=dict(
 ))
 
 
-def _get_wiki_versions(node, name, anonymous=False):
+def _get_wiki_versions(node, name, anonymous=False, start=0, limit=None):
+    """Serialize versions of a wiki page, newest first, with one query for the
+    versions and one for their authors.
+
+    :param int start: Number of newer versions to skip
+    :param int limit: Maximum number of versions to return, or `None` for all
+    """
     key = to_mongo_key(name)
 
     # Skip if wiki_page doesn't exist; happens on new projects before
@@ -75,18 +82,39 @@ def _get_wiki_versions(node, name, anonymous=False):
     if key not in node.wiki_pages_versions:
         return []
 
-    versions = [
-        NodeWikiPage.load(version_wiki_id)
-        for version_wiki_id in node.wiki_pages_versions[key]
-    ]
+    version_ids = list(reversed(node.wiki_pages_versions[key]))
+    stop = start + limit if limit is not None else None
+    version_ids = version_ids[start:stop]
+    if not version_ids:
+        return []
+
+    versions = dict(
+        (version['_id'], version)
+        for version in NodeWikiPage._storage[0].store.find(
+            {'_id': {'$in': version_ids}},
+            {'version': True, 'date': True, 'user': True},
+        )
+    )
+    fullnames = dict(
+        (user['_id'], user.get('fullname'))
+        for user in User._storage[0].store.find(
+            {'_id': {'$in': list(set(
+                version.get('user') for version in versions.values()
+            ))}},
+            {'fullname': True},
+        )
+    )
 
     return [
         {
-            'version': version.version,
-            'user_fullname': privacy_info_handle(version.user.fullname, anonymous, name=True),
-            'date': version.date.replace(microsecond=0).isoformat(),
+            'version': version['version'],
+            'user_fullname': privacy_info_handle(fullnames.get(version.get('user')), anonymous, name=True),
+            'date': version['date'].replace(microsecond=0).isoformat(),
         }
-        for version in reversed(versions)
+        for version in (
+            versions.get(version_id) for version_id in version_ids
+        )
+        if version is not None
     ]
 
 
@@ -195,6 +223,43 @@ def wiki_page_content(wname, wver=None, **kwargs):
     }
 
 
+@must_be_valid_project
+@must_be_contributor_or_public
+@must_have_addon('wiki', 'node')
+def project_wiki_versions(auth, wname, **kwargs):
+    """List the versions of a wiki page, newest first, one page at a time.
+
+    :param-query int page: Zero-based page number
+    :param-query int size: Number of versions per page
+    """
+    node = kwargs['node'] or kwargs['project']
+    try:
+        page = int(request.args.get('page', 0))
+        size = int(request.args.get('size', settings.WIKI_VERSIONS_PAGE_SIZE))
+    except ValueError:
+        raise HTTPError(http.BAD_REQUEST, data=dict(
+            message_long='Invalid value for "page" or "size".'
+        ))
+    if page < 0 or size < 1:
+        raise HTTPError(http.BAD_REQUEST)
+    size = min(size, settings.WIKI_VERSIONS_MAX_PAGE_SIZE)
+
+    total = len(node.wiki_pages_versions.get(to_mongo_key(wname.strip()), []))
+    versions = _get_wiki_versions(
+        node,
+        wname.strip(),
+        anonymous=has_anonymous_link(node, auth),
+        start=page * size,
+        limit=size,
+    )
+    return {
+        'versions': versions,
+        'total': total,
+        'page': page,
+        'pages': (total + size - 1) // size,
+    }
+
+
 @must_be_valid_project  # injects project
 @must_have_permission('write')  # injects user, project
 @must_not_be_registration
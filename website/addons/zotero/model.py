@@ -1,10 +1,12 @@
 # -*- coding: utf-8 -*-
 
+import requests
 from modularodm import fields
 from pyzotero import zotero
 
 from website.addons.base import AddonOAuthNodeSettingsBase
 from website.addons.base import AddonOAuthUserSettingsBase
+from website.addons.citations.utils import merge_citations
 from website.addons.citations.utils import serialize_folder
 from website.addons.zotero import serializer
 from website.addons.zotero import settings
@@ -15,6 +17,8 @@ from website.oauth.models import ExternalProvider
 # For now, we load 200 citations max and show a message to the user.
 MAX_CITATION_LOAD = 200
 
+ZOTERO_API_URL = 'https://api.zotero.org'
+
 class Zotero(ExternalProvider):
     name = "Zotero"
     short_name = "zotero"
@@ -83,35 +87,62 @@ class Zotero(ExternalProvider):
             list_id = None
 
         if list_id:
-            citations = []
-            more = True
-            offset = 0
-            while more and len(citations) <= MAX_CITATION_LOAD:
-                page = self.client.collection_items(list_id, content='csljson', size=100, start=offset)
-                citations = citations + page
-                if len(page) == 0 or len(page) < 100:
-                    more = False
-                else:
-                    offset = offset + len(page)
+            citations = self._fetch_citations(self.client.collection_items, list_id)
             return self._citations_for_zotero_collection(citations)
         else:
             return self._citations_for_zotero_user()
 
-    def _citations_for_zotero_collection(self, collection):
-        """Get all the citations in a specified collection
+    def sync_list(self, list_id=None, citations=None, since=None):
+        """Get a single CitationList, along with a token to pass as `since`
+        to the next sync. Given the citations of an earlier sync, only the
+        items modified since are fetched.
 
-        :param  csljson collection: list of csljson documents
-        :return list of citation objects representing said dicts of said documents.
+        Items removed from a collection without being modified are only
+        dropped by the next full sync.
+
+        :param str list_id: ID for a Zotero collection. Optional.
+        :param list citations: Citations returned by an earlier sync
+        :param int since: Token returned by an earlier sync
+        :return tuple: CitationList and token
         """
-        return collection
+        # Read the library version first; items modified while the list is
+        # fetched are fetched again by the next sync
+        version = self.client.last_modified_version()
+        if citations is None or since is None:
+            return self.get_list(list_id), version
+
+        if list_id and list_id != 'ROOT':
+            modified = self._fetch_citations(self.client.collection_items, list_id, since=since)
+        else:
+            modified = self._fetch_citations(self.client.items, since=since)
+        deleted_keys = self._deleted_item_keys(since)
+        return merge_citations(citations, modified, deleted_keys, key=_citation_key), version
+
+    def _deleted_item_keys(self, since):
+        """Keys of the items deleted from the user's library since a library
+        version. Pyzotero 1.1.1 has no method for the ``deleted`` endpoint, so
+        it is requested directly.
+        """
+        response = requests.get(
+            '{0}/users/{1}/deleted'.format(ZOTERO_API_URL, self.account.provider_id),
+            params={'since': since},
+            headers={
+                'Authorization': 'Bearer {0}'.format(self.account.oauth_key),
+                'Zotero-API-Version': '3',
+            },
+        )
+        response.raise_for_status()
+        return response.json().get('items', [])
 
-    def _citations_for_zotero_user(self):
-        """Get all the citations from the user """
+    def _fetch_citations(self, fetch, *args, **kwargs):
+        """Page through the CSL JSON items returned by a pyzotero method,
+        up to `MAX_CITATION_LOAD` items.
+        """
         citations = []
         more = True
         offset = 0
         while more and len(citations) <= MAX_CITATION_LOAD:
-            page = self.client.items(content='csljson', limit=100, start=offset)
+            page = fetch(*args, content='csljson', limit=100, start=offset, **kwargs)
             citations = citations + page
             if len(page) == 0 or len(page) < 100:
                 more = False
@@ -119,6 +150,25 @@ class Zotero(ExternalProvider):
                 offset = offset + len(page)
         return citations
 
+    def _citations_for_zotero_collection(self, collection):
+        """Get all the citations in a specified collection
+
+        :param  csljson collection: list of csljson documents
+        :return list of citation objects representing said dicts of said documents.
+        """
+        return collection
+
+    def _citations_for_zotero_user(self):
+        """Get all the citations from the user """
+        return self._fetch_citations(self.client.items)
+
+
+def _citation_key(citation):
+    """Zotero item key of a CSL JSON citation, whose ID is prefixed with the
+    library ID.
+    """
+    return citation['id'].split('/')[-1]
+
 
 class ZoteroUserSettings(AddonOAuthUserSettingsBase):
     oauth_provider = Zotero
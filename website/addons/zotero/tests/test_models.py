@@ -1,7 +1,11 @@
 # -*- coding: utf-8 -*-
 
+import json
+
+import httpretty
 import mock
 from nose.tools import *  # noqa
+from pyzotero import zotero
 
 from framework.auth.core import Auth
 from framework.exceptions import PermissionsError
@@ -61,6 +65,33 @@ class ZoteroProviderTestCase(OsfTestCase):
             'Fake Key'
         )
 
+    @httpretty.activate
+    def test_sync_list_incremental(self):
+        # Runs against the real pyzotero client; only its HTTP calls are faked
+        self.provider.account = ZoteroAccountFactory(provider_id='12345', oauth_key='key')
+        httpretty.register_uri(
+            httpretty.GET,
+            'https://api.zotero.org/users/12345/deleted',
+            body=json.dumps({'items': ['b'], 'collections': []}),
+            content_type='application/json',
+        )
+        client = self.provider.client
+        assert_is_instance(client, zotero.Zotero)
+        with mock.patch.object(client, 'last_modified_version', return_value=12), \
+                mock.patch.object(client, 'items') as mock_items:
+            mock_items.return_value = [{'id': '1/c'}, {'id': '1/a', 'title': 'A2'}]
+            citations, version = self.provider.sync_list(
+                'ROOT',
+                [{'id': '1/a'}, {'id': '1/b'}],
+                10,
+            )
+        assert_equal(citations, [{'id': '1/a', 'title': 'A2'}, {'id': '1/c'}])
+        assert_equal(version, 12)
+        mock_items.assert_called_once_with(content='csljson', limit=100, start=0, since=10)
+        request = httpretty.last_request()
+        assert_equal(request.querystring, {'since': ['10']})
+        assert_equal(request.headers['Authorization'], 'Bearer key')
+
 class ZoteroNodeSettingsTestCase(OsfTestCase):
 
     def setUp(self):
@@ -95,9 +95,12 @@ def zotero_widget(node_addon, **kwargs):
 def zotero_citation_list(auth, node_addon, zotero_list_id=None, **kwargs):
     """Collects a listing of folders and citations based on the
     passed zotero_list_id. If zotero_list_id is `None`, then all of the
-    authorizer's folders and citations are listed.
+    authorizer's folders and citations are listed. Pass `page` and `size` to
+    paginate the citations.
     """
 
     provider = ZoteroCitationsProvider()
     show = request.args.get('view', 'all')
-    return provider.citation_list(node_addon, auth.user, zotero_list_id, show)
+    page = request.args.get('page', type=int)
+    size = request.args.get('size', type=int)
+    return provider.citation_list(node_addon, auth.user, zotero_list_id, show, page=page, size=size)
@@ -16,6 +16,7 @@ from framework.sentry import sentry
 from framework.mongo import handlers as mongo_handlers
 from framework.tasks import handlers as task_handlers
 from framework.transactions import handlers as transaction_handlers
+from framework import analytics
 
 import website.models
 from website.routes import make_url_map
@@ -48,6 +49,10 @@ def attach_handlers(app, settings):
     # Add callback handlers to application
     add_handlers(app, mongo_handlers.handlers)
     add_handlers(app, task_handlers.handlers)
+    # Flask runs teardown handlers in reverse order of registration, so this
+    # must be registered before the transaction handlers: buffered counters are
+    # then flushed after the request transaction is rolled back on error
+    add_handlers(app, analytics.handlers)
     add_handlers(app, transaction_handlers.handlers)
 
     # Attach handler for checking view-only link keys.
@@ -71,3 +71,15 @@ def archive_fail(dst, errors):
         dst.root.registered_user,
         errors
     )
+
+
+@archiver_signals.archive_batch_callback.connect
+def archive_batch_callback(dst, addon_short_name, batch_id, errors):
+    """Blinker listener for WaterButler callbacks on batched archive copies.
+
+    :param dst: registration Node
+    :param addon_short_name: name of the ArchiveTarget the batch belongs to
+    :param batch_id: ID of the copied batch
+    :param errors: errors reported by WaterButler, if any
+    """
+    tasks.handle_batch_callback(dst.archive_job, addon_short_name, batch_id, errors=errors)
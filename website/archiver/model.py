@@ -7,6 +7,7 @@ from framework.mongo import StoredObject
 
 from website.archiver import (
     ARCHIVER_INITIATED,
+    ARCHIVER_PENDING,
     ARCHIVER_SUCCESS,
     ARCHIVER_FAILURE,
     ARCHIVER_FAILURE_STATUSES
@@ -38,6 +39,12 @@ class ArchiveTarget(StoredObject):
     #     'disk_usage': <float>,
     # }
     stat_result = fields.DictionaryField()
+    # Progress of collecting file tree metadata, as passed to
+    # ArchiveJob.update_target_progress
+    stat_progress = fields.DictionaryField()
+    # Batches the addon is copied in, parents before their children; see
+    # website.archiver.utils.plan_archive_batches
+    batches = fields.DictionaryField(list=True)
     errors = fields.StringField(list=True)
 
     def __repr__(self):
@@ -48,6 +55,40 @@ class ArchiveTarget(StoredObject):
             self.status
         )
 
+    def get_batch(self, batch_id):
+        try:
+            return [batch for batch in self.batches if batch['id'] == batch_id][0]
+        except IndexError:
+            return None
+
+    def find_batch(self, path):
+        """Get the copy batch whose source is `path`."""
+        try:
+            return [
+                batch for batch in self.batches
+                if batch['kind'] == 'copy' and batch['path'] == path
+            ][0]
+        except IndexError:
+            return None
+
+    def ready_batches(self):
+        """Batches that have not been started and whose parent folder, if
+        any, has been created in the archive.
+        """
+        done = set(
+            batch['id'] for batch in self.batches
+            if batch['status'] == ARCHIVER_SUCCESS
+        )
+        return [
+            batch for batch in self.batches
+            if batch['status'] == ARCHIVER_INITIATED and
+            (batch['parent'] is None or batch['parent'] in done)
+        ]
+
+    @property
+    def batches_complete(self):
+        return all(batch['status'] == ARCHIVER_SUCCESS for batch in self.batches)
+
 
 class ArchiveJob(StoredObject):
 
@@ -184,3 +225,49 @@ class ArchiveJob(StoredObject):
         target.stat_result = stat_result
         target.save()
         self._post_update_target()
+
+    def update_target_progress(self, addon_short_name, **progress):
+        """Record progress on collecting the file tree metadata of a target,
+        e.g. the number of folders examined so far.
+        """
+        target = self.get_target(addon_short_name)
+        if not target:
+            return
+        target.stat_progress = progress
+        target.save()
+
+    def claim_batch(self, addon_short_name, batch_id):
+        """Atomically mark a batch that has not been started as in progress.
+
+        :return: Whether the batch was claimed by this call
+        """
+        target = self.get_target(addon_short_name)
+        result = ArchiveTarget._storage[0].store.update(
+            {
+                '_id': target._id,
+                'batches': {'$elemMatch': {'id': batch_id, 'status': ARCHIVER_INITIATED}},
+            },
+            {'$set': {'batches.$.status': ARCHIVER_PENDING}},
+        )
+        target.reload()
+        return bool(result and result.get('n'))
+
+    def update_batch(self, addon_short_name, batch_id, **values):
+        """Atomically update the state of one copy batch of a target, as
+        batches of the same target are archived by concurrent tasks. The
+        target succeeds once all of its batches have.
+
+        :return: The updated target
+        """
+        target = self.get_target(addon_short_name)
+        ArchiveTarget._storage[0].store.update(
+            {'_id': target._id, 'batches.id': batch_id},
+            {'$set': dict(
+                ('batches.$.{0}'.format(key), value)
+                for key, value in values.iteritems()
+            )},
+        )
+        target.reload()
+        if target.batches_complete and target.status != ARCHIVER_SUCCESS:
+            self.update_target(addon_short_name, ARCHIVER_SUCCESS)
+        return target
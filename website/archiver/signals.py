@@ -3,3 +3,4 @@ import blinker
 signals = blinker.Namespace()
 
 archive_fail = signals.signal('archive-fail')
+archive_batch_callback = signals.signal('archive-batch-callback')
@@ -1,5 +1,7 @@
+import httplib
 import requests
 import json
+import functools
 
 import celery
 from celery.utils.log import get_task_logger
@@ -9,6 +11,8 @@ from framework.tasks.utils import logged
 from framework.exceptions import HTTPError
 
 from website.archiver import (
+    ARCHIVER_INITIATED,
+    ARCHIVER_PENDING,
     ARCHIVER_SUCCESS,
     ARCHIVER_FAILURE,
     ARCHIVER_SIZE_EXCEEDED,
@@ -23,6 +27,7 @@ from website.archiver import signals as archiver_signals
 
 from website.project import signals as project_signals
 from website import settings
+from website.util import waterbutler_url_for
 from website.app import init_addons, do_set_backends
 
 
@@ -102,8 +107,13 @@ def stat_addon(addon_short_name, job_pk):
     job = ArchiveJob.load(job_pk)
     src, dst, user = job.info()
     src_addon = src.get_addon(addon_name)
+    builder = utils.FileTreeStatBuilder(
+        addon_short_name,
+        user,
+        progress=functools.partial(job.update_target_progress, addon_short_name),
+    )
     try:
-        file_tree = src_addon._get_file_tree(user=user, version=version)
+        file_tree = src_addon._get_file_tree(user=user, version=version, on_folder=builder.add_folder)
     except HTTPError as e:
         dst.archive_job.update_target(
             addon_short_name,
@@ -114,43 +124,32 @@ def stat_addon(addon_short_name, job_pk):
     result = AggregateStatResult(
         src_addon._id,
         addon_short_name,
-        targets=[utils.aggregate_file_tree_metadata(addon_short_name, file_tree, user)],
+        targets=[builder.finish(file_tree)],
+    )
+    job.update_target_progress(
+        addon_short_name,
+        num_folders=builder.num_folders,
+        num_files=result.num_files,
+        disk_usage=result.disk_usage,
+        done=True,
     )
     return result
 
 
-@celery_app.task(base=ArchiverTask, name="archiver.make_copy_request")
-@logged('make_copy_request')
-def make_copy_request(job_pk, url, data):
-    """Make the copy request to the WaterBulter API and handle
-    successful and failed responses
-
-    :param job_pk: primary key of ArchiveJob
-    :param url: URL to send request to
-    :param data: <dict> of setting to send in POST to WaterBulter API
-    :return: None
-    """
-    create_app_context()
-    job = ArchiveJob.load(job_pk)
-    src, dst, user = job.info()
-    provider = data['source']['provider']
-    logger.info("Sending copy request for addon: {0} on node: {1}".format(provider, dst._id))
-    requests.post(url, data=json.dumps(data))
-
-
-def make_waterbutler_payload(src, dst, addon_short_name, rename, cookie, revision=None):
+def make_waterbutler_payload(src, dst, addon_short_name, rename, cookie, revision=None,
+                             source_path='/', destination_path='/'):
     ret = {
         'source': {
             'cookie': cookie,
             'nid': src._id,
             'provider': addon_short_name,
-            'path': '/',
+            'path': source_path,
         },
         'destination': {
             'cookie': cookie,
             'nid': dst._id,
             'provider': settings.ARCHIVE_PROVIDER,
-            'path': '/',
+            'path': destination_path,
         },
         'rename': rename.replace('/', '-')
     }
@@ -159,14 +158,149 @@ def make_waterbutler_payload(src, dst, addon_short_name, rename, cookie, revisio
     return ret
 
 
+def get_batch_countdown(attempts):
+    """Seconds to wait before the next attempt at a failed batch."""
+    return settings.ARCHIVE_COPY_RETRY_BACKOFF * 2 ** attempts
+
+
+def dispatch_batches(job, addon_short_name):
+    """Start archiving every batch of a target that is ready, i.e. whose
+    parent folder exists in the archive. Batches are claimed atomically, so
+    concurrent calls never start a batch twice.
+    """
+    target = job.get_target(addon_short_name)
+    for batch in target.ready_batches():
+        if job.claim_batch(addon_short_name, batch['id']):
+            archive_batch.delay(
+                addon_short_name=addon_short_name,
+                job_pk=job._id,
+                batch_id=batch['id'],
+            )
+
+
+def _send_batch_request(src, dst, user, addon_short_name, target, batch):
+    """Ask WaterButler to archive `batch`, creating its folder or copying its
+    subtree into the folder of its parent batch.
+
+    :return: requests.Response
+    """
+    addon_name = addon_short_name
+    revision = None
+    if 'dataverse' in addon_short_name:
+        addon_name = 'dataverse'
+        revision = 'latest' if addon_short_name.split('-')[-1] == 'draft' else 'latest-published'
+    parent = target.get_batch(batch['parent']) if batch['parent'] else None
+    destination_path = parent['destination'] if parent else '/'
+    if batch['kind'] == 'folder':
+        url = waterbutler_url_for(
+            'create_folder',
+            provider=settings.ARCHIVE_PROVIDER,
+            path=destination_path + batch['name'] + '/',
+            node=dst,
+            user=user,
+            view_only=False,
+        )
+        return requests.post(url, timeout=settings.ARCHIVE_COPY_TIMEOUT)
+    data = make_waterbutler_payload(
+        src, dst, addon_name, batch['name'], user.get_or_create_cookie(),
+        revision=revision,
+        source_path=batch['path'],
+        destination_path=destination_path,
+    )
+    return requests.post(
+        settings.WATERBUTLER_URL + '/ops/copy',
+        data=json.dumps(data),
+        timeout=settings.ARCHIVE_COPY_TIMEOUT,
+    )
+
+
+@celery_app.task(base=ArchiverTask, name="archiver.archive_batch", max_retries=settings.ARCHIVE_COPY_MAX_RETRIES)
+@logged('archive_batch')
+def archive_batch(addon_short_name, job_pk, batch_id):
+    """Archive one batch of an addon's file tree, as planned by
+    utils.plan_archive_batches. Requests that fail to reach WaterButler, or
+    that WaterButler fails to handle, are retried with exponential backoff.
+
+    Copies complete asynchronously: WaterButler reports them to
+    registration_callbacks. Folders are created synchronously, after which
+    the batches inside them are started.
+
+    :param addon_short_name: AddonConfig.short_name of the addon being archived
+    :param job_pk: primary key of ArchiveJob
+    :param batch_id: ID of the batch on the addon's ArchiveTarget
+    :return: None
+    """
+    create_app_context()
+    job = ArchiveJob.load(job_pk)
+    src, dst, user = job.info()
+    target = job.get_target(addon_short_name)
+    batch = target.get_batch(batch_id)
+    if batch['status'] != ARCHIVER_PENDING:
+        # Already archived, e.g. by an earlier attempt of a resumed job
+        return
+    logger.info("Archiving batch {0} of addon: {1} on node: {2}".format(batch_id, addon_short_name, src._id))
+    try:
+        res = _send_batch_request(src, dst, user, addon_short_name, target, batch)
+        if res.status_code >= 500:
+            raise HTTPError(res.status_code, data={'error': res.content})
+    except (requests.RequestException, HTTPError) as e:
+        attempts = batch['attempts'] + 1
+        job.update_batch(addon_short_name, batch_id, attempts=attempts, errors=[str(e)])
+        if not isinstance(e, HTTPError):
+            e = HTTPError(httplib.SERVICE_UNAVAILABLE, data={'error': str(e)})
+        raise archive_batch.retry(exc=e, countdown=get_batch_countdown(attempts))
+    if res.status_code >= 400:
+        job.update_batch(addon_short_name, batch_id, status=ARCHIVER_FAILURE, errors=[res.content])
+        job.update_target(addon_short_name, ARCHIVER_NETWORK_ERROR, errors=[res.content])
+        project_signals.archive_callback.send(dst)
+        return
+    if batch['kind'] == 'folder':
+        job.update_batch(
+            addon_short_name,
+            batch_id,
+            status=ARCHIVER_SUCCESS,
+            destination=res.json()['data']['path'],
+        )
+        dispatch_batches(job, addon_short_name)
+        project_signals.archive_callback.send(dst)
+
+
+def handle_batch_callback(job, addon_short_name, batch_id, errors=None):
+    """Record the outcome of a copy batch reported by WaterButler. Failed
+    batches are retried with backoff until ARCHIVE_COPY_MAX_RETRIES is
+    reached, after which the target fails.
+    """
+    target = job.get_target(addon_short_name)
+    batch = target.get_batch(batch_id)
+    if not errors:
+        job.update_batch(addon_short_name, batch_id, status=ARCHIVER_SUCCESS, errors=[])
+        return
+    attempts = batch['attempts'] + 1
+    if attempts > settings.ARCHIVE_COPY_MAX_RETRIES:
+        job.update_batch(addon_short_name, batch_id, status=ARCHIVER_FAILURE, attempts=attempts, errors=errors)
+        job.update_target(addon_short_name, ARCHIVER_FAILURE, errors=errors)
+        return
+    job.update_batch(addon_short_name, batch_id, attempts=attempts, errors=errors)
+    archive_batch.apply_async(
+        kwargs={
+            'addon_short_name': addon_short_name,
+            'job_pk': job._id,
+            'batch_id': batch_id,
+        },
+        countdown=get_batch_countdown(attempts),
+    )
+
+
 @celery_app.task(base=ArchiverTask, name="archiver.archive_addon")
 @logged('archive_addon')
 def archive_addon(addon_short_name, job_pk, stat_result):
-    """Archive the contents of an addon by making a copy request to the
-    WaterBulter API
+    """Archive the contents of an addon by making copy requests to the
+    WaterBulter API. Large addons are split into batches that are copied in
+    parallel; a job that is run again resumes from its unfinished batches.
 
     :param addon_short_name: AddonConfig.short_name of the addon to be archived
     :param job_pk: primary key of ArchiveJob
+    :param stat_result: AggregateStatResult of the addon, from stat_addon
     :return: None
     """
     # Dataverse requires special handling for draft
@@ -180,22 +314,33 @@ def archive_addon(addon_short_name, job_pk, stat_result):
     logger.info("Archiving addon: {0} on node: {1}".format(addon_short_name, src._id))
     src_provider = src.get_addon(addon_name)
     folder_name = src_provider.archive_folder_name
-    cookie = user.get_or_create_cookie()
-    copy_url = settings.WATERBUTLER_URL + '/ops/copy'
-    if addon_name == 'dataverse':
-        # The dataverse API will not differentiate between published and draft files
-        # unless expcicitly asked. We need to create seperate folders for published and
-        # draft in the resulting archive.
-        #
-        # Additionally trying to run the archive without this distinction creates a race
-        # condition that non-deterministically caused archive jobs to fail.
-        data = make_waterbutler_payload(src, dst, addon_name, '{0} (published)'.format(folder_name), cookie, revision='latest-published')
-        make_copy_request.delay(job_pk=job_pk, url=copy_url, data=data)
-        data = make_waterbutler_payload(src, dst, addon_name, '{0} (draft)'.format(folder_name), cookie, revision='latest')
-        make_copy_request.delay(job_pk=job_pk, url=copy_url, data=data)
+    target = job.get_target(addon_short_name)
+    if not target.batches:
+        if addon_name == 'dataverse':
+            # The dataverse API will not differentiate between published and draft files
+            # unless expcicitly asked. We need to create seperate folders for published and
+            # draft in the resulting archive.
+            #
+            # Additionally trying to run the archive without this distinction creates a race
+            # condition that non-deterministically caused archive jobs to fail.
+            #
+            # Dataverse trees are not split, since WaterButler callbacks only
+            # tell draft and published copies apart by the name of the root
+            # folder.
+            suffix = 'draft' if addon_short_name.split('-')[-1] == 'draft' else 'published'
+            folder_name = '{0} ({1})'.format(folder_name, suffix)
+        target.batches = utils.plan_archive_batches(
+            stat_result.targets[0],
+            folder_name,
+            split=addon_name != 'dataverse',
+        )
+        target.save()
     else:
-        data = make_waterbutler_payload(src, dst, addon_name, folder_name, cookie)
-        make_copy_request.delay(job_pk=job_pk, url=copy_url, data=data)
+        # Resuming: start over any batch that was in flight
+        for batch in target.batches:
+            if batch['status'] == ARCHIVER_PENDING:
+                job.update_batch(addon_short_name, batch['id'], status=ARCHIVER_INITIATED)
+    dispatch_batches(job, addon_short_name)
 
 
 @celery_app.task(base=ArchiverTask, name="archiver.archive_node")
@@ -2,6 +2,7 @@ from framework.auth import Auth
 
 from website.archiver import (
     StatResult, AggregateStatResult,
+    ARCHIVER_INITIATED,
     ARCHIVER_NETWORK_ERROR,
     ARCHIVER_SIZE_EXCEEDED,
 )
@@ -131,6 +132,117 @@ def aggregate_file_tree_metadata(addon_short_name, fileobj_metadata, user):
             targets=[aggregate_file_tree_metadata(addon_short_name, child, user) for child in fileobj_metadata.get('children', [])],
         )
 
+
+def plan_archive_batches(stat_result, name, max_disk_usage=None, max_files=None, split=True):
+    """Split the file tree described by `stat_result` into batches that can be
+    copied to the archive independently. Subtrees within both limits are
+    copied with a single request; larger folders are recreated in the archive
+    and their children planned in turn.
+
+    :param stat_result: AggregateStatResult of the root folder to archive
+    :param name: Name of the root folder in the archive
+    :param split: Whether the tree may be split at all
+    :return: <list> of batch dicts, parents before their children
+    """
+    max_disk_usage = max_disk_usage or settings.ARCHIVE_BATCH_SIZE
+    max_files = max_files or settings.ARCHIVE_BATCH_FILES
+    batches = []
+
+    def plan(result, name, parent):
+        batch_id = str(len(batches))
+        fits = result.disk_usage <= max_disk_usage and result.num_files <= max_files
+        kind = 'copy' if isinstance(result, StatResult) or fits or not split else 'folder'
+        batches.append({
+            'id': batch_id,
+            'kind': kind,
+            'path': '/' + result.target_id,
+            'name': name.replace('/', '-'),
+            'parent': parent,
+            'num_files': result.num_files,
+            'disk_usage': result.disk_usage,
+            'status': ARCHIVER_INITIATED,
+            'attempts': 0,
+            'destination': None,
+            'errors': [],
+        })
+        if kind == 'folder':
+            for target in result.targets:
+                plan(target, target.target_name, batch_id)
+
+    plan(stat_result, name, None)
+    return batches
+
+
+class FileTreeStatBuilder(object):
+    """Build the AggregateStatResult of a file tree incrementally from folder
+    listings, as passed to the `on_folder` callback of
+    `StorageAddonBase._get_file_tree`. The result matches that of
+    `aggregate_file_tree_metadata` on the complete tree.
+
+    :param addon_short_name: AddonConfig.short_name of the addon being examined
+    :param user: archive initiator
+    :param progress: Optional callback, called every `interval` folders with
+        the current `num_folders`, `num_files` and `disk_usage`
+    :param int interval: Number of folders between progress callbacks
+    """
+
+    def __init__(self, addon_short_name, user, progress=None, interval=None):
+        self.addon_short_name = addon_short_name
+        self.user = user
+        self.progress = progress
+        self.interval = interval or settings.ARCHIVE_PROGRESS_INTERVAL
+        self.root = None
+        self.num_folders = 0
+        self.num_files = 0
+        self.disk_usage = 0
+        # Results of folders whose listings have not arrived yet, by path
+        self._pending = {}
+
+    @staticmethod
+    def _folder_result(folder):
+        return AggregateStatResult(
+            target_id=folder['path'].lstrip('/'),
+            target_name=folder['name'],
+            targets=[],
+        )
+
+    def add_folder(self, folder, children):
+        result = self._pending.pop(folder['path'], None)
+        if result is None:
+            result = self._folder_result(folder)
+            self.root = self.root or result
+        for child in children:
+            if child['kind'] == 'file':
+                stat = StatResult(
+                    target_name=child['name'],
+                    target_id=child['path'].lstrip('/'),
+                    disk_usage=child.get('size') or 0,
+                )
+                self.num_files += 1
+                self.disk_usage += stat.disk_usage
+                result.targets.append(stat)
+            else:
+                child_result = self._folder_result(child)
+                self._pending[child['path']] = child_result
+                result.targets.append(child_result)
+        self.num_folders += 1
+        if self.progress and self.num_folders % self.interval == 0:
+            self.progress(
+                num_folders=self.num_folders,
+                num_files=self.num_files,
+                disk_usage=self.disk_usage,
+            )
+
+    def finish(self, file_tree):
+        """Return the result for ``file_tree``, the tree that was crawled. If no
+        listings were streamed (e.g. for providers that return their whole
+        tree at once), aggregate the tree itself.
+        """
+        if self.root is None:
+            return aggregate_file_tree_metadata(self.addon_short_name, file_tree, self.user)
+        return self.root
+
+
 def before_archive(node, user):
     link_archive_provider(node, user)
     job = ArchiveJob(
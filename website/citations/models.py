@@ -6,6 +6,8 @@ from modularodm import fields
 
 from framework.mongo import StoredObject
 
+from website.citations.utils import get_search_grams
+
 
 class CitationStyle(StoredObject):
     """Persistent representation of a CSL style.
@@ -26,6 +28,25 @@ class CitationStyle(StoredObject):
     short_title = fields.StringField(required=False)
     summary = fields.StringField(required=False)
 
+    # Short substrings of the ID and titles, so that styles can be searched
+    # without scanning the collection; see `list_citation_styles`
+    search_grams = fields.StringField(list=True, index=True)
+
+    def save(self, *args, **kwargs):
+        self.search_grams = sorted(get_search_grams(self._id, self.title, self.short_title))
+        return super(CitationStyle, self).save(*args, **kwargs)
+
+    def matches(self, term):
+        """Whether the ID or either title of this style contains `term`,
+        ignoring case.
+        """
+        term = term.lower()
+        return any(
+            term in text.lower()
+            for text in (self._id, self.title, self.short_title)
+            if text
+        )
+
     def to_json(self):
         return {
             'id': self._id,
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""Server-side citation rendering. Parsing a CSL style takes far longer than
+rendering a citation with it, so parsed styles are kept in a per-process
+least-recently-used cache.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+from citeproc import Citation
+from citeproc import CitationItem
+from citeproc import CitationStylesBibliography
+from citeproc import CitationStylesStyle
+from citeproc import formatter
+from citeproc.source.json import CiteProcJSON
+
+from website import settings
+
+
+FORMATTERS = {
+    'html': formatter.html,
+    'text': formatter.plain,
+}
+
+
+class StyleCache(object):
+    """Least-recently-used cache of parsed CSL styles, keyed by style ID.
+    Rendering modifies the style, so each style is stored with a lock to hold
+    while rendering with it.
+
+    :param int size: Maximum number of styles
+    """
+    def __init__(self, size):
+        self.size = size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, style_id):
+        """Return the parsed style and its lock, parsing the style file if the
+        style is not cached.
+
+        :raises: KeyError if there is no style file for `style_id`
+        """
+        with self._lock:
+            entry = self._entries.pop(style_id, None)
+            if entry is not None:
+                self._entries[style_id] = entry
+                return entry
+        # Parse without holding the lock; a style parsed by two threads at
+        # once is simply stored twice
+        entry = (CitationStylesStyle(get_style_path(style_id), validate=False), threading.Lock())
+        with self._lock:
+            self._entries[style_id] = entry
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_styles = StyleCache(settings.CITATION_STYLE_CACHE_SIZE)
+
+
+def get_style_path(style_id):
+    """Return the path of the CSL file of a style.
+
+    :raises: KeyError if there is no such style
+    """
+    path = os.path.join(settings.CITATION_STYLES_PATH, '{0}.csl'.format(style_id))
+    if os.path.basename(path) != '{0}.csl'.format(style_id) or not os.path.isfile(path):
+        raise KeyError(style_id)
+    return path
+
+
+def render_citations(csl_items, style_id, output='html'):
+    """Render a standalone bibliography entry for each CSL-JSON item, as
+    citeproc-js does for a single node.
+
+    :param list csl_items: CSL-JSON dicts, each with a unique ``id``
+    :param str style_id: ID of a `CitationStyle`
+    :param str output: Either ``'html'`` or ``'text'``
+    :return dict: Rendered citation by item ID
+    :raises: KeyError if there is no such style
+    """
+    style, lock = _styles.get(style_id)
+    output_formatter = FORMATTERS[output]
+    rendered = {}
+    with lock:
+        for item in csl_items:
+            bibliography = CitationStylesBibliography(style, CiteProcJSON([item]), output_formatter)
+            bibliography.register(Citation([CitationItem(item['id'])]))
+            rendered[item['id']] = u''.join(
+                unicode(entry) for entry in bibliography.bibliography()
+            )
+    return rendered
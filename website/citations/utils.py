@@ -1,3 +1,33 @@
 def datetime_to_csl(dt):
     """Given a datetime, return a dict in CSL-JSON date-variable schema"""
     return {'date-parts': [[dt.year, dt.month, dt.day]]}
+
+
+# Terms up to this long are looked up in the style search index as a whole;
+# longer ones by each of their substrings of this length
+SEARCH_GRAM_SIZE = 3
+
+
+def get_search_grams(*texts):
+    """Return the set of lowercase substrings of up to `SEARCH_GRAM_SIZE`
+    characters of `texts`, which may include `None`.
+    """
+    grams = set()
+    for text in texts:
+        if not text:
+            continue
+        text = text.lower()
+        for size in range(1, SEARCH_GRAM_SIZE + 1):
+            grams.update(text[start:start + size] for start in range(len(text) - size + 1))
+    return grams
+
+
+def get_term_grams(term):
+    """Return the grams that every text containing `term` has."""
+    term = term.lower()
+    if len(term) <= SEARCH_GRAM_SIZE:
+        return set([term])
+    return set(
+        term[start:start + SEARCH_GRAM_SIZE]
+        for start in range(len(term) - SEARCH_GRAM_SIZE + 1)
+    )
@@ -1,25 +1,39 @@
 # -*- coding: utf-8 -*-
 
+import httplib as http
+
 from flask import request
 
-from modularodm import Q
-from website.models import CitationStyle
+from framework.auth.decorators import collect_auth
+from framework.exceptions import HTTPError
+from framework.mongo.utils import bulk_find, bulk_load
+from website import settings
+from website.citations import render
+from website.citations.utils import get_term_grams
+from website.models import CitationStyle, Node
 from website.project.decorators import must_be_contributor_or_public
+from website.project.model import bulk_csl, filter_viewable
 
 
 def list_citation_styles():
-    query = None
-
     term = request.args.get('q')
     if term:
-        query = (
-            Q('_id', 'icontains', term) |
-            Q('title', 'icontains', term) |
-            Q('short_title', 'icontains', term)
-        )
+        # Styles containing the term have all of its grams, so the index
+        # narrows the search; the few styles that have the grams but not the
+        # term are dropped here
+        styles = [
+            style
+            for style in bulk_find(
+                CitationStyle,
+                {'search_grams': {'$all': sorted(get_term_grams(term))}},
+            )
+            if style.matches(term)
+        ]
+    else:
+        styles = CitationStyle.find()
 
     return {
-        'styles': [style.to_json() for style in CitationStyle.find(query)],
+        'styles': [style.to_json() for style in styles],
     }
 
 
@@ -27,3 +41,40 @@ def list_citation_styles():
 def node_citation(**kwargs):
     node = kwargs['node'] or kwargs['project']
     return {node.csl['id']: node.csl}
+
+
+@collect_auth
+def render_node_citations(auth, **kwargs):
+    """Render the citations of several nodes in one style, for lists of
+    projects and registrations. Nodes that do not exist or that the user
+    cannot view are left out.
+
+    :param-query str style: ID of a citation style
+    :param-query str nodes: Comma-separated node IDs
+    :param-query str format: ``html`` (default) or ``text``
+    """
+    style_id = request.args.get('style')
+    output = request.args.get('format', 'html')
+    node_ids = [each for each in request.args.get('nodes', '').split(',') if each]
+    if not style_id or output not in render.FORMATTERS:
+        raise HTTPError(http.BAD_REQUEST)
+    if len(node_ids) > settings.CITATION_RENDER_MAX_NODES:
+        raise HTTPError(http.BAD_REQUEST, data=dict(
+            message_long='Citations can be rendered for at most {0} nodes at once.'.format(
+                settings.CITATION_RENDER_MAX_NODES
+            )
+        ))
+
+    try:
+        render.get_style_path(style_id)
+    except KeyError:
+        raise HTTPError(http.NOT_FOUND)
+
+    nodes = [
+        node for node in bulk_load(Node, node_ids)
+        if not node.is_deleted
+    ]
+    csl_items = bulk_csl(filter_viewable(nodes, auth)).values()
+    return {
+        'citations': render.render_citations(csl_items, style_id, output=output),
+    }
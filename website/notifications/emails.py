@@ -1,6 +1,10 @@
+import collections
+
 from babel import dates, core, Locale
 from mako.lookup import Template
 
+from framework.mongo.utils import bulk_load, bulk_insert, prefetch
+
 from website import mails
 from website import models as website_models
 from website.notifications import constants
@@ -16,6 +20,34 @@ EMAIL_SUBJECT_MAP = {
 }
 
 
+def load_recipients(recipient_ids, user):
+    """Load recipients with one query, leaving out the user who triggered the
+    notification.
+    """
+    return bulk_load(
+        website_models.User,
+        [user_id for user_id in recipient_ids if user_id != user._id],
+    )
+
+
+def render_by_locale(template, recipients, timestamp, **context):
+    """Render ``template`` once for each distinct timezone and locale among
+    ``recipients``, the only recipient-specific parts of a message.
+
+    :return: Iterator of (message, recipients) pairs
+    """
+    buckets = collections.defaultdict(list)
+    for recipient in recipients:
+        buckets[(recipient.timezone, recipient.locale)].append(recipient)
+    for (timezone, locale), bucket in buckets.iteritems():
+        message = mails.render_message(
+            template,
+            localized_timestamp=_localize_timestamp(timestamp, timezone, locale),
+            **context
+        )
+        yield message, bucket
+
+
 def email_transactional(recipient_ids, uid, event, user, node, timestamp, **context):
     """
     :param recipient_ids: mod-odm User object ids
@@ -29,16 +61,12 @@ def email_transactional(recipient_ids, uid, event, user, node, timestamp, **cont
     context['title'] = node.title
     context['user'] = user
     subject = Template(EMAIL_SUBJECT_MAP[event]).render(**context)
+    recipients = load_recipients(recipient_ids, user)
 
-    for user_id in recipient_ids:
-        recipient = website_models.User.load(user_id)
-        email = recipient.username
-        context['localized_timestamp'] = localize_timestamp(timestamp, recipient)
-        message = mails.render_message(template, **context)
-
-        if user._id != recipient._id:
+    for message, bucket in render_by_locale(template, recipients, timestamp, **context):
+        for recipient in bucket:
             mails.send_mail(
-                to_addr=email,
+                to_addr=recipient.username,
                 mail=mails.TRANSACTIONAL,
                 mimetype='html',
                 name=recipient.fullname,
@@ -57,21 +85,20 @@ def email_digest(recipient_ids, uid, event, user, node, timestamp, **context):
     template = event + '.html.mako'
     context['user'] = user
     node_lineage_ids = get_node_lineage(node) if node else []
+    recipients = load_recipients(recipient_ids, user)
 
-    for user_id in recipient_ids:
-        recipient = website_models.User.load(user_id)
-        context['localized_timestamp'] = localize_timestamp(timestamp, recipient)
-        message = mails.render_message(template, **context)
-
-        if user._id != recipient._id:
-            digest = NotificationDigest(
-                timestamp=timestamp,
-                event=event,
-                user_id=recipient._id,
-                message=message,
-                node_lineage=node_lineage_ids
-            )
-            digest.save()
+    digests = [
+        NotificationDigest(
+            timestamp=timestamp,
+            event=event,
+            user_id=recipient._id,
+            message=message,
+            node_lineage=node_lineage_ids
+        )
+        for message, bucket in render_by_locale(template, recipients, timestamp, **context)
+        for recipient in bucket
+    ]
+    bulk_insert(NotificationDigest, digests)
 
 
 EMAIL_FUNCTION_MAP = {
@@ -89,23 +116,35 @@ def notify(uid, event, user, node, timestamp, **context):
     :param timestamp: time
     :param context: optional variables specific to templates
         target_user: used with comment_replies
-    :return:
+    :return: IDs of all users subscribed to the event, including those
+        subscribed to receive no notifications
     """
     node_subscribers = []
     subscription = NotificationSubscription.load(utils.to_subscription_key(uid, event))
 
     if subscription:
         for notification_type in constants.NOTIFICATION_TYPES:
-            subscribed_users = getattr(subscription, notification_type, [])
+            subscribed_ids = getattr(subscription, notification_type)._to_primary_keys()
+            node_subscribers.extend(subscribed_ids)
+            if notification_type != 'none':
+                fan_out(subscribed_ids, notification_type, uid, event, user, node, timestamp, **context)
 
-            node_subscribers.extend(subscribed_users)
+    return check_parent(uid, event, node_subscribers, user, node, timestamp, **context)
 
-            if subscribed_users and notification_type != 'none':
-                for recipient in subscribed_users:
-                    event = 'comment_replies' if context.get('target_user') == recipient else event
-                    send([recipient._id], notification_type, uid, event, user, node, timestamp, **context)
 
-    return check_parent(uid, event, node_subscribers, user, node, timestamp, **context)
+def fan_out(recipient_ids, notification_type, uid, event, user, node, timestamp, **context):
+    """Send one notification of `event` to all of ``recipient_ids`` at once,
+    except that a direct reply to a recipient's comment is sent to that
+    recipient as a `comment_replies` notification.
+    """
+    target_user = context.get('target_user')
+    target_id = target_user._id if target_user else None
+    recipient_ids = list(recipient_ids)
+    if target_id in recipient_ids:
+        recipient_ids.remove(target_id)
+        send([target_id], notification_type, uid, 'comment_replies', user, node, timestamp, **context)
+    if recipient_ids:
+        send(recipient_ids, notification_type, uid, event, user, node, timestamp, **context)
 
 
 def check_parent(uid, event, node_subscribers, user, orig_node, timestamp, **context):
@@ -113,26 +152,41 @@ def check_parent(uid, event, node_subscribers, user, orig_node, timestamp, **con
         and send transactional email to indirect subscribers.
     """
     node = website_models.Node.load(uid)
-    target_user = context.get('target_user', None)
-
-    if node and node.parent_id:
-        key = utils.to_subscription_key(node.parent_id, event)
-        subscription = NotificationSubscription.load(key)
-
-        if not subscription:
-            return check_parent(node.parent_id, event, node_subscribers, user, orig_node, timestamp, **context)
-
-        for notification_type in constants.NOTIFICATION_TYPES:
-            subscribed_users = getattr(subscription, notification_type, [])
-
-            for u in subscribed_users:
-                if u not in node_subscribers and node.has_permission(u, 'read'):
-                    if notification_type != 'none':
-                        event = 'comment_replies' if target_user == u else event
-                        send([u._id], notification_type, uid, event, user, orig_node, timestamp, **context)
-                    node_subscribers.append(u)
-
-        return check_parent(node.parent_id, event, node_subscribers, user, orig_node, timestamp, **context)
+    if not node or not node.ancestor_ids:
+        return node_subscribers
+
+    # Load the whole lineage and the ancestors' subscriptions up front rather
+    # than one level at a time
+    ancestors = dict(
+        (ancestor._id, ancestor)
+        for ancestor in bulk_load(website_models.Node, node.ancestor_ids)
+    )
+    subscriptions = dict(
+        (subscription._id, subscription)
+        for subscription in bulk_load(
+            NotificationSubscription,
+            [utils.to_subscription_key(ancestor_id, event) for ancestor_id in node.ancestor_ids],
+        )
+    )
+    prefetch(subscriptions.values(), *constants.NOTIFICATION_TYPES)
+
+    # Subscribers to each ancestor are notified if they can read the node
+    # directly below it in the lineage
+    child = node
+    for parent_id in node.ancestor_ids:
+        subscription = subscriptions.get(utils.to_subscription_key(parent_id, event))
+        if subscription:
+            for notification_type in constants.NOTIFICATION_TYPES:
+                recipient_ids = []
+                for u in getattr(subscription, notification_type):
+                    if u._id not in node_subscribers and child.has_permission(u, 'read'):
+                        recipient_ids.append(u._id)
+                        node_subscribers.append(u._id)
+                if notification_type != 'none':
+                    fan_out(recipient_ids, notification_type, child._id, event, user, orig_node, timestamp, **context)
+        child = ancestors.get(parent_id)
+        if child is None:
+            break
 
     return node_subscribers
 
@@ -161,13 +215,7 @@ def get_node_lineage(node):
     """ Get a list of node ids in order from the node to top most project
         e.g. [parent._id, node._id]
     """
-    lineage = [node._id]
-
-    while node.parent_id:
-        node = website_models.Node.load(node.parent_id)
-        lineage = [node._id] + lineage
-
-    return lineage
+    return list(reversed(node.ancestor_ids)) + [node._id]
 
 
 def get_settings_url(uid, user):
@@ -180,13 +228,17 @@ def get_settings_url(uid, user):
 
 
 def localize_timestamp(timestamp, user):
+    return _localize_timestamp(timestamp, user.timezone, user.locale)
+
+
+def _localize_timestamp(timestamp, timezone, locale):
     try:
-        user_timezone = dates.get_timezone(user.timezone)
+        user_timezone = dates.get_timezone(timezone)
     except LookupError:
         user_timezone = dates.get_timezone('Etc/UTC')
 
     try:
-        user_locale = Locale(user.locale)
+        user_locale = Locale(locale)
     except core.UnknownLocaleError:
         user_locale = 'en'
 
@@ -63,7 +63,9 @@ class ExternalAccount(StoredObject):
 
     # Used for OAuth2 only
     refresh_token = fields.StringField()
-    expires_at = fields.DateTimeField()
+    # Indexed for ``website.oauth.refresh``, which refreshes tokens ahead of
+    # their expiry
+    expires_at = fields.DateTimeField(index=True)
     scopes = fields.StringField(list=True, default=lambda: list())
 
     # The `name` of the service
@@ -196,6 +198,10 @@ class ExternalProvider(object):
 
     default_scopes = list()
 
+    # The provider URL to exchange a refresh token for a new access token.
+    # OAuth 2.0 only; access tokens of providers without one are not refreshed
+    refresh_url = None
+
     @abc.abstractproperty
     def name(self):
         """Human-readable name of the service. e.g.: ORCiD, GitHub"""
@@ -340,6 +346,42 @@ class ExternalProvider(object):
 
             return values
 
+    def refresh_oauth_key(self):
+        """Exchange the refresh token of ``self.account`` for a new access
+        token, and save it to the account.
+
+        :return bool: Whether the access token was refreshed; False if the
+            provider or the account does not support refreshing
+        :raises: ``oauthlib.oauth2.OAuth2Error`` if the provider rejects the
+            refresh token
+        """
+        if self._oauth_version != OAUTH2 or not self.refresh_url:
+            return False
+        if not self.account.refresh_token:
+            return False
+
+        response = OAuth2Session(
+            self.client_id,
+            token={
+                'access_token': self.account.oauth_key,
+                'refresh_token': self.account.refresh_token,
+                'token_type': 'Bearer',
+            },
+        ).refresh_token(
+            self.refresh_url,
+            refresh_token=self.account.refresh_token,
+            client_id=self.client_id,
+            client_secret=self.client_secret,
+        )
+        info = self._default_handle_callback(response)
+
+        self.account.oauth_key = info['key']
+        # Some providers keep the refresh token for the life of the grant
+        self.account.refresh_token = info.get('refresh_token', self.account.refresh_token)
+        self.account.expires_at = info.get('expires_at')
+        self.account.save()
+        return True
+
     @abc.abstractmethod
     def handle_callback(self, response):
         """Hook for allowing subclasses to parse information from the callback.
@@ -0,0 +1,265 @@
+# -*- coding: utf-8 -*-
+"""Refreshing of OAuth 2.0 access tokens ahead of their expiry.
+
+`scripts/refresh_oauth_tokens.py` runs from cron and refreshes, in bulk, the
+tokens of all external accounts that expire within ``OAUTH_REFRESH_AHEAD``
+seconds. Add-ons get tokens from `get_access_token`, which serves them from a
+per-process cache and never calls the provider unless a token has already
+expired.
+"""
+
+import datetime
+import functools
+import logging
+import threading
+from collections import namedtuple
+from collections import OrderedDict
+from multiprocessing.pool import ThreadPool
+
+from pymongo.errors import DuplicateKeyError
+
+from framework.mongo import database
+from framework.tasks import app
+from framework.tasks.handlers import enqueue_task
+
+from website import settings
+from website.oauth.models import ExternalAccount
+from website.oauth.utils import PROVIDER_LOOKUP
+from website.oauth.utils import get_service
+
+
+logger = logging.getLogger(__name__)
+
+CLAIMS_COLLECTION = 'oauthrefreshclaims'
+
+AccessToken = namedtuple('AccessToken', ['key', 'expires_at'])
+
+
+class TokenCache(object):
+    """Least-recently-used cache of access tokens by account ID. Entries are
+    dropped after `ttl` seconds, so that tokens refreshed by other processes
+    are picked up.
+
+    :param int size: Maximum number of tokens
+    :param int ttl: Seconds to keep each token
+    """
+    def __init__(self, size, ttl):
+        self.size = size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, account_id):
+        """Return the cached token of an account, or None."""
+        now = datetime.datetime.utcnow()
+        with self._lock:
+            entry = self._entries.pop(account_id, None)
+            if entry is None:
+                return None
+            token, cached = entry
+            if (now - cached).total_seconds() > self.ttl:
+                return None
+            self._entries[account_id] = entry
+            return token
+
+    def set(self, account_id, token):
+        with self._lock:
+            self._entries.pop(account_id, None)
+            self._entries[account_id] = (token, datetime.datetime.utcnow())
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_tokens = TokenCache(settings.OAUTH_TOKEN_CACHE_SIZE, settings.OAUTH_TOKEN_CACHE_TTL)
+
+
+def get_account_collection():
+    return ExternalAccount._storage[0].store
+
+
+def get_claims_collection():
+    collection = database[CLAIMS_COLLECTION]
+    # Cached by pymongo; only hits the server once per process
+    collection.ensure_index('claimed', expireAfterSeconds=settings.OAUTH_REFRESH_CLAIM_TIMEOUT)
+    return collection
+
+
+def _expires_within(token, seconds):
+    if token.expires_at is None:
+        return False
+    remaining = token.expires_at - datetime.datetime.utcnow()
+    return remaining.total_seconds() < seconds
+
+
+def _load_token(account_id):
+    """Read the current token of an account from the database, bypassing the
+    model cache, which may hold a token since refreshed by another process.
+    """
+    entry = get_account_collection().find_one(
+        {'_id': account_id},
+        {'oauth_key': True, 'expires_at': True},
+    )
+    if entry is None:
+        return None
+    return AccessToken(entry.get('oauth_key'), entry.get('expires_at'))
+
+
+def get_access_token(account):
+    """Return the access token of `account`. Tokens about to expire are
+    returned as they are while a Celery task refreshes them; only tokens that
+    have already expired are refreshed before returning.
+
+    :param ExternalAccount account:
+    :return AccessToken:
+    """
+    token = _tokens.get(account._id)
+    if token is not None and not _expires_within(token, settings.OAUTH_TOKEN_MIN_VALIDITY):
+        return token
+
+    token = _load_token(account._id) or AccessToken(account.oauth_key, account.expires_at)
+    if _expires_within(token, 0):
+        logger.warning('Access token of {0!r} expired before it was refreshed'.format(account))
+        if _refresh_outside_request(account._id):
+            token = _tokens.get(account._id) or token
+    elif _expires_within(token, settings.OAUTH_TOKEN_MIN_VALIDITY):
+        enqueue_task(refresh_oauth_key.si(account._id))
+    if not _expires_within(token, settings.OAUTH_TOKEN_MIN_VALIDITY):
+        _tokens.set(account._id, token)
+    return token
+
+
+def _refresh_outside_request(account_id):
+    """Run `refresh_account` in a thread of its own. Without a request
+    context the thread uses the default database client rather than the
+    request's, so the claim and the new token are committed at once: a
+    refresh token used up by the provider is never lost to a rollback of the
+    request's transaction, and the claim does not hold locks until the
+    request ends.
+    """
+    pool = ThreadPool(1)
+    try:
+        return pool.apply(refresh_account, (account_id, ))
+    finally:
+        pool.close()
+        pool.join()
+
+
+def _claim(account_id):
+    """Claim the refresh of an account's token, so that a refresh token is
+    never used by two processes at once. Claims are released by `_release`,
+    or expire after ``OAUTH_REFRESH_CLAIM_TIMEOUT`` seconds.
+
+    :return bool: Whether the claim succeeded
+    """
+    now = datetime.datetime.utcnow()
+    expired = now - datetime.timedelta(seconds=settings.OAUTH_REFRESH_CLAIM_TIMEOUT)
+    try:
+        get_claims_collection().update(
+            {'_id': account_id, 'claimed': {'$lt': expired}},
+            {'$set': {'claimed': now}},
+            upsert=True,
+        )
+    except DuplicateKeyError:
+        return False
+    return True
+
+
+def _release(account_id):
+    get_claims_collection().remove({'_id': account_id})
+
+
+def refresh_account(account_id, ahead=0):
+    """Refresh the access token of an account if it expires within `ahead`
+    seconds and no other process is refreshing it.
+
+    :return bool: Whether the token was refreshed
+    :raises: ``oauthlib.oauth2.OAuth2Error`` if the provider rejects the
+        refresh token
+    """
+    if not _claim(account_id):
+        return False
+    try:
+        account = ExternalAccount.load(account_id)
+        if account is None:
+            return False
+        # Another process may have refreshed the token since it was loaded
+        account.reload()
+        if not _expires_within(AccessToken(account.oauth_key, account.expires_at), ahead):
+            return False
+        provider = get_service(account.provider)
+        provider.account = account
+        refreshed = provider.refresh_oauth_key()
+    finally:
+        _release(account_id)
+    if refreshed:
+        _tokens.set(account._id, AccessToken(account.oauth_key, account.expires_at))
+    return refreshed
+
+
+def get_refreshable_providers():
+    """Names of the providers whose access tokens can be refreshed."""
+    return sorted(
+        name for name, provider in PROVIDER_LOOKUP.items()
+        if provider.refresh_url
+    )
+
+
+def get_expiring_account_ids(ahead):
+    """IDs of the accounts whose access tokens expire within `ahead` seconds
+    and can be refreshed, soonest first.
+    """
+    expires_before = datetime.datetime.utcnow() + datetime.timedelta(seconds=ahead)
+    cursor = get_account_collection().find(
+        {
+            'expires_at': {'$lt': expires_before},
+            'provider': {'$in': get_refreshable_providers()},
+            'refresh_token': {'$nin': [None, '']},
+        },
+        {'_id': True},
+    ).sort('expires_at', 1)
+    return [each['_id'] for each in cursor]
+
+
+def _refresh_logged(account_id, ahead):
+    try:
+        return 'refreshed' if refresh_account(account_id, ahead) else 'skipped'
+    except Exception:
+        logger.exception('Could not refresh access token of account {0}'.format(account_id))
+        return 'failed'
+
+
+def refresh_expiring_tokens(ahead=None, concurrency=None):
+    """Refresh the access tokens of all accounts that expire within `ahead`
+    seconds, `concurrency` at a time.
+
+    :return dict: Number of tokens refreshed, skipped and failed
+    """
+    ahead = ahead if ahead is not None else settings.OAUTH_REFRESH_AHEAD
+    account_ids = get_expiring_account_ids(ahead)
+    counts = {'refreshed': 0, 'skipped': 0, 'failed': 0}
+    if not account_ids:
+        return counts
+    pool = ThreadPool(concurrency or settings.OAUTH_REFRESH_CONCURRENCY)
+    try:
+        results = pool.map(functools.partial(_refresh_logged, ahead=ahead), account_ids)
+    finally:
+        pool.close()
+        pool.join()
+    for result in results:
+        counts[result] += 1
+    return counts
+
+
+@app.task(ignore_result=True)
+def refresh_oauth_key(account_id):
+    """Refresh an access token about to expire that was requested before the
+    scheduled refresh got to it.
+    """
+    _refresh_logged(account_id, settings.OAUTH_TOKEN_MIN_VALIDITY)
@@ -6,10 +6,12 @@ import urllib
 import logging
 import datetime
 import urlparse
+import threading
 from collections import OrderedDict
 import warnings
 
 import pytz
+import pymongo
 from flask import request
 from django.core.urlresolvers import reverse
 
@@ -31,7 +33,7 @@ from framework.exceptions import PermissionsError
 from framework.guid.model import GuidStoredObject
 from framework.auth.utils import privacy_info_handle
 from framework.analytics import tasks as piwik_tasks
-from framework.mongo.utils import to_mongo, to_mongo_key, unique_on
+from framework.mongo.utils import to_mongo, to_mongo_key, unique_on, bulk_find, bulk_load, prefetch
 from framework.analytics import (
     get_basic_counters, increment_user_activity_counters
 )
@@ -43,16 +45,18 @@ from website import language, mails, settings, tokens
 from website.util import web_url_for
 from website.util import api_url_for
 from website.util import sanitize
+from website.util import organizer_cache
 from website.exceptions import (
     NodeStateError,
     InvalidSanctionApprovalToken, InvalidSanctionRejectionToken,
 )
 from website.citations.utils import datetime_to_csl
-from website.identifiers.model import IdentifierMixin
+from website.identifiers.model import Identifier, IdentifierMixin
 from website.util.permissions import expand_permissions
 from website.util.permissions import CREATOR_PERMISSIONS, DEFAULT_CONTRIBUTOR_PERMISSIONS, ADMIN
 from website.project.metadata.schemas import OSF_META_SCHEMAS
 from website.project import signals as project_signals
+from website.project import timeline
 
 logger = logging.getLogger(__name__)
 
@@ -264,6 +268,24 @@ class Comment(GuidStoredObject):
 @unique_on(['params.node', '_id'])
 class NodeLog(StoredObject):
 
+    # Reverse-chronological log timelines of nodes; see website.project.timeline
+    __indices__ = [
+        {
+            'key_or_list': [
+                (timeline.TIMELINE_KEY, pymongo.ASCENDING),
+                ('date', pymongo.DESCENDING),
+                ('_id', pymongo.DESCENDING),
+            ],
+        },
+        {
+            'key_or_list': [
+                (timeline.TIMELINE_KEY, pymongo.ASCENDING),
+                ('action', pymongo.ASCENDING),
+                ('date', pymongo.DESCENDING),
+            ],
+        },
+    ]
+
     _id = fields.StringField(primary=True, default=lambda: str(ObjectId()))
 
     date = fields.DateTimeField(default=datetime.datetime.utcnow, index=True)
@@ -490,6 +512,87 @@ def get_pointer_parent(pointer):
     return parent_refs[0]
 
 
+# Bumped whenever node permissions or the node tree change in this process,
+# invalidating the admin IDs resolved and memoized on node objects
+_permissions_generation = [0]
+_permissions_generation_lock = threading.Lock()
+
+
+def invalidate_resolved_permissions():
+    """Discard admin IDs resolved by `Node.get_admin_ids` for every node."""
+    with _permissions_generation_lock:
+        _permissions_generation[0] += 1
+
+
+def filter_viewable(nodes, auth):
+    """Return the nodes (or pointers) in `nodes` that `auth` can view. The
+    ancestors of all of them are loaded with a single query rather than by
+    walking each node's parents.
+    """
+    nodes = list(nodes)
+    resolved = [node.resolve() for node in nodes]
+    ancestor_ids = set(
+        ancestor_id
+        for node in resolved
+        if not node.is_public
+        for ancestor_id in node.ancestor_ids
+    )
+    ancestors = dict(
+        (ancestor._id, ancestor)
+        for ancestor in bulk_load(Node, ancestor_ids)
+    )
+    viewable = []
+    for node, resolved_node in zip(nodes, resolved):
+        if not resolved_node.is_public:
+            resolved_node.get_admin_ids(ancestors=ancestors)
+        if resolved_node.can_view(auth):
+            viewable.append(node)
+    return viewable
+
+
+def bulk_csl(nodes):
+    """Return a dict mapping the ID of each of `nodes` to its CSL-JSON, as
+    ``Node.csl`` would build it. Visible contributors, DOIs and latest logs
+    are loaded with one query each rather than once per node.
+    """
+    nodes = list(nodes)
+    bulk_load(User, [
+        user_id
+        for node in nodes
+        for user_id in node.visible_contributor_ids
+    ])
+    dois = dict(
+        (each['referent'][0], each['value'])
+        for each in Identifier._storage[0].store.find(
+            {
+                'referent.0': {'$in': [node._id for node in nodes]},
+                'referent.1': 'node',
+                'category': 'doi',
+            },
+            {'referent': True, 'value': True},
+        )
+    )
+    last_log_ids = {}
+    for node in nodes:
+        log_ids = node.to_storage().get('logs')
+        if log_ids:
+            last_log_ids[node._id] = log_ids[-1]
+    issued = dict(
+        (log['_id'], log['date'])
+        for log in NodeLog._storage[0].store.find(
+            {'_id': {'$in': last_log_ids.values()}},
+            {'date': True},
+        )
+    )
+    return dict(
+        (node._id, node._make_csl(
+            doi=dois.get(node._id),
+            issued=issued.get(last_log_ids.get(node._id)),
+        ))
+        for node in nodes
+    )
+
+
 def validate_category(value):
     """Validator for Node#category. Makes sure that the value is one of the
     categories defined in CATEGORY_MAP.
@@ -570,6 +673,8 @@ class Node(GuidStoredObject, AddonModelMixin, IdentifierMixin):
     _id = fields.StringField(primary=True)
 
     date_created = fields.DateTimeField(auto_now_add=datetime.datetime.utcnow, index=True)
+    # Date of the most recent log, maintained by `add_log` and `save`
+    date_modified = fields.DateTimeField(index=True)
 
     # Privacy
     is_public = fields.BooleanField(default=False, index=True)
@@ -630,12 +735,21 @@ class Node(GuidStoredObject, AddonModelMixin, IdentifierMixin):
     system_tags = fields.StringField(list=True)
 
     nodes = fields.AbstractForeignField(list=True, backref='parent')
+    # Primary keys of this node's primary (non-pointer) ancestors, nearest
+    # first. Maintained on save so that a whole subtree can be fetched with
+    # one indexed query on this field.
+    ancestor_ids = fields.StringField(list=True, index=True)
     forked_from = fields.ForeignField('node', backref='forked', index=True)
     registered_from = fields.ForeignField('node', backref='registrations', index=True)
 
     # The node (if any) used as a template for this node's creation
     template_node = fields.ForeignField('node', backref='template_node', index=True)
 
+    # Counts of related nodes shown on the project page, keyed by the names in
+    # `RELATION_COUNTS`. Maintained on save by `update_relation_counts`;
+    # missing counts are computed when first read.
+    relation_counts = fields.DictionaryField()
+
     piwik_site_id = fields.StringField()
 
     # Dictionary field mapping user id to a list of nodes in node.nodes which the user has subscriptions for
@@ -803,12 +917,50 @@ class Node(GuidStoredObject, AddonModelMixin, IdentifierMixin):
             if contrib.is_active and include(contrib):
                 yield contrib
 
+    def get_admin_ids(self, ancestors=None):
+        """IDs of users with admin permission on this node or on any of its
+        ancestors up to the first deleted one. Ancestors are loaded with one
+        query, and the result is memoized on the node until permissions or the
+        node tree change.
+
+        :param dict ancestors: Preloaded ancestors by ID, e.g. from `filter_viewable`
+        """
+        generation = _permissions_generation[0]
+        memo = getattr(self, '_admin_ids', None)
+        if memo is not None and memo[0] == generation:
+            return memo[1]
+        admin_ids = set(
+            user_id
+            for user_id, permissions in self.permissions.iteritems()
+            if ADMIN in permissions
+        )
+        ancestor_ids = list(self.ancestor_ids)
+        if ancestors is None or not set(ancestor_ids).issubset(ancestors):
+            ancestors = dict(
+                (ancestor._id, ancestor)
+                for ancestor in bulk_load(Node, ancestor_ids)
+            )
+        for ancestor_id in ancestor_ids:
+            ancestor = ancestors.get(ancestor_id)
+            if ancestor is None or ancestor.is_deleted:
+                break
+            memo = getattr(ancestor, '_admin_ids', None)
+            if memo is not None and memo[0] == generation:
+                admin_ids.update(memo[1])
+                break
+            admin_ids.update(
+                user_id
+                for user_id, permissions in ancestor.permissions.iteritems()
+                if ADMIN in permissions
+            )
+        admin_ids = frozenset(admin_ids)
+        self._admin_ids = (generation, admin_ids)
+        return admin_ids
+
     def is_admin_parent(self, user):
-        if self.has_permission(user, 'admin', check_parent=False):
-            return True
-        if self.parent_node:
-            return self.parent_node.is_admin_parent(user)
-        return False
+        if user is None:
+            return False
+        return user._id in self.get_admin_ids()
 
     def can_view(self, auth):
         if not auth and not self.is_public:
@@ -862,6 +1014,114 @@ class Node(GuidStoredObject, AddonModelMixin, IdentifierMixin):
         return list(self.node__forked.find(Q('is_deleted', 'eq', False) &
                                            Q('is_registration', 'ne', True)))
 
+    #: Relations counted in `relation_counts`
+    RELATION_COUNTS = ('forks', 'registrations', 'templates', 'watchers', 'pointers', 'children')
+
+    def _count_relation(self, relation):
+        if relation == 'forks':
+            return self.node__forked.find(
+                Q('is_deleted', 'eq', False) &
+                Q('is_registration', 'ne', True)
+            ).count()
+        if relation == 'registrations':
+            return Node.find(Q('registered_from', 'eq', self._id)).count()
+        if relation == 'templates':
+            return Node.find(
+                Q('template_node', 'eq', self._id) &
+                Q('is_deleted', 'eq', False)
+            ).count()
+        if relation == 'watchers':
+            return WatchConfig.find(Q('node', 'eq', self._id)).count()
+        if relation == 'pointers':
+            # Same as `get_points(deleted=False, folders=False)`, but skips
+            # pointers not yet added to a parent, e.g. while forking
+            return len([
+                parent
+                for pointer in self.pointed
+                for parent in pointer.node__parent
+                if not parent.is_folder and not parent.is_deleted
+            ])
+        if relation == 'children':
+            return len(self.nodes_active)
+        raise ValueError('Unknown relation {0!r}'.format(relation))
+
+    def update_relation_counts(self, *relations):
+        """Recount `relations` of this node, or all of them if none are given,
+        and store the counts without otherwise saving the node.
+        """
+        counts = dict(
+            (relation, self._count_relation(relation))
+            for relation in relations or self.RELATION_COUNTS
+        )
+        self.relation_counts.update(counts)
+        if self._is_loaded:
+            self._storage[0].store.update(
+                {'_id': self._id},
+                {'$set': dict(
+                    ('relation_counts.{0}'.format(relation), count)
+                    for relation, count in counts.iteritems()
+                )},
+            )
+        return counts
+
+    def get_relation_count(self, relation):
+        """Number of related nodes of kind `relation`; see `RELATION_COUNTS`."""
+        if relation not in self.relation_counts:
+            self.update_relation_counts(relation)
+        return self.relation_counts[relation]
+
+    def _update_related_counts(self, saved_fields, first_save=False, stored_nodes=None):
+        """Recount relations of the nodes whose counts include this one after
+        the fields in `saved_fields` changed.
+
+        :param list stored_nodes: `nodes` in storage format as of before the
+            save, to find the pointers added or removed by it
+        """
+        def changed(*fields):
+            return any(field in saved_fields for field in fields)
+
+        created_or_deleted = first_save or changed('is_deleted')
+        if (created_or_deleted or changed('forked_from', 'is_registration')) and self.forked_from:
+            self.forked_from.update_relation_counts('forks')
+        if (first_save or changed('registered_from')) and self.registered_from:
+            self.registered_from.update_relation_counts('registrations')
+        if (created_or_deleted or changed('template_node')) and self.template_node:
+            self.template_node.update_relation_counts('templates')
+        if changed('nodes'):
+            self.update_relation_counts('children')
+        # Pointers from folders are not counted
+        if changed('nodes', 'is_deleted') and not self.is_folder:
+            if changed('is_deleted'):
+                pointers = self.nodes_pointer
+            else:
+                # Pointers removed by `rm_pointer` no longer exist; it
+                # recounts their nodes itself
+                pointers = [
+                    pointer
+                    for pointer in bulk_load(Pointer, self._changed_pointer_ids(stored_nodes))
+                    if pointer.node is not None
+                ]
+            targets = dict((pointer.node._id, pointer.node) for pointer in pointers)
+            for target in targets.values():
+                target.update_relation_counts('pointers')
+        if changed('is_deleted'):
+            # Parents count both child nodes and pointers to undeleted nodes
+            parents = list(self.node__parent) + [
+                parent
+                for pointer in self.pointed
+                for parent in pointer.node__parent
+            ]
+            for parent in parents:
+                parent.update_relation_counts('children')
+
+    def _changed_pointer_ids(self, stored_nodes):
+        """IDs of the pointers in `nodes` as saved that are not in
+        `stored_nodes`, or the other way around.
+        """
+        saved = (self._get_cached_data(self._primary_key) or {}).get('nodes') or []
+        changed = set(tuple(each) for each in saved) ^ set(tuple(each) for each in stored_nodes or [])
+        return [key for key, name in changed if name == Pointer._name]
+
     def add_permission(self, user, permission, save=False):
         """Grant permission to a user.
 
@@ -875,6 +1135,7 @@ class Node(GuidStoredObject, AddonModelMixin, IdentifierMixin):
             if permission in self.permissions[user._id]:
                 raise ValueError('User already has permission {0}'.format(permission))
             self.permissions[user._id].append(permission)
+        invalidate_resolved_permissions()
         if save:
             self.save()
 
@@ -890,6 +1151,7 @@ class Node(GuidStoredObject, AddonModelMixin, IdentifierMixin):
             self.permissions[user._id].remove(permission)
         except (KeyError, ValueError):
             raise ValueError('User does not have permission {0}'.format(permission))
+        invalidate_resolved_permissions()
         if save:
             self.save()
 
@@ -908,11 +1170,13 @@ class Node(GuidStoredObject, AddonModelMixin, IdentifierMixin):
                     user._id, self._id,
                 )
             )
+        invalidate_resolved_permissions()
         if save:
             self.save()
 
     def set_permissions(self, user, permissions, save=False):
         self.permissions[user._id] = permissions
+        invalidate_resolved_permissions()
         if save:
             self.save()
 
@@ -936,6 +1200,15 @@ class Node(GuidStoredObject, AddonModelMixin, IdentifierMixin):
         """Checks if the given user has a given permission on any child nodes
             that are not registrations or deleted
         """
+        if self.has_permission(user, permission):
+            return True
+        if not self.primary_child_ids:
+            return False
+        # Load the whole subtree at once rather than one child at a time
+        self._load_subtree()
+        return self._has_permission_on_children(user, permission)
+
+    def _has_permission_on_children(self, user, permission):
         if self.has_permission(user, permission):
             return True
 
@@ -943,7 +1216,7 @@ class Node(GuidStoredObject, AddonModelMixin, IdentifierMixin):
             if not node.primary or node.is_deleted:
                 continue
 
-            if node.has_permission_on_children(user, permission):
+            if node._has_permission_on_children(user, permission):
                 return True
 
         return False
@@ -987,9 +1260,20 @@ class Node(GuidStoredObject, AddonModelMixin, IdentifierMixin):
 
     @property
     def parents(self):
-        if self.parent_node:
-            return [self.parent_node] + self.parent_node.parents
-        return []
+        if not self.ancestor_ids:
+            return []
+        loaded = dict(
+            (each._id, each)
+            for each in bulk_load(Node, self.ancestor_ids)
+        )
+        parents = []
+        # Mirror `parent_node`: stop climbing at the first deleted ancestor
+        for ancestor_id in self.ancestor_ids:
+            ancestor = loaded.get(ancestor_id)
+            if ancestor is None or ancestor.is_deleted:
+                break
+            parents.append(ancestor)
+        return parents
 
     @property
     def admin_contributor_ids(self, contributors=None):
@@ -1134,8 +1418,41 @@ class Node(GuidStoredObject, AddonModelMixin, IdentifierMixin):
         else:
             suppress_log = False
 
+        if first_save:
+            parent = getattr(self, 'parent', None)
+            # Clones carry over the ancestors of their source; reset them and
+            # let the new parent fill them in when it saves
+            self.ancestor_ids = [parent._id] + list(parent.ancestor_ids) if parent else []
+            if self.date_modified is None:
+                self.date_modified = datetime.datetime.utcnow()
+            # Clones carry over the counts of their source as well
+            self.relation_counts = {}
+
+        stored = self._get_cached_data(self._stored_key) if not first_save else None
+        stored_nodes = (stored or {}).get('nodes')
+
         saved_fields = super(Node, self).save(*args, **kwargs)
 
+        if any(field in saved_fields for field in ('permissions', 'ancestor_ids', 'is_deleted')):
+            invalidate_resolved_permissions()
+
+        self._update_related_counts(saved_fields, first_save=first_save, stored_nodes=stored_nodes)
+
+        if 'logs' in saved_fields:
+            # Logs changed other than through `add_log`, e.g. when forking
+            self._sync_date_modified()
+
+        if 'nodes' in saved_fields or 'ancestor_ids' in saved_fields:
+            self._update_child_ancestors()
+
+        if saved_fields:
+            # Drop cached organizer entries for this node and its parent, whose
+            # children count may have changed
+            organizer_cache.invalidate_nodes(
+                [self._id] + self.ancestor_ids[:1],
+                contributor_ids=self.contributors._to_primary_keys(),
+            )
+
         if first_save and is_original and not suppress_log:
             # TODO: This logic also exists in self.use_as_template()
             for addon in settings.ADDONS_AVAILABLE:
@@ -1181,6 +1498,51 @@ class Node(GuidStoredObject, AddonModelMixin, IdentifierMixin):
         # Return expected value for StoredObject::save
         return saved_fields
 
+    def _sync_date_modified(self):
+        last_log = self.logs[-1] if self.logs else None
+        date_modified = last_log.date if last_log else self.date_created
+        if date_modified != self.date_modified:
+            self.date_modified = date_modified
+            self.save()
+
+    @property
+    def primary_child_ids(self):
+        """Primary keys of primary (non-pointer) children, read from storage
+        data without loading the children.
+        """
+        return [
+            key for key, schema_name in self.to_storage().get('nodes', [])
+            if schema_name == self._name
+        ]
+
+    def _update_child_ancestors(self):
+        """Propagate this node's ancestors to any primary children whose
+        `ancestor_ids` are out of date. Children save in turn, so moved
+        subtrees are updated all the way down.
+        """
+        child_ids = self.primary_child_ids
+        if not child_ids:
+            return
+        expected = [self._id] + list(self.ancestor_ids)
+        stale = bulk_find(Node, {
+            '_id': {'$in': child_ids},
+            'ancestor_ids': {'$ne': expected},
+        })
+        for child in stale:
+            child.ancestor_ids = expected
+            child.save()
+
+    def _load_subtree(self):
+        """Load all primary descendants with one query on `ancestor_ids`,
+        then their pointers, into the object cache, so that recursive walks
+        over `nodes` do not query once per node.
+
+        :return: List of primary descendants, in no particular order
+        """
+        descendants = bulk_find(Node, {'ancestor_ids': self._id})
+        prefetch([self] + descendants, 'nodes.node')
+        return descendants
+
     ######################################
     # Methods that return a new instance #
     ######################################
@@ -1349,6 +1711,8 @@ class Node(GuidStoredObject, AddonModelMixin, IdentifierMixin):
         # Remove `Pointer` object; will also remove self from `nodes` list of
         # parent node
         Pointer.remove_one(pointer)
+        pointer.node.update_relation_counts('pointers')
+        self.update_relation_counts('children')
 
         # Add log
         self.add_log(
@@ -1399,22 +1763,33 @@ class Node(GuidStoredObject, AddonModelMixin, IdentifierMixin):
 
         returns a list of [(node, [children]), ...]
         """
+        self._load_subtree()
+        return self._next_descendants(auth, condition)
+
+    def _next_descendants(self, auth, condition):
         ret = []
         for node in self.nodes:
             if condition(auth, node):
                 # base case
                 ret.append((node, []))
+            elif node.primary:
+                ret.append((node, node._next_descendants(auth, condition)))
             else:
+                # Pointed-to subtrees are not covered by our subtree query
                 ret.append((node, node.next_descendants(auth, condition)))
         ret = [item for item in ret if item[1] or condition(auth, item[0])]  # prune empty branches
         return ret
 
     def get_descendants_recursive(self, include=lambda n: True):
+        self._load_subtree()
+        return self._get_descendants_recursive(include)
+
+    def _get_descendants_recursive(self, include):
         for node in self.nodes:
             if include(node):
                 yield node
             if node.primary:
-                for descendant in node.get_descendants_recursive(include):
+                for descendant in node._get_descendants_recursive(include):
                     if include(descendant):
                         yield descendant
 
@@ -1425,6 +1800,19 @@ class Node(GuidStoredObject, AddonModelMixin, IdentifierMixin):
         query = Q('__backrefs.logged.node.logs', 'in', ids)
         return NodeLog.find(query).sort('-_id')
 
+    def get_aggregate_log_ids(self, auth, size, cursor=None):
+        """Return one page of the logs of this node and its viewable
+        descendants, newest first.
+
+        :param int size: Page size
+        :param str cursor: Cursor returned with the previous page, if any
+        :return: Tuple of log IDs and the cursor of the next page, or `None`
+        """
+        ids = [self._id] + [n._id
+                            for n in self.get_descendants_recursive()
+                            if n.can_view(auth)]
+        return timeline.get_log_ids(ids, size, cursor=cursor)
+
     @property
     def nodes_pointer(self):
         return [
@@ -1438,12 +1826,10 @@ class Node(GuidStoredObject, AddonModelMixin, IdentifierMixin):
         """Recursively checks whether the current node or any of its nodes
         contains a pointer.
         """
-        if self.nodes_pointer:
-            return True
-        for node in self.nodes_primary:
-            if node.has_pointers_recursive:
-                return True
-        return False
+        return any(
+            node.nodes_pointer
+            for node in [self] + self._load_subtree()
+        )
 
     @property
     def pointed(self):
@@ -1529,6 +1915,7 @@ class Node(GuidStoredObject, AddonModelMixin, IdentifierMixin):
             # removing pointer, else remove will fail when trying to remove
             # backref from self to pointer.
             Pointer.remove_one(pointer)
+            pointer.node.update_relation_counts('pointers')
 
         # Return forked content
         return forked
@@ -1539,17 +1926,8 @@ class Node(GuidStoredObject, AddonModelMixin, IdentifierMixin):
 
         :param int n: Number of logs to retrieve
         """
-        return list(reversed(self.logs)[:n])
-
-    @property
-    def date_modified(self):
-        '''The most recent datetime when this node was modified, based on
-        the logs.
-        '''
-        try:
-            return self.logs[-1].date
-        except IndexError:
-            return self.date_created
+        log_ids, _ = timeline.get_log_ids([self._id], n)
+        return timeline.load_logs(log_ids)
 
     def set_title(self, title, auth, save=False):
         """Set the title of this Node and log it.
@@ -1604,7 +1982,7 @@ class Node(GuidStoredObject, AddonModelMixin, IdentifierMixin):
     def update_search(self):
         from website import search
         try:
-            search.search.update_node(self)
+            search.search.update_node_async(self)
         except search.exceptions.SearchUnavailableError as e:
             logger.exception(e)
             log_exception()
@@ -1619,10 +1997,13 @@ class Node(GuidStoredObject, AddonModelMixin, IdentifierMixin):
 
     def delete_registration_tree(self, save=False):
         self.is_deleted = True
+        registered_from = self.registered_from
         if not getattr(self.embargo, 'for_existing_registration', False):
             self.registered_from = None
         if save:
             self.save()
+            if registered_from:
+                registered_from.update_relation_counts('registrations')
         self.update_search()
         for child in self.nodes_primary:
             child.delete_registration_tree(save=save)
@@ -1902,6 +2283,7 @@ class Node(GuidStoredObject, AddonModelMixin, IdentifierMixin):
             log.date = log_date
         log.save()
         self.logs.append(log)
+        self.date_modified = log.date
         if save:
             self.save()
         if user:
@@ -1961,6 +2343,12 @@ class Node(GuidStoredObject, AddonModelMixin, IdentifierMixin):
         For details on this schema, see:
             https://github.com/citation-style-language/schema#csl-json-schema
         """
+        return self._make_csl(
+            doi=self.get_identifier_value('doi'),
+            issued=self.logs[-1].date if self.logs else None,
+        )
+
+    def _make_csl(self, doi=None, issued=None):
         csl = {
             'id': self._id,
             'title': sanitize.unescape_entities(self.title),
@@ -1973,12 +2361,11 @@ class Node(GuidStoredObject, AddonModelMixin, IdentifierMixin):
             'URL': self.display_absolute_url,
         }
 
-        doi = self.get_identifier_value('doi')
         if doi:
             csl['DOI'] = doi
 
-        if self.logs:
-            csl['issued'] = datetime_to_csl(self.logs[-1].date)
+        if issued:
+            csl['issued'] = datetime_to_csl(issued)
 
         return csl
 
@@ -2029,10 +2416,8 @@ class Node(GuidStoredObject, AddonModelMixin, IdentifierMixin):
 
     @property
     def root(self):
-        if self.parent_node:
-            return self.parent_node.root
-        else:
-            return self
+        parents = self.parents
+        return parents[-1] if parents else self
 
     @property
     def archiving(self):
@@ -2195,6 +2580,7 @@ class Node(GuidStoredObject, AddonModelMixin, IdentifierMixin):
 
         # Clear permissions for removed user
         self.permissions.pop(contributor._id, None)
+        invalidate_resolved_permissions()
 
         # After remove callback
         for addon in self.get_addons():
@@ -3290,6 +3676,7 @@ class Embargo(EmailApprovableSanction):
             },
             auth=Auth(user),
         )
+        registered_from = parent_registration.registered_from
         # Remove backref to parent project if embargo was for a new registration
         if not self.for_existing_registration:
             parent_registration.registered_from = None
@@ -3297,6 +3684,7 @@ class Embargo(EmailApprovableSanction):
         if not self.for_existing_registration:
             parent_registration.is_deleted = True
             parent_registration.save()
+            registered_from.update_relation_counts('registrations')
 
     def disapprove_embargo(self, user, token):
         """Cancels retraction if user is admin and token verifies."""
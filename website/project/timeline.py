@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""Reverse-chronological log timelines for nodes.
+
+Each log document stores the IDs of the nodes that list it in the backref
+field `TIMELINE_KEY`; `NodeLog` indexes that field together with the log
+date, so the newest logs of a node can be read from the index without loading
+the node's full log list. Timelines of several nodes are combined with a
+k-way merge, and pages are addressed by opaque cursors rather than offsets.
+"""
+
+import heapq
+import datetime
+
+import pymongo
+
+from framework.mongo.utils import bulk_load
+
+
+TIMELINE_KEY = '__backrefs.logged.node.logs'
+
+CURSOR_DATE_FORMAT = '%Y%m%d%H%M%S%f'
+
+
+def _collection():
+    from website.project.model import NodeLog
+    return NodeLog._storage[0].store
+
+
+def encode_cursor(date, log_id):
+    """Build a cursor pointing just past the log with the given date and ID."""
+    return '{0}-{1}'.format(date.strftime(CURSOR_DATE_FORMAT), log_id)
+
+
+def decode_cursor(cursor):
+    """Parse a cursor built by `encode_cursor`.
+
+    :raises: ValueError if the cursor is malformed
+    """
+    date, _, log_id = cursor.partition('-')
+    if not log_id:
+        raise ValueError('Invalid cursor: {0!r}'.format(cursor))
+    return datetime.datetime.strptime(date, CURSOR_DATE_FORMAT), log_id
+
+
+def _query(node_id, cursor=None, since=None, actions=None):
+    query = {TIMELINE_KEY: node_id}
+    if cursor:
+        date, log_id = decode_cursor(cursor)
+        query['$or'] = [
+            {'date': {'$lt': date}},
+            {'date': date, '_id': {'$lt': log_id}},
+        ]
+    if since:
+        query['date'] = {'$gte': since}
+    if actions:
+        query['action'] = {'$in': list(actions)}
+    return query
+
+
+def iter_node_timeline(node_id, cursor=None, since=None, actions=None, batch_size=100):
+    """Yield `(date, log_id)` pairs for the logs of a node, newest first.
+
+    :param str cursor: Only yield logs older than this cursor
+    :param datetime since: Only yield logs from this date on
+    :param actions: Only yield logs with one of these actions
+    :param int batch_size: Number of entries to fetch per round trip
+    """
+    entries = _collection().find(
+        _query(node_id, cursor=cursor, since=since, actions=actions),
+        {'date': True},
+    ).sort([
+        ('date', pymongo.DESCENDING),
+        ('_id', pymongo.DESCENDING),
+    ]).batch_size(batch_size)
+    for entry in entries:
+        yield entry['date'], entry['_id']
+
+
+def merge_timelines(timelines):
+    """Merge timelines, each sorted newest first, into a single timeline
+    sorted newest first. Logs shared by several timelines (e.g. a project and
+    its forks) are yielded once.
+    """
+    heap = []
+    for index, timeline in enumerate(timelines):
+        timeline = iter(timeline)
+        for date, log_id in timeline:
+            heap.append((_Newest(date, log_id), index, timeline))
+            break
+    heapq.heapify(heap)
+    seen = set()
+    while heap:
+        key, index, timeline = heap[0]
+        if key.log_id not in seen:
+            seen.add(key.log_id)
+            yield key.date, key.log_id
+        for date, log_id in timeline:
+            heapq.heapreplace(heap, (_Newest(date, log_id), index, timeline))
+            break
+        else:
+            heapq.heappop(heap)
+
+
+class _Newest(object):
+    """Heap key ordering timeline entries newest first."""
+    __slots__ = ('date', 'log_id')
+
+    def __init__(self, date, log_id):
+        self.date = date
+        self.log_id = log_id
+
+    def __lt__(self, other):
+        return (self.date, self.log_id) > (other.date, other.log_id)
+
+    def __eq__(self, other):
+        return (self.date, self.log_id) == (other.date, other.log_id)
+
+
+def iter_timeline(node_ids, cursor=None, since=None, actions=None, batch_size=100):
+    """Yield `(date, log_id)` pairs for the logs of all given nodes, newest
+    first; see `iter_node_timeline`.
+    """
+    return merge_timelines(
+        iter_node_timeline(node_id, cursor=cursor, since=since, actions=actions, batch_size=batch_size)
+        for node_id in node_ids
+    )
+
+
+def get_log_ids(node_ids, size, cursor=None, since=None, actions=None):
+    """Return one page of the merged timeline of the given nodes.
+
+    :return: Tuple of log IDs, newest first, and the cursor of the next page,
+        or `None` if this is the last page
+    """
+    entries = []
+    # Fetch one extra entry per node to tell whether another page follows
+    for entry in iter_timeline(node_ids, cursor=cursor, since=since, actions=actions, batch_size=size + 1):
+        entries.append(entry)
+        if len(entries) > size:
+            break
+    next_cursor = None
+    if len(entries) > size:
+        entries = entries[:size]
+        next_cursor = encode_cursor(*entries[-1])
+    return [log_id for _, log_id in entries], next_cursor
+
+
+def load_logs(log_ids):
+    """Load logs by ID with one query, preserving the order of `log_ids`."""
+    from website.project.model import NodeLog
+    logs = dict(
+        (log._id, log)
+        for log in bulk_load(NodeLog, log_ids)
+    )
+    return [logs[log_id] for log_id in log_ids if log_id in logs]
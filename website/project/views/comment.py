@@ -166,7 +166,7 @@ def add_comment(auth, node, **kwargs):
     )
 
     if is_reply(target):
-        if target.user and target.user not in sent_subscribers:
+        if target.user and target.user._id not in sent_subscribers:
             notify(
                 uid=target.user._id,
                 event='comment_replies',
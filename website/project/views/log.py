@@ -11,6 +11,7 @@ from framework.transactions.handlers import no_auto_transaction
 
 
 from website.views import serialize_log, validate_page_num
+from website.project import timeline
 from website.project.model import NodeLog
 from website.project.model import has_anonymous_link
 from website.project.decorators import must_be_valid_project
@@ -55,6 +56,28 @@ def _get_logs(node, count, auth, page=0):
 
     return logs, total, pages
 
+
+def _get_logs_from_cursor(node, count, auth, cursor):
+    """Cursor-paginated variant of `_get_logs`, which avoids counting and
+    skipping over the aggregate logs.
+
+    :return list: List of serialized logs,
+            str: Cursor of the next page, or `None` if there are no more logs
+    """
+    try:
+        log_ids, next_cursor = node.get_aggregate_log_ids(auth, count, cursor=cursor)
+    except ValueError:
+        raise HTTPError(http.BAD_REQUEST, data=dict(
+            message_long='Invalid value for "cursor".'
+        ))
+    anonymous = has_anonymous_link(node, auth)
+    logs = [
+        serialize_log(log, auth=auth, anonymous=anonymous)
+        for log in timeline.load_logs(log_ids)
+    ]
+    return logs, next_cursor
+
+
 @no_auto_transaction
 @collect_auth
 @must_be_valid_project(retractions_valid=True)
@@ -81,6 +104,12 @@ def get_logs(auth, node, **kwargs):
     else:
         count = 10
 
+    # Pass `cursor` (empty for the first page) to paginate by cursor instead
+    cursor = request.args.get('cursor')
+    if cursor is not None:
+        logs, next_cursor = _get_logs_from_cursor(node, count, auth, cursor or None)
+        return {'logs': logs, 'cursor': next_cursor}
+
     # Serialize up to `count` logs in reverse chronological order; skip
     # logs that the current user / API key cannot access
     logs, total, pages = _get_logs(node, count, auth, page)
@@ -14,7 +14,7 @@ from framework.mongo import StoredObject
 from framework.flask import redirect
 from framework.auth.decorators import must_be_logged_in, collect_auth
 from framework.exceptions import HTTPError, PermissionsError
-from framework.mongo.utils import from_mongo, get_or_http_error
+from framework.mongo.utils import from_mongo, get_or_http_error, prefetch
 
 from website import language
 
@@ -22,6 +22,7 @@ from website.util import paths
 from website.util import rubeus
 from website.exceptions import NodeStateError
 from website.project import clean_template_name, new_node, new_private_link
+from website.project import timeline
 from website.project.decorators import (
     must_be_contributor_or_public,
     must_be_contributor,
@@ -513,7 +514,7 @@ def watch_post(auth, node, **kwargs):
 
     return {
         'status': 'success',
-        'watchCount': len(node.watchconfig__watched)
+        'watchCount': node.get_relation_count('watchers')
     }
 
 
@@ -532,7 +533,7 @@ def unwatch_post(auth, node, **kwargs):
 
     return {
         'status': 'success',
-        'watchCount': len(node.watchconfig__watched)
+        'watchCount': node.get_relation_count('watchers')
     }
 
 
@@ -560,7 +561,7 @@ def togglewatch_post(auth, node, **kwargs):
 
     return {
         'status': 'success',
-        'watchCount': len(node.watchconfig__watched),
+        'watchCount': node.get_relation_count('watchers'),
         'watched': user.is_watching(node)
     }
 
@@ -692,6 +693,9 @@ def _view_project(node, auth, primary=False):
     """
     user = auth.user
 
+    # Tags, contributors and children are all rendered below; load each
+    # collection with a single query
+    prefetch([node], 'tags', 'contributors', 'nodes')
     parent = node.parent_node
     if user:
         dashboard = find_dashboard(user)
@@ -729,9 +733,9 @@ def _view_project(node, auth, primary=False):
             'is_public': node.is_public,
             'is_archiving': node.archiving,
             'date_created': iso8601format(node.date_created),
-            'date_modified': iso8601format(node.logs[-1].date) if node.logs else '',
+            'date_modified': iso8601format(node.date_modified) if node.logs else '',
             'tags': [tag._primary_key for tag in node.tags],
-            'children': bool(node.nodes_active),
+            'children': bool(node.get_relation_count('children')),
             'is_registration': node.is_registration,
             'is_pending_registration': node.is_pending_registration,
             'is_retracted': node.is_retracted,
@@ -749,18 +753,18 @@ def _view_project(node, auth, primary=False):
                 }
                 for meta in node.registered_meta or []
             ],
-            'registration_count': len(node.node__registrations),
+            'registration_count': node.get_relation_count('registrations'),
             'is_fork': node.is_fork,
             'forked_from_id': node.forked_from._primary_key if node.is_fork else '',
             'forked_from_display_absolute_url': node.forked_from.display_absolute_url if node.is_fork else '',
             'forked_date': iso8601format(node.forked_date) if node.is_fork else '',
-            'fork_count': len(node.forks),
-            'templated_count': len(node.templated_list),
-            'watched_count': len(node.watchconfig__watched),
+            'fork_count': node.get_relation_count('forks'),
+            'templated_count': node.get_relation_count('templates'),
+            'watched_count': node.get_relation_count('watchers'),
             'private_links': [x.to_json() for x in node.private_links_active],
             'link': view_only_link,
             'anonymous': anonymous,
-            'points': len(node.get_points(deleted=False, folders=False)),
+            'points': node.get_relation_count('pointers'),
             'piwik_site_id': node.piwik_site_id,
             'comment_level': node.comment_level,
             'has_comments': bool(getattr(node, 'commented', [])),
@@ -899,7 +903,7 @@ def _get_user_activity(node, auth, rescale_ratio):
 
 @must_be_valid_project
 def get_recent_logs(node, **kwargs):
-    logs = list(reversed(node.logs._to_primary_keys()))[:3]
+    logs, _ = timeline.get_log_ids([node._id], 3)
     return {'logs': logs}
 
 
@@ -986,6 +990,7 @@ def get_summary(auth, node, **kwargs):
 @must_be_contributor_or_public
 def get_children(auth, node, **kwargs):
     user = auth.user
+    prefetch([node], 'nodes.contributors')
     if request.args.get('permissions'):
         perm = request.args['permissions'].lower().strip()
         nodes = [
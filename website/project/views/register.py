@@ -3,6 +3,7 @@ import json
 import httplib as http
 from dateutil.parser import parse as parse_date
 import itertools
+import logging
 
 from flask import request
 from modularodm import Q
@@ -36,12 +37,15 @@ from website.project import signals as project_signals
 from website import util
 
 from website.archiver.decorators import fail_archive_on_error
+from website.archiver import signals as archiver_signals
 
 from website.identifiers.client import EzidClient
 
 from .node import _view_project
 from .. import clean_template_name
 
+logger = logging.getLogger(__name__)
+
 
 @must_be_valid_project
 @must_have_permission(ADMIN)
@@ -386,19 +390,40 @@ def get_referent_by_identifier(category, value):
 @must_be_signed
 @must_be_registration
 def registration_callbacks(node, payload, *args, **kwargs):
+    if payload.get('action', 'copy') != 'copy':
+        # e.g. folders created for batched archive copies
+        return {}
     errors = payload.get('errors')
     src_provider = payload['source']['provider']
-    if errors:
+    # Dataverse requires two seperate targets, one
+    # for draft files and one for published files
+    if src_provider == 'dataverse' and not errors:
+        src_provider += '-' + (payload['destination']['name'].split(' ')[-1].lstrip('(').rstrip(')').strip())
+    target = node.archive_job.get_target(src_provider)
+    batch = target.find_batch(payload['source'].get('path')) if target else None
+    if batch:
+        archiver_signals.archive_batch_callback.send(
+            node,
+            addon_short_name=src_provider,
+            batch_id=batch['id'],
+            errors=errors,
+        )
+    elif target and target.batches:
+        # Batched targets only finish through their batches; a copy that
+        # matches none of them says nothing about the rest of the target
+        logger.warning(
+            'Ignoring archive callback for {0} on {1}: no batch for path {2!r}'.format(
+                src_provider, node._id, payload['source'].get('path'),
+            )
+        )
+        return {}
+    elif errors:
         node.archive_job.update_target(
             src_provider,
             ARCHIVER_FAILURE,
             errors=errors,
         )
     else:
-        # Dataverse requires two seperate targets, one
-        # for draft files and one for published files
-        if src_provider == 'dataverse':
-            src_provider += '-' + (payload['destination']['name'].split(' ')[-1].lstrip('(').rstrip(')').strip())
         node.archive_job.update_target(
             src_provider,
             ARCHIVER_SUCCESS,
@@ -234,6 +234,12 @@ def make_url_map(app):
             citation_views.list_citation_styles,
             json_renderer,
         ),
+        Rule(
+            '/citations/render/',
+            'get',
+            citation_views.render_node_citations,
+            json_renderer,
+        ),
     ], prefix='/api/v1')
 
     process_rules(app, [
@@ -3,7 +3,6 @@
 from __future__ import division
 
 import re
-import copy
 import math
 import logging
 import unicodedata
@@ -19,6 +18,7 @@ from elasticsearch import (
 )
 
 from framework import sentry
+from framework.mongo.utils import bulk_load
 
 from website import settings
 from website.filters import gravatar
@@ -85,42 +85,26 @@ def requires_search(func):
     return wrapped
 
 
-@requires_search
-def get_counts(count_query, clean=True):
-    count_query['aggregations'] = {
-        'counts': {
-            'terms': {
-                'field': '_type',
-            }
-        }
-    }
-
-    res = es.search(index=INDEX, doc_type=None, search_type='count', body=count_query)
-
-    counts = {x['key']: x['doc_count'] for x in res['aggregations']['counts']['buckets'] if x['key'] in ALIASES.keys()}
-
-    counts['total'] = sum([val for val in counts.values()])
-    return counts
-
-
-@requires_search
-def get_tags(query, index):
-    query['aggregations'] = {
-        'tag_cloud': {
-            'terms': {'field': 'tags'}
-        }
-    }
-
-    results = es.search(index=index, doc_type=None, body=query)
-    tags = results['aggregations']['tag_cloud']['buckets']
-
-    return tags
+def type_filter(doc_type):
+    """Build a filter restricting hits to ``doc_type``, which may be a single
+    type or a comma-separated list. Returns ``None`` for all types.
+    """
+    if not doc_type or doc_type == '_all':
+        return None
+    types = [each.strip() for each in doc_type.split(',') if each.strip()]
+    if len(types) == 1:
+        return {'type': {'value': types[0]}}
+    return {'or': [{'type': {'value': each}} for each in types]}
 
 
 @requires_search
 def search(query, index=None, doc_type='_all'):
     """Search for a query
 
+    Type counts and the tag cloud are computed with aggregations over all
+    document types in the same request as the hits; the ``doc_type``
+    restriction is applied to the hits only, as a post filter.
+
     :param query: The substring of the username/project name/tag to search for
     :param index:
     :param doc_type:
@@ -132,27 +116,36 @@ def search(query, index=None, doc_type='_all'):
         typeAliases: the doc_types that exist in the search database
     """
     index = index or INDEX
-    tag_query = copy.deepcopy(query)
-    count_query = copy.deepcopy(query)
-
-    for key in ['from', 'size', 'sort']:
-        try:
-            del tag_query[key]
-            del count_query[key]
-        except KeyError:
-            pass
-
-    tags = get_tags(tag_query, index)
-    counts = get_counts(count_query, index)
-
-    # Run the real query and get the results
-    raw_results = es.search(index=index, doc_type=doc_type, body=query)
+    body = dict(query)
+    body['aggregations'] = {
+        'counts': {
+            'terms': {'field': '_type'},
+        },
+        'tag_cloud': {
+            'terms': {'field': 'tags'},
+        },
+    }
+    hit_filter = type_filter(doc_type)
+    if hit_filter is not None:
+        if body.get('post_filter'):
+            hit_filter = {'and': [body['post_filter'], hit_filter]}
+        body['post_filter'] = hit_filter
+
+    raw_results = es.search(index=index, doc_type=None, body=body)
+    aggregations = raw_results['aggregations']
+
+    counts = {
+        x['key']: x['doc_count']
+        for x in aggregations['counts']['buckets']
+        if x['key'] in ALIASES.keys()
+    }
+    counts['total'] = sum([val for val in counts.values()])
 
     results = [hit['_source'] for hit in raw_results['hits']['hits']]
     return_value = {
         'results': format_results(results),
         'counts': counts,
-        'tags': tags,
+        'tags': aggregations['tag_cloud']['buckets'],
         'typeAliases': ALIASES
     }
     return return_value
@@ -170,7 +163,11 @@ def format_results(results):
 
 
 def format_result(result, parent_id=None):
-    parent_info = load_parent(parent_id)
+    if 'parent_info' in result:
+        parent_info = result['parent_info']
+    else:
+        # Documents indexed before parent info was denormalized
+        parent_info = load_parent(parent_id)
     formatted_result = {
         'contributors': result['contributors'],
         'wiki_link': result['url'] + 'wiki/',
@@ -198,7 +195,10 @@ def format_result(result, parent_id=None):
 
 
 def load_parent(parent_id):
-    parent = Node.load(parent_id)
+    return serialize_parent(Node.load(parent_id))
+
+
+def serialize_parent(parent):
     if parent is None:
         return None
     parent_info = {}
@@ -227,70 +227,114 @@ def get_doctype_from_node(node):
         return node.category
 
 
-@requires_search
-def update_node(node, index=None):
-    index = index or INDEX
+def serialize_node(node, category):
     from website.addons.wiki.model import NodeWikiPage
 
-    category = get_doctype_from_node(node)
+    try:
+        normalized_title = six.u(node.title)
+    except TypeError:
+        normalized_title = node.title
+    normalized_title = unicodedata.normalize('NFKD', normalized_title).encode('ascii', 'ignore')
+
+    elastic_document = {
+        'id': node._id,
+        'contributors': [
+            {
+                'fullname': x.fullname,
+                'url': x.profile_url if x.is_active else None
+            }
+            for x in node.visible_contributors
+            if x is not None
+        ],
+        'title': node.title,
+        'normalized_title': normalized_title,
+        'category': category,
+        'public': node.is_public,
+        'tags': [tag._id for tag in node.tags if tag],
+        'description': node.description,
+        'url': node.url,
+        'is_registration': node.is_registration,
+        'is_pending_registration': node.is_pending_registration,
+        'is_retracted': node.is_retracted,
+        'is_pending_retraction': node.is_pending_retraction,
+        'embargo_end_date': node.embargo_end_date.strftime("%A, %b. %d, %Y") if node.embargo_end_date else False,
+        'is_pending_embargo': node.is_pending_embargo,
+        'registered_date': node.registered_date,
+        'wikis': {},
+        'parent_id': None if category == 'project' else node.parent_id,
+        # Denormalized so that formatting results needs no database reads
+        'parent_info': None if category == 'project' else serialize_parent(
+            node.node__parent[0] if node.node__parent else None
+        ),
+        'date_created': node.date_created,
+        'boost': int(not node.is_registration) + 1,  # This is for making registered projects less relevant
+    }
 
-    if category == 'project':
-        elastic_document_id = node._id
-        parent_id = None
-    else:
-        try:
-            elastic_document_id = node._id
-            parent_id = node.parent_id
-        except IndexError:
-            # Skip orphaned components
-            return
+    if not node.is_retracted:
+        # Load all current wiki pages with one query
+        for wiki in bulk_load(NodeWikiPage, node.wiki_pages_current.values()):
+            elastic_document['wikis'][wiki.page_name] = wiki.raw_text(node)
+
+    return elastic_document
+
+
+def node_action(node, index=None):
+    """Build the bulk action that brings the search document for ``node`` up
+    to date: an index action for public, live nodes, else a delete.
+    """
+    index = index or INDEX
+    category = get_doctype_from_node(node)
     if node.is_deleted or not node.is_public or node.archiving:
-        delete_doc(elastic_document_id, node)
-    else:
-        try:
-            normalized_title = six.u(node.title)
-        except TypeError:
-            normalized_title = node.title
-        normalized_title = unicodedata.normalize('NFKD', normalized_title).encode('ascii', 'ignore')
-
-        elastic_document = {
-            'id': elastic_document_id,
-            'contributors': [
-                {
-                    'fullname': x.fullname,
-                    'url': x.profile_url if x.is_active else None
-                }
-                for x in node.visible_contributors
-                if x is not None
-            ],
-            'title': node.title,
-            'normalized_title': normalized_title,
-            'category': category,
-            'public': node.is_public,
-            'tags': [tag._id for tag in node.tags if tag],
-            'description': node.description,
-            'url': node.url,
-            'is_registration': node.is_registration,
-            'is_pending_registration': node.is_pending_registration,
-            'is_retracted': node.is_retracted,
-            'is_pending_retraction': node.is_pending_retraction,
-            'embargo_end_date': node.embargo_end_date.strftime("%A, %b. %d, %Y") if node.embargo_end_date else False,
-            'is_pending_embargo': node.is_pending_embargo,
-            'registered_date': node.registered_date,
-            'wikis': {},
-            'parent_id': parent_id,
-            'date_created': node.date_created,
-            'boost': int(not node.is_registration) + 1,  # This is for making registered projects less relevant
+        return {
+            '_op_type': 'delete',
+            '_index': index,
+            '_type': 'registration' if node.is_registration else node.project_or_component,
+            '_id': node._id,
         }
+    return {
+        '_op_type': 'index',
+        '_index': index,
+        '_type': category,
+        '_id': node._id,
+        '_source': serialize_node(node, category),
+    }
+
+
+def _node_actions(nodes, index=None):
+    """Generate the bulk actions for ``nodes``. Nodes that cannot be
+    serialized are logged and skipped, so that they do not hold up the rest.
+    """
+    for node in nodes:
+        try:
+            yield node_action(node, index=index)
+        except Exception:
+            logger.exception('Could not serialize node {0} for search'.format(node._id))
+
+
+@requires_search
+def bulk_update_nodes(nodes, index=None):
+    """Index or delete the search documents for ``nodes`` with bulk requests.
+    The index is not refreshed unless ``ELASTIC_REFRESH_ON_WRITE`` is set.
+
+    :return: Number of successful actions
+    """
+    actions = _node_actions(nodes, index=index)
+    success, errors = helpers.bulk(
+        es, actions,
+        chunk_size=settings.ELASTIC_BULK_CHUNK_SIZE,
+        refresh=settings.ELASTIC_REFRESH_ON_WRITE,
+        raise_on_error=False,
+    )
+    for error in errors:
+        # Deleting documents that were never indexed is expected
+        if error.get('delete', {}).get('status') != 404:
+            logger.error('Bulk index action failed: {0}'.format(error))
+    return success
 
-        if not node.is_retracted:
-            for wiki in [
-                NodeWikiPage.load(x)
-                for x in node.wiki_pages_current.values()
-            ]:
-                elastic_document['wikis'][wiki.page_name] = wiki.raw_text(node)
 
-        es.index(index=index, doc_type=category, id=elastic_document_id, body=elastic_document, refresh=True)
+@requires_search
+def update_node(node, index=None):
+    bulk_update_nodes([node], index=index)
 
 
 def bulk_update_contributors(nodes, index=INDEX):
@@ -321,16 +365,7 @@ def bulk_update_contributors(nodes, index=INDEX):
     return helpers.bulk(es, actions)
 
 
-@requires_search
-def update_user(user, index=None):
-    index = index or INDEX
-    if not user.is_active:
-        try:
-            es.delete(index=index, doc_type='user', id=user._id, refresh=True, ignore=[404])
-        except NotFoundError:
-            pass
-        return
-
+def serialize_user(user):
     names = dict(
         fullname=user.fullname,
         given_name=user.given_name,
@@ -365,7 +400,49 @@ def update_user(user, index=None):
         'boost': 2,  # TODO(fabianvf): Probably should make this a constant or something
     }
 
-    es.index(index=index, doc_type='user', body=user_doc, id=user._id, refresh=True)
+    return user_doc
+
+
+@requires_search
+def update_user(user, index=None):
+    index = index or INDEX
+    if not user.is_active:
+        try:
+            es.delete(index=index, doc_type='user', id=user._id, refresh=settings.ELASTIC_REFRESH_ON_WRITE, ignore=[404])
+        except NotFoundError:
+            pass
+        return
+
+    es.index(index=index, doc_type='user', body=serialize_user(user), id=user._id, refresh=settings.ELASTIC_REFRESH_ON_WRITE)
+
+
+@requires_search
+def bulk_update_users(users, index=None):
+    """Index the search documents for active ``users`` with bulk requests.
+
+    :return: Number of successful actions
+    """
+    index = index or INDEX
+    actions = (
+        {
+            '_op_type': 'index',
+            '_index': index,
+            '_type': 'user',
+            '_id': user._id,
+            '_source': serialize_user(user),
+        }
+        for user in users
+        if user.is_active
+    )
+    success, errors = helpers.bulk(
+        es, actions,
+        chunk_size=settings.ELASTIC_BULK_CHUNK_SIZE,
+        refresh=settings.ELASTIC_REFRESH_ON_WRITE,
+        raise_on_error=False,
+    )
+    for error in errors:
+        logger.error('Bulk index action failed: {0}'.format(error))
+    return success
 
 
 @requires_search
@@ -423,7 +500,7 @@ def create_index(index=None):
 def delete_doc(elastic_document_id, node, index=None, category=None):
     index = index or INDEX
     category = category or 'registration' if node.is_registration else node.project_or_component
-    es.delete(index=index, doc_type=category, id=elastic_document_id, refresh=True, ignore=[404])
+    es.delete(index=index, doc_type=category, id=elastic_document_id, refresh=settings.ELASTIC_REFRESH_ON_WRITE, ignore=[404])
 
 
 @requires_search
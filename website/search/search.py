@@ -29,6 +29,17 @@ def update_node(node, index=None):
     index = index or settings.ELASTIC_INDEX
     search_engine.update_node(node, index=index)
 
+@requires_search
+def update_node_async(node):
+    from website.search import tasks
+    # Child documents embed their parent's title, url and privacy
+    tasks.enqueue_nodes([node._id] + node.primary_child_ids)
+
+@requires_search
+def bulk_update_nodes(nodes, index=None):
+    index = index or settings.ELASTIC_INDEX
+    return search_engine.bulk_update_nodes(nodes, index=index)
+
 @requires_search
 def delete_node(node, index=None):
     index = index or settings.ELASTIC_INDEX
@@ -47,6 +58,12 @@ def update_user(user, index=None):
     search_engine.update_user(user, index=index)
 
 
+@requires_search
+def bulk_update_users(users, index=None):
+    index = index or settings.ELASTIC_INDEX
+    return search_engine.bulk_update_users(users, index=index)
+
+
 @requires_search
 def delete_all():
     search_engine.delete_all()
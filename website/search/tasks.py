@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""Coalescing search indexer. Saving a node records its id in a queue
+collection, keyed by node id so that repeated saves collapse into a single
+entry; a Celery task drains the queue in batches and brings the search
+documents up to date with bulk requests.
+"""
+
+import datetime
+import logging
+
+from framework.mongo import database
+from framework.mongo.utils import bulk_load
+from framework.tasks import app
+from framework.tasks.handlers import enqueue_task
+from framework.transactions.context import TokuTransaction
+
+from website import settings
+
+
+logger = logging.getLogger(__name__)
+
+QUEUE_COLLECTION = 'searchqueue'
+
+
+def enqueue_nodes(node_ids):
+    """Mark nodes as needing reindexing and schedule a queue flush. Within a
+    request, the flush runs once after the response, no matter how many
+    nodes were saved.
+    """
+    queue = database[QUEUE_COLLECTION]
+    now = datetime.datetime.utcnow()
+    for node_id in node_ids:
+        queue.update({'_id': node_id}, {'$set': {'queued': now}}, upsert=True)
+    enqueue_task(flush_node_queue.si())
+
+
+def drain_batch(batch_size=None):
+    """Index one batch of queued nodes and remove them from the queue.
+    Entries re-queued while the batch was being indexed are kept. Nodes that
+    cannot be serialized are logged by the search backend and removed like
+    the rest, rather than retried forever at the head of the queue.
+
+    :return: Number of queue entries processed
+    """
+    from website.models import Node
+    from website.search import search
+
+    queue = database[QUEUE_COLLECTION]
+    entries = list(
+        queue.find().sort('queued', 1).limit(batch_size or settings.SEARCH_QUEUE_BATCH_SIZE)
+    )
+    if not entries:
+        return 0
+    with TokuTransaction():
+        nodes = bulk_load(Node, [entry['_id'] for entry in entries])
+        search.bulk_update_nodes(nodes)
+        queue.remove({
+            '$or': [
+                {'_id': entry['_id'], 'queued': entry['queued']}
+                for entry in entries
+            ]
+        })
+    return len(entries)
+
+
+@app.task(ignore_result=True)
+def flush_node_queue(batch_size=None):
+    """Drain the search queue. Concurrent flushes are harmless: indexing is
+    idempotent and each entry is only removed once.
+    """
+    total = 0
+    while True:
+        processed = drain_batch(batch_size)
+        if not processed:
+            break
+        total += processed
+    logger.info('Flushed {0} nodes from the search queue'.format(total))
+    return total
@@ -10,6 +10,7 @@ from modularodm.query.querydialect import DefaultQueryDialect as Q
 
 from website import settings
 from framework.auth import User
+from framework.mongo.utils import bulk_load
 from website.models import Node
 from website.app import init_app
 import website.search.search as search
@@ -19,13 +20,24 @@ from website.search.elastic_search import es
 
 logger = logging.getLogger(__name__)
 
+def iter_chunks(schema, query, size=None):
+    """Yield lists of records matching ``query``, loading ``size`` records per
+    query and clearing the object cache between chunks to bound memory use.
+    """
+    size = size or settings.ELASTIC_BULK_CHUNK_SIZE
+    keys = schema.find(query).get_keys()
+    for start in range(0, len(keys), size):
+        yield bulk_load(schema, keys[start:start + size])
+        schema._clear_caches()
+
+
 def migrate_nodes(index):
     logger.info("Migrating nodes to index: {}".format(index))
     n_iter = 0
-    nodes = Node.find(Q('is_public', 'eq', True) & Q('is_deleted', 'eq', False))
-    for node in nodes:
-        search.update_node(node, index=index)
-        n_iter += 1
+    query = Q('is_public', 'eq', True) & Q('is_deleted', 'eq', False)
+    for nodes in iter_chunks(Node, query):
+        search.bulk_update_nodes(nodes, index=index)
+        n_iter += len(nodes)
 
     logger.info('Nodes migrated: {}'.format(n_iter))
 
@@ -34,11 +46,9 @@ def migrate_users(index):
     logger.info("Migrating users to index: {}".format(index))
     n_migr = 0
     n_iter = 0
-    for user in User.find():
-        if user.is_active:
-            search.update_user(user, index=index)
-            n_migr += 1
-        n_iter += 1
+    for users in iter_chunks(User, Q('is_registered', 'eq', True)):
+        n_migr += search.bulk_update_users(users, index=index) or 0
+        n_iter += len(users)
 
     logger.info('Users iterated: {0}\nUsers migrated: {1}'.format(n_iter, n_migr))
 
@@ -29,6 +29,10 @@ BCRYPT_LOG_ROUNDS = 12
 # Hours before email confirmation tokens expire
 EMAIL_TOKEN_EXPIRATION = 24
 CITATION_STYLES_PATH = os.path.join(BASE_PATH, 'static', 'vendor', 'bower_components', 'styles')
+# Number of parsed CSL styles kept by each process for rendering citations
+CITATION_STYLE_CACHE_SIZE = 32
+# Maximum number of nodes whose citations are rendered in one request
+CITATION_RENDER_MAX_NODES = 100
 
 # Hours before pending embargo/retraction/registration automatically becomes active
 RETRACTION_PENDING_TIME = datetime.timedelta(days=2)
@@ -66,6 +70,12 @@ SEARCH_ENGINE = 'elastic'  # Can be 'elastic', or None
 ELASTIC_URI = 'localhost:9200'
 ELASTIC_TIMEOUT = 10
 ELASTIC_INDEX = 'website'
+# Force an index refresh after every write; expensive, only useful for tests
+ELASTIC_REFRESH_ON_WRITE = False
+# Documents per bulk request when indexing
+ELASTIC_BULK_CHUNK_SIZE = 500
+# Node ids drained from the search queue per flush batch
+SEARCH_QUEUE_BATCH_SIZE = 200
 SHARE_ELASTIC_URI = ELASTIC_URI
 SHARE_ELASTIC_INDEX = 'share'
 # For old indices
@@ -77,10 +87,38 @@ OSF_COOKIE_DOMAIN = None
 COOKIE_NAME = 'osf'
 # TODO: Override SECRET_KEY in local.py in production
 SECRET_KEY = 'CHANGEME'
+# Recently loaded sessions are cached in each process for this many seconds;
+# cached copies are only used while their modification date matches the
+# database, so only the read of the session data is saved
+SESSION_CACHE_TTL = 30
+SESSION_CACHE_SIZE = 1000
+# Unchanged authenticated sessions are saved at most this often, to keep
+# `date_modified` current for stale session cleanup
+SESSION_TOUCH_INTERVAL = 60 * 60
+# Keep anonymous session data in a signed cookie rather than discarding it
+SESSION_CLIENT_SIDE = False
+SESSION_CLIENT_COOKIE_NAME = 'osf_anon'
+SESSION_CLIENT_MAX_SIZE = 2048
 
 # Change if using `scripts/cron.py` to manage crontab
 CRON_USER = None
 
+# OAuth
+# `scripts/refresh_oauth_tokens.py` refreshes access tokens expiring within
+# this many seconds; keep it well above the interval between runs
+OAUTH_REFRESH_AHEAD = 30 * 60
+# Number of tokens refreshed at once by each run
+OAUTH_REFRESH_CONCURRENCY = 8
+# Seconds an account stays claimed by a refresh that does not finish
+OAUTH_REFRESH_CLAIM_TIMEOUT = 60
+# Access tokens are cached in each process for this many seconds, so tokens
+# refreshed by another process are picked up within this interval
+OAUTH_TOKEN_CACHE_TTL = 60
+OAUTH_TOKEN_CACHE_SIZE = 1000
+# Tokens expiring within this many seconds are refreshed in the background
+# when requested; expired tokens are refreshed before being returned
+OAUTH_TOKEN_MIN_VALIDITY = 5 * 60
+
 # External services
 USE_CDN_FOR_CLIENT_LIBS = True
 
@@ -126,6 +164,15 @@ DB_NAME = 'osf20130903'
 DB_USER = None
 DB_PASS = None
 
+# Share one pooled MongoClient per worker process instead of connecting on
+# every request
+DB_POOL = True
+DB_POOL_SIZE = 50
+# Seconds between liveness pings of the pooled client; falsy to disable
+DB_POOL_HEALTH_CHECK_INTERVAL = 30
+# Log a warning when acquiring a pooled connection takes longer than this (s)
+DB_POOL_WAIT_WARNING = 0.5
+
 # Cache settings
 SESSION_HISTORY_LENGTH = 5
 SESSION_HISTORY_IGNORE_RULES = [
@@ -134,6 +181,9 @@ SESSION_HISTORY_IGNORE_RULES = [
     lambda url: url.startswith('/api/'),
 ]
 
+# Seconds before cached project organizer entries expire; 0 disables the cache
+ORGANIZER_CACHE_TTL = 60 * 60
+
 # TODO: Configuration should not change between deploys - this should be dynamic.
 CANONICAL_DOMAIN = 'openscienceframework.org'
 COOKIE_DOMAIN = '.openscienceframework.org' # Beaker
@@ -188,7 +238,10 @@ CELERY_IMPORTS = (
     'framework.tasks.signals',
     'framework.email.tasks',
     'framework.analytics.tasks',
+    'website.search.tasks',
     'website.mailchimp_utils',
+    'website.addons.citations.snapshot',
+    'website.oauth.refresh',
     'scripts.send_digest'
 )
 
@@ -214,6 +267,17 @@ SYSTEM_ADDED_ADDONS = {
     'node': [],
 }
 
+# Citation add-ons
+# Snapshots of citation manager folders and citations are served for this
+# many seconds before being refreshed in the background
+CITATIONS_SNAPSHOT_TTL = 300
+# Refreshes fetch only modified documents, except for one full refresh per day
+CITATIONS_SNAPSHOT_FULL_REFRESH = 24 * 3600
+# Snapshots not refreshed for this many seconds are removed
+CITATIONS_SNAPSHOT_EXPIRATION = 30 * 24 * 3600
+CITATIONS_PAGE_SIZE = 100
+CITATIONS_MAX_PAGE_SIZE = 500
+
 # Piwik
 
 # TODO: Override in local.py in production
@@ -221,6 +285,16 @@ PIWIK_HOST = None
 PIWIK_ADMIN_TOKEN = None
 PIWIK_SITE_ID = None
 
+# Page counters
+
+# Buffered page counter increments are written after this many page views or
+# this many seconds, whichever comes first
+ANALYTICS_FLUSH_EVENTS = 100
+ANALYTICS_FLUSH_INTERVAL = 10
+# Size in bits and number of hashes of the per-session visited-page filters
+ANALYTICS_BLOOM_SIZE = 2048
+ANALYTICS_BLOOM_HASHES = 4
+
 SENTRY_DSN = None
 SENTRY_DSN_JS = None
 
@@ -228,6 +302,18 @@ SENTRY_DSN_JS = None
 # TODO: Delete me after merging GitLab
 MISSING_FILE_NAME = 'untitled'
 
+# Files page
+# Threads per process fetching the roots of add-on file trees; with 0, roots
+# are fetched one at a time by the request thread
+ADDON_HGRID_CONCURRENCY = 8
+# Seconds to wait for add-on roots before showing placeholders for the add-ons
+# that have not answered
+ADDON_HGRID_TIMEOUT = 5
+# Most roots of one add-on being fetched at once per process; further roots of
+# that add-on are shown as loading, so that a provider that hangs cannot take
+# up every thread
+ADDON_HGRID_PROVIDER_CONCURRENCY = 2
+
 # Dashboard
 ALL_MY_PROJECTS_ID = '-amp'
 ALL_MY_REGISTRATIONS_ID = '-amr'
@@ -283,5 +369,26 @@ ARCHIVE_TIMEOUT_TIMEDELTA = timedelta(1)  # 24 hours
 
 ENABLE_ARCHIVER = True
 
+# Number of folder listings requested from WaterButler at once while
+# collecting file tree metadata
+ARCHIVE_CRAWL_CONCURRENCY = 8
+# Maximum folder listings per second, per provider and worker process
+ARCHIVE_CRAWL_RATE = 20
+ARCHIVE_CRAWL_PROVIDER_RATES = {}
+# Seconds to wait for each folder listing
+ARCHIVE_CRAWL_TIMEOUT = 60
+# Record file tree metadata collection progress every this many folders
+ARCHIVE_PROGRESS_INTERVAL = 50
+
+# Folders larger than either limit are copied to the archive one subtree at a
+# time rather than with a single copy request
+ARCHIVE_BATCH_SIZE = 1024 ** 2 * 100  # 100 MB
+ARCHIVE_BATCH_FILES = 500
+# Seconds to wait for WaterButler to accept each copy request
+ARCHIVE_COPY_TIMEOUT = 60
+# Failed copy batches are retried after 30, 60, 120... seconds
+ARCHIVE_COPY_MAX_RETRIES = 5
+ARCHIVE_COPY_RETRY_BACKOFF = 30
+
 JWT_SECRET = 'changeme'
 JWT_ALGORITHM = 'HS256'
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""Per-user cache of serialized project organizer entries.
+
+Each entry is the rubeus serialization of one node (or pointer) as seen by
+one user. Entries record the nodes and users they were built from and are
+removed when any of those change; they also expire after
+``ORGANIZER_CACHE_TTL`` seconds to bound staleness from changes that are not
+tracked (e.g. archive progress).
+"""
+
+import datetime
+
+import pymongo
+
+from framework.mongo import database
+
+from website import settings
+
+
+COLLECTION = 'organizercache'
+
+
+def _collection():
+    collection = database[COLLECTION]
+    # Cached by pymongo; only hits the server once per process
+    collection.ensure_index('node_ids')
+    collection.ensure_index('user_ids')
+    collection.ensure_index([('user', pymongo.ASCENDING), ('smart', pymongo.ASCENDING)])
+    return collection
+
+
+def enabled():
+    return bool(settings.ORGANIZER_CACHE_TTL)
+
+
+def _cutoff():
+    return datetime.datetime.utcnow() - datetime.timedelta(seconds=settings.ORGANIZER_CACHE_TTL)
+
+
+def make_key(user_id, node_id, parent_is_folder):
+    return '{0}:{1}:{2:d}'.format(user_id, node_id, bool(parent_is_folder))
+
+
+def get_entries(user_id, items):
+    """Fetch cached serializations with one query.
+
+    :param str user_id: Viewing user, or ``None`` for anonymous
+    :param list items: ``(node_id, parent_is_folder)`` pairs
+    :return: Dict mapping cache keys to ``(data, date_modified)`` pairs
+    """
+    if not enabled() or not items:
+        return {}
+    keys = [make_key(user_id, node_id, parent_is_folder) for node_id, parent_is_folder in items]
+    cursor = _collection().find({
+        '_id': {'$in': keys},
+        'created': {'$gt': _cutoff()},
+    })
+    return dict(
+        (entry['_id'], (entry['data'], entry['date_modified']))
+        for entry in cursor
+    )
+
+
+def set_entry(user_id, node_id, parent_is_folder, data, date_modified, node_ids, user_ids):
+    """Store a serialization along with the nodes and users it depends on."""
+    if not enabled():
+        return
+    _collection().save({
+        '_id': make_key(user_id, node_id, parent_is_folder),
+        'user': user_id,
+        'data': data,
+        'date_modified': date_modified,
+        'node_ids': list(set(node_ids)),
+        'user_ids': list(set(user_ids)),
+        'created': datetime.datetime.utcnow(),
+    })
+
+
+def get_smart_folder_count(user_id, folder_id):
+    if not enabled():
+        return None
+    entry = _collection().find_one({
+        '_id': make_key(user_id, folder_id, True),
+        'created': {'$gt': _cutoff()},
+    })
+    return entry['count'] if entry else None
+
+
+def set_smart_folder_count(user_id, folder_id, count):
+    if not enabled():
+        return
+    _collection().save({
+        '_id': make_key(user_id, folder_id, True),
+        'user': user_id,
+        'smart': True,
+        'count': count,
+        'created': datetime.datetime.utcnow(),
+    })
+
+
+def invalidate_nodes(node_ids, contributor_ids=None):
+    """Drop entries built from any of ``node_ids``, and the smart folder
+    counts of ``contributor_ids``, whose set of projects may have changed.
+    """
+    if not enabled():
+        return
+    clauses = [{'node_ids': {'$in': list(node_ids)}}]
+    if contributor_ids:
+        clauses.append({'user': {'$in': list(contributor_ids)}, 'smart': True})
+    _collection().remove({'$or': clauses})
+
+
+def invalidate_users(user_ids):
+    """Drop entries that display any of ``user_ids`` (e.g. after a rename)."""
+    if not enabled():
+        return
+    _collection().remove({'user_ids': {'$in': list(user_ids)}})
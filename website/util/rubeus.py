@@ -2,22 +2,35 @@
 """Contains helper functions for generating correctly
 formatted hgrid list/folders.
 """
+import os
+import time
+import logging
 import datetime
+import threading
+import contextlib
+import multiprocessing
+from multiprocessing.pool import ThreadPool
 
 import hurry.filesize
+from flask import current_app, has_request_context, request, _request_ctx_stack
 from modularodm import Q
 
 from framework import sentry
 from framework.auth.decorators import Auth
+from framework.mongo.utils import prefetch
 
+from website import settings
 from website.util import paths
 from website.util import sanitize
+from website.util import organizer_cache
 from website.settings import (
     ALL_MY_PROJECTS_ID, ALL_MY_REGISTRATIONS_ID, ALL_MY_PROJECTS_NAME,
     ALL_MY_REGISTRATIONS_NAME, DISK_SAVING_MODE
 )
 
 
+logger = logging.getLogger(__name__)
+
 FOLDER = 'folder'
 FILE = 'file'
 KIND = 'kind'
@@ -169,13 +182,67 @@ class NodeProjectCollector(object):
 
     def _collect_components(self, node, visited):
         rv = []
+        # Load children, pointed-to nodes, contributors and grandchildren in
+        # bulk rather than once per child in `_serialize_node`
+        prefetch([node], 'nodes.contributors', 'nodes.nodes', 'nodes.node.contributors', 'nodes.node.nodes')
         for child in reversed(node.nodes):  # (child.resolve()._id not in visited or node.is_folder) and
             if child is not None and not child.is_deleted and child.resolve().can_view(auth=self.auth) and node.can_view(self.auth):
                 # visited.append(child.resolve()._id)
-                rv.append(self._serialize_node(child, visited=None, parent_is_folder=node.is_folder))
+                rv.append(child)
+        return self._serialize_nodes_cached(rv, parent_is_folder=node.is_folder)
+
+    def _serialize_nodes_cached(self, nodes, parent_is_folder=False):
+        """Serialize one level of the organizer, reusing this user's cached
+        entries where available. Only the requested level is serialized;
+        deeper levels are fetched when the user expands them.
+        """
+        # View-only links change what a user can see; don't share entries
+        use_cache = organizer_cache.enabled() and not self.auth.private_key
+        user_id = self.auth.user._id if self.auth.user else None
+        cached = organizer_cache.get_entries(
+            user_id, [(each._id, parent_is_folder) for each in nodes]
+        ) if use_cache else {}
+        rv = []
+        for each in nodes:
+            hit = cached.get(organizer_cache.make_key(user_id, each._id, parent_is_folder))
+            if hit is not None:
+                data, date_modified = hit
+                # Relative to now, so never cached
+                data['modifiedDelta'] = max(1, delta_date(date_modified))
+            else:
+                data = self._serialize_node(each, visited=None, parent_is_folder=parent_is_folder)
+                if use_cache:
+                    self._cache_serialized(each, parent_is_folder, data)
+            rv.append(data)
         return rv
 
+    def _cache_serialized(self, node, parent_is_folder, data):
+        resolved = node.resolve()
+        user_ids = resolved.contributors._to_primary_keys()
+        if resolved.logs:
+            user_ids.append(getattr(resolved.logs[-1].user, '_id', None))
+        organizer_cache.set_entry(
+            user_id=self.auth.user._id if self.auth.user else None,
+            node_id=node._id,
+            parent_is_folder=parent_is_folder,
+            data=data,
+            date_modified=resolved.date_modified,
+            # The entry's children count depends on each child's state, and
+            # admins of any ancestor can see the node and its children
+            node_ids=[node._id, resolved._id] + list(resolved.ancestor_ids) + [
+                key for key, _ in resolved.to_storage().get('nodes', [])
+            ],
+            user_ids=[each for each in user_ids if each],
+        )
+
     def collect_all_projects_smart_folder(self):
+        children_count = organizer_cache.get_smart_folder_count(self.auth.user._id, ALL_MY_PROJECTS_ID)
+        if children_count is None:
+            children_count = self._count_all_projects()
+            organizer_cache.set_smart_folder_count(self.auth.user._id, ALL_MY_PROJECTS_ID, children_count)
+        return self.make_smart_folder(ALL_MY_PROJECTS_NAME, ALL_MY_PROJECTS_ID, children_count)
+
+    def _count_all_projects(self):
         contributed = self.auth.user.node__contributed
         all_my_projects = contributed.find(
             Q('category', 'eq', 'project') &
@@ -195,10 +262,16 @@ class NodeProjectCollector(object):
             # exclude registrations
             Q('is_registration', 'eq', False)
         )
-        children_count = all_my_projects.count() + comps.count()
-        return self.make_smart_folder(ALL_MY_PROJECTS_NAME, ALL_MY_PROJECTS_ID, children_count)
+        return all_my_projects.count() + comps.count()
 
     def collect_all_registrations_smart_folder(self):
+        children_count = organizer_cache.get_smart_folder_count(self.auth.user._id, ALL_MY_REGISTRATIONS_ID)
+        if children_count is None:
+            children_count = self._count_all_registrations()
+            organizer_cache.set_smart_folder_count(self.auth.user._id, ALL_MY_REGISTRATIONS_ID, children_count)
+        return self.make_smart_folder(ALL_MY_REGISTRATIONS_NAME, ALL_MY_REGISTRATIONS_ID, children_count)
+
+    def _count_all_registrations(self):
         contributed = self.auth.user.node__contributed
         all_my_registrations = contributed.find(
             Q('category', 'eq', 'project') &
@@ -218,8 +291,7 @@ class NodeProjectCollector(object):
             # exclude registrations
             Q('is_registration', 'eq', True)
         )
-        children_count = all_my_registrations.count() + comps.count()
-        return self.make_smart_folder(ALL_MY_REGISTRATIONS_NAME, ALL_MY_REGISTRATIONS_ID, children_count)
+        return all_my_registrations.count() + comps.count()
 
     def make_smart_folder(self, title, node_id, children_count=0):
         return_value = {
@@ -418,12 +490,24 @@ class NodeFileCollector(object):
         self.extra = kwargs
         self.can_view = node.can_view(auth)
         self.can_edit = node.can_edit(auth) and not node.is_registration
+        # (node, children) pairs awaiting addon roots, while serializing a tree
+        self._pending_addons = None
 
     def to_hgrid(self):
         """Return the Rubeus.JS representation of the node's file data, including
         addons and components
         """
-        root = self._serialize_node(self.node)
+        # Serialize the tree first, then fetch the addon roots of all its
+        # nodes at once, so that slow providers are waited for concurrently
+        self._pending_addons = []
+        try:
+            root = self._serialize_node(self.node)
+            pending = self._pending_addons
+        finally:
+            self._pending_addons = None
+        roots = self._get_addon_roots([node for node, _ in pending])
+        for node, children in pending:
+            children[0:0] = roots[node._id]
         return [root]
 
     def _collect_components(self, node, visited):
@@ -459,7 +543,12 @@ class NodeFileCollector(object):
         visited.append(node.resolve()._id)
         can_view = node.can_view(auth=self.auth)
         if can_view:
-            children = self._collect_addons(node) + self._collect_components(node, visited)
+            children = self._collect_components(node, visited)
+            if self._pending_addons is None:
+                children = self._collect_addons(node) + children
+            else:
+                # Filled in by `to_hgrid`
+                self._pending_addons.append((node, children))
         else:
             children = []
 
@@ -484,26 +573,246 @@ class NodeFileCollector(object):
         }
 
     def _collect_addons(self, node):
-        rv = []
-        for addon in node.get_addons():
-            if addon.config.has_hgrid_files:
+        return self._get_addon_roots([node])[node._id]
+
+    def _get_addon_roots(self, nodes):
+        """Fetch the hgrid roots of the addons of `nodes`. Roots of remote
+        addons are fetched concurrently, waiting at most `ADDON_HGRID_TIMEOUT`
+        seconds in all; addons that have not answered by then, or that already
+        have `ADDON_HGRID_PROVIDER_CONCURRENCY` roots being fetched, are shown
+        as loading. Roots that make no remote calls are fetched inline.
+
+        :return dict: Lists of addon roots by node ID
+        """
+        roots = dict((node._id, []) for node in nodes)
+        jobs = [
+            (node, addon)
+            for node in nodes
+            for addon in node.get_addons()
+            if addon.config.has_hgrid_files
+        ]
+        if settings.ADDON_HGRID_CONCURRENCY:
+            context, pool = _get_request_context(), get_addon_pool()
+        results = []
+        for _, addon in jobs:
+            short_name = addon.config.short_name
+            if not settings.ADDON_HGRID_CONCURRENCY or addon.config.local_hgrid_data:
+                results.append(_InlineResult(_fetch_addon_root, addon, self.auth, self.extra))
+            elif _acquire_addon_slot(short_name):
+                results.append(pool.apply_async(
+                    _fetch_addon_root_in_slot,
+                    (addon, self.auth, self.extra, context),
+                ))
+            else:
+                _record_addon_throttled(short_name)
+                results.append(None)
+        deadline = time.time() + settings.ADDON_HGRID_TIMEOUT
+        for (node, addon), result in zip(jobs, results):
+            if result is None:
+                roots[node._id].append(build_addon_placeholder(addon, loading=True))
+                continue
+            try:
                 # WARNING: get_hgrid_data can return None if the addon is added but has no credentials.
-                try:
-                    temp = addon.config.get_hgrid_data(addon, self.auth, **self.extra)
-                except Exception:
-                    sentry.log_exception()
-                    rv.append({
-                        KIND: FOLDER,
-                        'unavailable': True,
-                        'iconUrl': addon.config.icon_url,
-                        'provider': addon.config.short_name,
-                        'addonFullname': addon.config.full_name,
-                        'permissions': {'view': False, 'edit': False},
-                        'name': '{} is currently unavailable'.format(addon.config.full_name),
-                    })
-                    continue
-                rv.extend(sort_by_name(temp) or [])
-        return rv
+                temp = result.get(timeout=max(deadline - time.time(), 0))
+            except multiprocessing.TimeoutError:
+                _record_addon_timeout(addon.config.short_name)
+                roots[node._id].append(build_addon_placeholder(addon, loading=True))
+            except Exception:
+                sentry.log_exception()
+                roots[node._id].append(build_addon_placeholder(addon, unavailable=True))
+            else:
+                roots[node._id].extend(sort_by_name(temp) or [])
+        return roots
+
+
+def build_addon_placeholder(node_settings, loading=False, unavailable=False):
+    """Build the root shown for an addon whose root could not be fetched.
+    Loading roots can still be expanded; their contents are listed by
+    WaterButler.
+    """
+    config = node_settings.config
+    if unavailable:
+        return {
+            KIND: FOLDER,
+            'unavailable': True,
+            'iconUrl': config.icon_url,
+            'provider': config.short_name,
+            'addonFullname': config.full_name,
+            'permissions': {'view': False, 'edit': False},
+            'name': '{} is currently unavailable'.format(config.full_name),
+        }
+    owner = node_settings.owner
+    return {
+        KIND: FOLDER,
+        'loading': loading,
+        'iconUrl': config.icon_url,
+        'provider': config.short_name,
+        'addonFullname': config.full_name,
+        'permissions': {'view': True, 'edit': False},
+        'name': u'{0} (loading)'.format(config.full_name),
+        'isAddonRoot': True,
+        'urls': default_urls(owner.api_url, config.short_name),
+        'nodeId': owner._id,
+        'nodeUrl': owner.url,
+        'nodeApiUrl': owner.api_url,
+    }
+
+
+_addon_pool = None
+_addon_pool_pid = None
+_addon_pool_lock = threading.Lock()
+
+# Roots being fetched by the pool, by addon short name
+_addon_slots = {}
+_addon_slots_lock = threading.Lock()
+
+
+def get_addon_pool():
+    """Return the process-wide pool of threads fetching addon roots, creating
+    it if necessary. Threads do not survive a fork, so each process gets its
+    own pool. Roots still being fetched when a request stops waiting for them
+    keep a thread busy until the provider answers or times out; see
+    `_acquire_addon_slot`.
+    """
+    global _addon_pool, _addon_pool_pid
+    pid = os.getpid()
+    with _addon_pool_lock:
+        if _addon_pool is None or _addon_pool_pid != pid:
+            _addon_pool = ThreadPool(settings.ADDON_HGRID_CONCURRENCY)
+            _addon_pool_pid = pid
+            with _addon_slots_lock:
+                _addon_slots.clear()
+        return _addon_pool
+
+
+def _acquire_addon_slot(short_name):
+    """Reserve a pool thread for fetching a root of addon `short_name`.
+
+    :return bool: False if the addon already has
+        `ADDON_HGRID_PROVIDER_CONCURRENCY` roots being fetched
+    """
+    with _addon_slots_lock:
+        in_flight = _addon_slots.get(short_name, 0)
+        if in_flight >= settings.ADDON_HGRID_PROVIDER_CONCURRENCY:
+            return False
+        _addon_slots[short_name] = in_flight + 1
+        return True
+
+
+def _release_addon_slot(short_name):
+    with _addon_slots_lock:
+        _addon_slots[short_name] = max(_addon_slots.get(short_name, 0) - 1, 0)
+
+
+class _InlineResult(object):
+    """Result of a call made on the request thread, with the interface of the
+    results of `ThreadPool.apply_async`.
+    """
+    def __init__(self, func, *args):
+        try:
+            self._value, self._error = func(*args), None
+        except Exception as error:
+            self._value, self._error = None, error
+
+    def get(self, timeout=None):
+        if self._error is not None:
+            raise self._error
+        return self._value
+
+
+def _get_request_context():
+    """Capture what pool threads need to rebuild the current request."""
+    if not has_request_context():
+        return None
+    return current_app._get_current_object(), dict(request.environ)
+
+
+@contextlib.contextmanager
+def _copied_request_context(context):
+    """Provide `request` and URL building to a pool thread from a request
+    captured by `_get_request_context`. The request context is pushed without
+    `RequestContext.push` so that leaving it does not run the teardown
+    handlers of the original request. The thread gets its own `g`, and so
+    its own database socket, outside the request's transaction; addon roots
+    must only read.
+    """
+    if context is None:
+        yield
+        return
+    app, environ = context
+    with app.app_context():
+        _request_ctx_stack.push(app.request_context(environ))
+        try:
+            yield
+        finally:
+            _request_ctx_stack.pop()
+
+
+def _fetch_addon_root(addon, auth, extra, context=None):
+    start = time.time()
+    try:
+        with _copied_request_context(context):
+            data = addon.config.get_hgrid_data(addon, auth, **extra)
+    except Exception:
+        _record_addon_latency(addon.config.short_name, time.time() - start, error=True)
+        raise
+    _record_addon_latency(addon.config.short_name, time.time() - start)
+    return data
+
+
+def _fetch_addon_root_in_slot(addon, auth, extra, context):
+    try:
+        return _fetch_addon_root(addon, auth, extra, context)
+    finally:
+        _release_addon_slot(addon.config.short_name)
+
+
+# Latency of fetching addon roots in this process, by addon short name
+addon_root_stats = {}
+_addon_root_stats_lock = threading.Lock()
+
+
+def _get_addon_stats(short_name):
+    return addon_root_stats.setdefault(short_name, {
+        'fetched': 0,
+        'errors': 0,
+        'timeouts': 0,
+        'throttled': 0,
+        'time_total': 0.0,
+        'time_max': 0.0,
+    })
+
+
+def _record_addon_latency(short_name, elapsed, error=False):
+    with _addon_root_stats_lock:
+        stats = _get_addon_stats(short_name)
+        stats['fetched'] += 1
+        stats['errors'] += int(error)
+        stats['time_total'] += elapsed
+        stats['time_max'] = max(stats['time_max'], elapsed)
+    if elapsed > settings.ADDON_HGRID_TIMEOUT:
+        logger.warning('Fetching {0} root took {1:.3f}s'.format(short_name, elapsed))
+
+
+def _record_addon_timeout(short_name):
+    with _addon_root_stats_lock:
+        _get_addon_stats(short_name)['timeouts'] += 1
+
+
+def _record_addon_throttled(short_name):
+    with _addon_root_stats_lock:
+        _get_addon_stats(short_name)['throttled'] += 1
+
+
+def get_addon_root_stats():
+    """Return addon root latency metrics for the current process."""
+    with _addon_root_stats_lock:
+        ret = {}
+        for short_name, stats in addon_root_stats.items():
+            stats = dict(stats)
+            stats['time_mean'] = stats['time_total'] / stats['fetched'] if stats['fetched'] else 0.0
+            ret[short_name] = stats
+        return ret
 
 
 # TODO: these might belong in addons module
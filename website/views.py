@@ -26,7 +26,8 @@ from website.models import Guid
 from website.models import Node
 from website.util import rubeus
 from website.util import sanitize
-from website.project import model
+from website.project import timeline
+from website.project.model import filter_viewable
 from website.util import web_url_for
 from website.util import permissions
 from website.project import new_dashboard
@@ -47,8 +48,7 @@ def _rescale_ratio(auth, nodes):
         return 0
     counts = [
         len(node.logs)
-        for node in nodes
-        if node.can_view(auth)
+        for node in filter_viewable(nodes, auth)
     ]
     if counts:
         return float(max(counts))
@@ -269,9 +269,23 @@ def watched_logs_get(**kwargs):
             message_long='Invalid value for "size".'
         ))
 
+    # Pass `cursor` (empty for the first page) to paginate by cursor instead
+    cursor = request.args.get('cursor')
+    if cursor is not None:
+        try:
+            log_ids, next_cursor = user.get_recent_log_id_page(size, cursor=cursor or None)
+        except ValueError:
+            raise HTTPError(http.BAD_REQUEST, data=dict(
+                message_long='Invalid value for "cursor".'
+            ))
+        return {
+            'logs': [serialize_log(log) for log in timeline.load_logs(log_ids)],
+            'cursor': next_cursor,
+        }
+
     total = sum(1 for x in user.get_recent_log_ids())
     paginated_logs, pages = paginate(user.get_recent_log_ids(), total, page, size)
-    logs = (model.NodeLog.load(id) for id in paginated_logs)
+    logs = timeline.load_logs(list(paginated_logs))
 
     return {
         "logs": [serialize_log(log) for log in logs],